@@ -0,0 +1,119 @@
+"""
+almacen: Un módulo para definir la clase AlmacenCuadros
+
+Este módulo define la clase AlmacenCuadros, que guarda localmente los cuadros ya procesados de `PaginaWeb`. Al
+actualizar un cuadro, solo se descargan los datos a partir del último período guardado (usando el parámetro
+`FecInicial` del sitio del BCCR), más una ventana de revisión para incorporar datos corregidos recientemente, y se
+combinan con los datos guardados. Esto evita descargar todos los días la historia completa de cuadros grandes, como
+la tasa básica pasiva (cuadro 17).
+
+La forma usual de utilizarlo es
+
+    >>> from bccr import PW
+    >>> from bccr.almacen import AlmacenCuadros
+    >>> PW.almacen = AlmacenCuadros()       # en ~/.bccr/cuadros
+    >>> PW(TBP=17)   # la primera vez descarga toda la historia; luego solo los datos recientes
+"""
+
+import os
+import pickle
+import tempfile
+import time
+from dataclasses import dataclass
+
+import pandas as pd
+
+from .transporte import CARPETA_LOCAL
+
+
+@dataclass
+class AlmacenCuadros:
+    """
+    Almacén local de cuadros procesados, con actualización incremental
+
+    Attributes
+    ----------
+    carpeta : str
+        carpeta donde se guardan los cuadros (un archivo por cuadro).
+    revision : int
+        número de períodos (en la frecuencia del cuadro) anteriores al último dato guardado que se vuelven a descargar
+        en cada actualización, para incorporar revisiones de datos recientes.
+    vigencia : float, optional
+        segundos durante los cuales un cuadro guardado se considera al día, sin consultar al BCCR. Si None
+        (predeterminado), se actualiza cada vez que se solicita.
+    """
+    carpeta: str = os.path.join(CARPETA_LOCAL, 'cuadros')
+    revision: int = 3
+    vigencia: float = None
+
+    def ruta(self, cuadro):
+        """Archivo donde se guarda el cuadro `cuadro`"""
+        return os.path.join(self.carpeta, f'cuadro-{cuadro}.pkl')
+
+    def leer(self, cuadro):
+        """Datos guardados del cuadro `cuadro`
+
+        Returns
+        -------
+        dict or None
+            {'datos': pd.Series o pd.DataFrame, 'actualizado': fecha de actualización (segundos desde epoch)}, o None
+            si el cuadro no está guardado.
+        """
+        try:
+            with open(self.ruta(cuadro), 'rb') as archivo:
+                return pickle.load(archivo)
+        except FileNotFoundError:
+            return None
+
+    def guardar(self, cuadro, datos):
+        """Guardar los datos de un cuadro (la escritura es atómica: otros procesos nunca ven un archivo a medias)"""
+        os.makedirs(self.carpeta, exist_ok=True)
+        fd, temporal = tempfile.mkstemp(suffix='.pkl', dir=self.carpeta)
+        with os.fdopen(fd, 'wb') as archivo:
+            pickle.dump({'datos': datos, 'actualizado': time.time()}, archivo)
+        os.replace(temporal, self.ruta(cuadro))
+
+    def borrar(self, cuadro):
+        """Desechar los datos guardados del cuadro `cuadro`"""
+        if os.path.exists(self.ruta(cuadro)):
+            os.remove(self.ruta(cuadro))
+
+    def actualizar(self, cuadro, descargar):
+        """Actualizar un cuadro, descargando solo los datos recientes
+
+        Parameters
+        ----------
+        cuadro : int
+            número del cuadro
+        descargar : callable
+            función que recibe una fecha inicial (str 'yyyy/mm/dd', o None para descargar toda la historia) y devuelve
+            los datos procesados del cuadro a partir de esa fecha, indexados por pd.PeriodIndex.
+
+        Returns
+        -------
+        pd.Series or pd.DataFrame
+            todos los datos del cuadro, guardados y nuevos
+        """
+        guardado = self.leer(cuadro)
+        if guardado is None or len(guardado['datos']) == 0:
+            datos = descargar(None)
+            self.guardar(cuadro, datos)
+            return datos
+
+        viejos = guardado['datos']
+        if self.vigencia is not None and time.time() - guardado['actualizado'] < self.vigencia:
+            return viejos
+
+        desde = viejos.index[-1] - self.revision
+        nuevos = descargar(desde.start_time.strftime('%Y/%m/%d'))
+        if nuevos is None or len(nuevos) == 0:  # sin datos recientes: conservar los guardados, sin recortarlos
+            return viejos
+        datos = pd.concat([viejos[viejos.index < desde], nuevos[nuevos.index >= desde]])
+        self.guardar(cuadro, datos)
+        return datos
+
+    def __str__(self):
+        return f"Clase AlmacenCuadros: cuadros de PaginaWeb guardados en {self.carpeta}."
+
+    def __repr__(self):
+        return self.__str__()
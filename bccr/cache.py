@@ -0,0 +1,178 @@
+"""
+cache: Un módulo para definir la clase CacheHTTP
+
+Este módulo define la clase CacheHTTP, que guarda en disco (comprimidas) las respuestas crudas del BCCR: el XML del
+servicio web (`ObtenerIndicadoresEconomicos`) y el HTML de los cuadros de la página de indicadores
+(`frmVerCatCuadro.aspx`). Como se guardan las respuestas sin procesar, cualquier cambio en el código que interpreta
+los datos se aplica también a los datos guardados.
+
+Normalmente no se usa directamente, sino por medio de `bccr.transporte.activar_cache`:
+
+    >>> from bccr import transporte
+    >>> transporte.activar_cache()  # en ~/.bccr/cache.sqlite, con los parámetros predeterminados
+    >>> transporte.activar_cache('/tmp/bccr.sqlite', presupuesto=50 * 2**20, ttl={'gee.bccr.fi.cr': 3600})
+"""
+
+import os
+import sqlite3
+import threading
+import time
+import zlib
+from dataclasses import dataclass, field
+
+
+@dataclass
+class CacheHTTP:
+    """
+    Caché de respuestas HTTP, comprimidas con zlib en un archivo SQLite
+
+    Attributes
+    ----------
+    archivo : str
+        ruta del archivo SQLite donde se guardan las respuestas. Varios procesos pueden compartir el mismo archivo.
+    presupuesto : int
+        tamaño máximo (en bytes, ya comprimidos) de las respuestas guardadas. Al excederlo, se desechan las respuestas
+        usadas menos recientemente (LRU).
+    ttl : dict
+        vigencia en segundos de las respuestas, según el servidor (p.ej. {'gee.bccr.fi.cr': 6 * 3600}).
+    ttl_predeterminado : float
+        vigencia en segundos de las respuestas de servidores que no aparecen en `ttl`.
+    ttl_negativo : float
+        vigencia en segundos de las respuestas marcadas como negativas (indicadores que el servidor reporta como
+        inexistentes o sin datos).
+    nivel : int
+        nivel de compresión de zlib (1 a 9).
+    """
+    archivo: str
+    presupuesto: int = 200 * 2**20
+    ttl: dict = field(default_factory=dict)
+    ttl_predeterminado: float = 12 * 3600
+    ttl_negativo: float = 3600
+    nivel: int = 6
+
+    def __post_init__(self):
+        carpeta = os.path.dirname(os.path.abspath(self.archivo))
+        os.makedirs(carpeta, exist_ok=True)
+        self.__candado__ = threading.Lock()
+        self.__conexion__ = sqlite3.connect(self.archivo, timeout=30, check_same_thread=False)
+        with self.__candado__, self.__conexion__ as con:
+            con.execute("""CREATE TABLE IF NOT EXISTS respuestas (
+                               clave TEXT PRIMARY KEY,
+                               host TEXT,
+                               estado INTEGER,
+                               razon TEXT,
+                               datos BLOB,
+                               tamano INTEGER,
+                               creado REAL,
+                               usado REAL,
+                               negativo INTEGER)""")
+            con.execute("CREATE INDEX IF NOT EXISTS respuestas_usado ON respuestas (usado)")
+
+    def __vigencia__(self, host, negativo):
+        """Segundos durante los cuales es válida una respuesta del servidor `host`"""
+        if negativo:
+            return self.ttl_negativo
+        return self.ttl.get(host, self.ttl_predeterminado)
+
+    def leer(self, clave):
+        """Buscar una respuesta en la caché
+
+        Parameters
+        ----------
+        clave : str
+            llave normalizada de la consulta (ver `bccr.transporte.llave`)
+
+        Returns
+        -------
+        tuple or None
+            (estado, razón, texto, negativo) si la respuesta está guardada y vigente, None en caso contrario.
+        """
+        ahora = time.time()
+        with self.__candado__, self.__conexion__ as con:
+            fila = con.execute("SELECT host, estado, razon, datos, creado, negativo FROM respuestas WHERE clave = ?",
+                               (clave,)).fetchone()
+            if fila is None:
+                return None
+            host, estado, razon, datos, creado, negativo = fila
+            if ahora - creado > self.__vigencia__(host, negativo):
+                con.execute("DELETE FROM respuestas WHERE clave = ?", (clave,))
+                return None
+            con.execute("UPDATE respuestas SET usado = ? WHERE clave = ?", (ahora, clave))
+        return estado, razon, zlib.decompress(datos).decode('utf-8'), bool(negativo)
+
+    def guardar(self, clave, host, estado, razon, texto, negativo=False):
+        """Guardar una respuesta en la caché, desechando las menos usadas si se excede el presupuesto
+
+        Parameters
+        ----------
+        clave : str
+            llave normalizada de la consulta
+        host : str
+            servidor que produjo la respuesta, para determinar su vigencia
+        estado : int
+            código de estado HTTP
+        razon : str
+            mensaje de estado HTTP
+        texto : str
+            cuerpo de la respuesta
+        negativo : bool
+            si True, la respuesta indica un indicador inexistente y se guarda con vigencia `ttl_negativo`
+
+        Returns
+        -------
+        None
+        """
+        datos = zlib.compress(texto.encode('utf-8'), self.nivel)
+        if len(datos) > self.presupuesto:
+            return
+        ahora = time.time()
+        with self.__candado__, self.__conexion__ as con:
+            con.execute("INSERT OR REPLACE INTO respuestas VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                        (clave, host, estado, razon, datos, len(datos), ahora, ahora, int(negativo)))
+            self.__podar__(con)
+
+    def marcar_negativo(self, clave):
+        """Marcar una respuesta guardada como negativa (el indicador no existe o no tiene datos)"""
+        with self.__candado__, self.__conexion__ as con:
+            con.execute("UPDATE respuestas SET negativo = 1 WHERE clave = ?", (clave,))
+
+    def __podar__(self, con):
+        """Desechar las respuestas usadas menos recientemente hasta cumplir con el presupuesto"""
+        total = con.execute("SELECT COALESCE(SUM(tamano), 0) FROM respuestas").fetchone()[0]
+        if total <= self.presupuesto:
+            return
+        desechar = []
+        for clave, tamano in con.execute("SELECT clave, tamano FROM respuestas ORDER BY usado"):
+            if total <= self.presupuesto:
+                break
+            desechar.append((clave,))
+            total -= tamano
+        con.executemany("DELETE FROM respuestas WHERE clave = ?", desechar)
+
+    def tamaño(self):
+        """Bytes ocupados por las respuestas guardadas (ya comprimidas)"""
+        with self.__candado__:
+            return self.__conexion__.execute("SELECT COALESCE(SUM(tamano), 0) FROM respuestas").fetchone()[0]
+
+    def limpiar(self, host=None):
+        """Desechar todas las respuestas guardadas (o solo las del servidor `host`)"""
+        with self.__candado__, self.__conexion__ as con:
+            if host:
+                con.execute("DELETE FROM respuestas WHERE host = ?", (host,))
+            else:
+                con.execute("DELETE FROM respuestas")
+
+    def cerrar(self):
+        """Cerrar la conexión con el archivo de la caché"""
+        with self.__candado__:
+            self.__conexion__.close()
+
+    def __len__(self):
+        with self.__candado__:
+            return self.__conexion__.execute("SELECT COUNT(*) FROM respuestas").fetchone()[0]
+
+    def __str__(self):
+        return f"Clase CacheHTTP: {len(self)} respuestas guardadas en {self.archivo} ({self.tamaño()} bytes)."
+
+    def __repr__(self):
+        return self.__str__()
@@ -0,0 +1,383 @@
+"""
+carga: Pruebas de carga de la interfaz gráfica
+
+Este módulo simula varios usuarios que usan la interfaz gráfica al mismo tiempo, para estimar cuántos procesos e hilos
+se necesitan para servirla. Cada usuario simulado repite una sesión típica, llamando a los mismos callbacks de Dash que
+llama el navegador (`/_dash-update-component`):
+
+1. busca códigos mientras escribe ("Buscar códigos"),
+2. consulta las cuentas superiores y las subcuentas de un indicador ("¿Quién?"),
+3. consulta datos, esperando el fin de la consulta en segundo plano, y revisa la tabla y el gráfico ("Datos"),
+4. exporta los datos a CSV.
+
+Las consultas al BCCR se sirven desde un casete grabado previamente (ver `bccr.transporte.grabar`), con la latencia grabada (o una
+fracción de ella), de manera que la prueba no depende de internet ni sobrecarga al BCCR. Como con gunicorn, la prueba
+usa `procesos` procesos con `hilos` usuarios cada uno; cada proceso crea su propia aplicación con `crear_app`.
+
+Al final se reporta, por callback, el número de llamadas, los errores, los percentiles de la latencia y las llamadas
+por segundo, así como el aumento de la memoria de cada proceso. Las filas 'consulta' y 'exportación' miden las tareas
+completas (desde el clic hasta el fin de la tarea en segundo plano); una tarea que termina con error, o que no termina
+a tiempo, cuenta como un error aunque cada callback haya respondido.
+
+Para grabar el casete y luego hacer la prueba:
+
+    >>> from bccr import SW, transporte
+    >>> with transporte.grabar('carga.zip'):
+    ...     SW(IMAE=87703, TBP=423)  # los indicadores que consultarán los usuarios simulados
+
+    $ python -m bccr.carga carga.zip --codigos 87703 423 --procesos 2 --hilos 8 --duracion 60
+"""
+
+import argparse
+import json
+import multiprocessing
+import os
+import resource
+import threading
+import time
+from collections import defaultdict
+from dataclasses import dataclass, field
+
+import numpy as np
+
+#: tuple: Percentiles de latencia que se reportan
+PERCENTILES = (50, 90, 99)
+
+#: str: Inicio del mensaje de avance de una tarea fallida (ver `bccr.tareas`)
+MENSAJE_ERROR = 'Error:'
+
+
+def memoria():
+    """Memoria residente del proceso, en MB"""
+    try:
+        with open('/proc/self/statm') as archivo:
+            return int(archivo.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') / 2**20
+    except (OSError, ValueError):
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 2**10  # pico, en sistemas sin /proc
+
+
+def _salida(salidas):
+    """Identificador de las salidas de un callback, como lo arma el navegador"""
+    if len(salidas) == 1:
+        return '{}.{}'.format(*salidas[0])
+    return '..' + '...'.join('{}.{}'.format(*s) for s in salidas) + '..'
+
+
+@dataclass
+class Usuario:
+    """
+    Un usuario simulado de la interfaz gráfica
+
+    Attributes
+    ----------
+    cliente : flask.testing.FlaskClient
+        cliente del servidor de la aplicación
+    codigos : list of str
+        códigos de los indicadores que consulta el usuario (deben estar grabados en el casete)
+    busquedas : list of str
+        frases que el usuario escribe en "Buscar códigos"
+    espera : float
+        segundos entre las consultas del avance de una tarea en segundo plano (el intervalo de la página)
+    latencias : dict
+        latencias (en segundos) de cada callback
+    errores : dict
+        número de llamadas fallidas de cada callback
+    """
+    cliente: object
+    codigos: list
+    busquedas: list
+    espera: float = 0.25
+    latencias: dict = field(default_factory=lambda: defaultdict(list))
+    errores: dict = field(default_factory=lambda: defaultdict(int))
+
+    def __post_init__(self):
+        self.sesion = None
+        self.marca = None
+
+    def llamar(self, nombre, salidas, entradas, estados=(), cambiado=None):
+        """Llamar un callback como lo hace el navegador
+
+        Parameters
+        ----------
+        nombre : str
+            nombre del callback, para el reporte
+        salidas : list of tuple
+            pares (id, propiedad) de las salidas del callback
+        entradas, estados : list of tuple
+            triples (id, propiedad, valor) de las entradas y estados del callback
+        cambiado : str, optional
+            'id.propiedad' de la entrada que activó el callback (predeterminado: la primera entrada)
+
+        Returns
+        -------
+        dict
+            valores de las salidas actualizadas, {(id, propiedad): valor}; vacío si el callback no actualizó nada
+        """
+        cuerpo = dict(
+            output=_salida(salidas),
+            outputs=[dict(id=i, property=p) for i, p in salidas] if len(salidas) > 1
+            else dict(id=salidas[0][0], property=salidas[0][1]),
+            inputs=[dict(id=i, property=p, value=v) for i, p, v in entradas],
+            state=[dict(id=i, property=p, value=v) for i, p, v in estados],
+            changedPropIds=[cambiado if cambiado else '{}.{}'.format(*entradas[0][:2])],
+        )
+        inicio = time.perf_counter()
+        try:
+            respuesta = self.cliente.post('/_dash-update-component', data=json.dumps(cuerpo),
+                                          content_type='application/json')
+        except Exception:
+            self.errores[nombre] += 1
+            return dict()
+        self.latencias[nombre].append(time.perf_counter() - inicio)
+
+        if respuesta.status_code == 204:  # PreventUpdate
+            return dict()
+        if respuesta.status_code != 200:
+            self.errores[nombre] += 1
+            return dict()
+        valores = json.loads(respuesta.get_data(as_text=True)).get('response', dict())
+        return {(i, p): v for i, props in valores.items() for p, v in props.items()}
+
+    def buscar(self, frase):
+        """Escribir una frase en "Buscar códigos"; el campo espera una pausa antes de buscar, por lo que cada palabra
+        completa es una búsqueda"""
+        for k in range(1, len(frase.split()) + 1):
+            parcial = ' '.join(frase.split()[:k])
+            self.llamar('mostrar_códigos',
+                        [('lista-códigos', 'data'), ('buscar-mensaje', 'value')],
+                        [('buscar-códigos', 'value', parcial), ('buscar-códigos-button', 'n_clicks', 0),
+                         ('tipo-búsqueda', 'value', 'todos'), ('filtrar-unidades', 'value', ''),
+                         ('filtrar-periodos', 'value', ''), ('incluir-subcuentas', 'value', 'No')])
+
+    def quien(self, codigo):
+        """Consultar "¿Quién?" de un indicador"""
+        self.llamar('quién_subcuentas',
+                    [('quién', 'value'), ('subcuentas', 'value')],
+                    [('quién-button', 'n_clicks', 1)],
+                    [('quién-es-código', 'value', codigo), ('profundidad-arbol', 'value', 2)])
+
+    def consultar(self, codigos, limite=120):
+        """Consultar datos y esperar a que termine la consulta en segundo plano"""
+        salidas = [('datos-descargados', 'columns'), ('comando', 'value'), ('sesión', 'data'),
+                   ('avance-intervalo', 'disabled'), ('avance', 'children'), ('versión-mostrada', 'data')]
+        filas = [{'nombre': f'x{codigo}', 'código': codigo} for codigo in codigos]
+
+        def display_output(n_intervalos, cambiado):
+            return self.llamar('display_output', salidas,
+                               [('consultar-datos-button', 'n_clicks', 1),
+                                ('avance-intervalo', 'n_intervals', n_intervalos),
+                                ('cancelar-consulta-button', 'n_clicks', 0)],
+                               [('seleccionar-indicadores', 'data', filas),
+                                ('fecha-primera-observación', 'date', None), ('fecha-última-observación', 'date', None),
+                                ('frecuencia', 'value', 'O'), ('func', 'value', 'None'), ('fillna', 'value', 'no'),
+                                ('sesión', 'data', self.sesion), ('versión-mostrada', 'data', self.marca)],
+                               cambiado)
+
+        inicio = time.perf_counter()
+        valores = display_output(0, 'consultar-datos-button.n_clicks')
+        self.sesion = valores.get(('sesión', 'data'), self.sesion)
+        mensaje = valores.get(('avance', 'children'), '')
+        terminada = False
+        fin = time.time() + limite
+        n = 0
+        while time.time() < fin:
+            time.sleep(self.espera)
+            n += 1
+            valores = display_output(n, 'avance-intervalo.n_intervals')
+            self.marca = valores.get(('versión-mostrada', 'data'), self.marca)
+            mensaje = valores.get(('avance', 'children'), mensaje)
+            if valores.get(('avance-intervalo', 'disabled')):
+                terminada = True
+                break
+        # la consulta completa, desde el clic hasta el fin de la tarea en segundo plano
+        self.latencias['consulta'].append(time.perf_counter() - inicio)
+        if not terminada or str(mensaje).startswith(MENSAJE_ERROR):
+            self.errores['consulta'] += 1
+
+    def revisar(self):
+        """Revisar las primeras páginas de la tabla de datos y el gráfico"""
+        for pagina in (0, 1):
+            self.llamar('paginar_datos',
+                        [('datos-descargados', 'data'), ('datos-descargados', 'page_count')],
+                        [('datos-descargados', 'page_current', pagina), ('datos-descargados', 'page_size', 50),
+                         ('datos-descargados', 'sort_by', []), ('datos-descargados', 'filter_query', ''),
+                         ('versión-mostrada', 'data', self.marca)],
+                        [('sesión', 'data', self.sesion)])
+        self.llamar('graficar_datos',
+                    [('gráfico-datos', 'figure')],
+                    [('versión-mostrada', 'data', self.marca), ('gráfico-datos', 'relayoutData', None)],
+                    [('sesión', 'data', self.sesion)])
+
+    def exportar(self, limite=120):
+        """Exportar los datos a CSV, esperando el archivo si se genera en segundo plano"""
+        def exportar_datos(n_intervalos, cambiado):
+            return self.llamar('exportar_datos',
+                               [('descargar-archivo', 'data'), ('exportación', 'children'),
+                                ('exportar-intervalo', 'disabled')],
+                               [('btn-xlsx', 'n_clicks', None), ('btn-dta', 'n_clicks', None),
+                                ('btn-csv', 'n_clicks', 1), ('btn-parquet', 'n_clicks', None),
+                                ('exportar-intervalo', 'n_intervals', n_intervalos)],
+                               [('file-name', 'value', 'datos'), ('sesión', 'data', self.sesion)],
+                               cambiado)
+
+        inicio = time.perf_counter()
+        valores = exportar_datos(0, 'btn-csv.n_clicks')
+        if ('descargar-archivo', 'data') in valores:  # tabla pequeña: el archivo se envió de inmediato
+            self.latencias['exportación'].append(time.perf_counter() - inicio)
+            return
+        fin = time.time() + limite
+        n = 0
+        while not valores.get(('exportar-intervalo', 'disabled'), True) and time.time() < fin:
+            time.sleep(self.espera)
+            n += 1
+            valores = exportar_datos(n, 'exportar-intervalo.n_intervals')
+        self.latencias['exportación'].append(time.perf_counter() - inicio)
+
+        enlace = valores.get(('exportación', 'children'))
+        if not isinstance(enlace, dict):  # la exportación falló o no terminó a tiempo: no hay enlace al archivo
+            self.errores['exportación'] += 1
+        else:  # el enlace al archivo generado en segundo plano
+            inicio = time.perf_counter()
+            respuesta = self.cliente.get(enlace['props']['href'])
+            self.latencias['servir_archivo'].append(time.perf_counter() - inicio)
+            if respuesta.status_code != 200:
+                self.errores['servir_archivo'] += 1
+
+    def sesion_tipica(self, rng):
+        """Una sesión completa: buscar, "¿Quién?", consultar datos, revisarlos y exportarlos"""
+        self.buscar(self.busquedas[rng.integers(len(self.busquedas))])
+        self.quien(self.codigos[rng.integers(len(self.codigos))])
+        self.consultar(list(rng.choice(self.codigos, size=rng.integers(1, len(self.codigos) + 1), replace=False)))
+        self.revisar()
+        self.exportar()
+
+
+def proceso(casete, codigos, busquedas, hilos, duracion, factor, semilla):
+    """Un proceso del servidor, con `hilos` usuarios simultáneos durante `duracion` segundos
+
+    Returns
+    -------
+    dict
+        latencias y errores por callback, sesiones completadas, y memoria (MB) al inicio y al final
+    """
+    from bccr import transporte
+    from bccr.gui import crear_app
+
+    app = crear_app()
+    # la primera consulta termina de preparar la aplicación (Dash lo hace una sola vez, sin candado): se hace antes
+    # de iniciar los usuarios, para que sus primeras llamadas no la encuentren a medio preparar
+    app.server.test_client().get('/')
+    inicial = memoria()
+    usuarios = [Usuario(app.server.test_client(), codigos, busquedas) for _ in range(hilos)]
+    sesiones = [0] * hilos
+    fin = time.time() + duracion
+
+    def simular(k):
+        rng = np.random.default_rng(semilla + k)
+        while time.time() < fin:
+            usuarios[k].sesion_tipica(rng)
+            sesiones[k] += 1
+
+    with transporte.reproducir(casete, factor=factor):
+        trabajadores = [threading.Thread(target=simular, args=(k,)) for k in range(hilos)]
+        for trabajador in trabajadores:
+            trabajador.start()
+        for trabajador in trabajadores:
+            trabajador.join()
+
+    latencias, errores = defaultdict(list), defaultdict(int)
+    for usuario in usuarios:
+        for nombre, valores in usuario.latencias.items():
+            latencias[nombre].extend(valores)
+        for nombre, n in usuario.errores.items():
+            errores[nombre] += n
+    return dict(pid=os.getpid(), latencias=dict(latencias), errores=dict(errores), sesiones=sum(sesiones),
+                memoria_inicial=inicial, memoria_final=memoria())
+
+
+def probar(casete, codigos, busquedas=('indice precios consumidor', 'tipo cambio', 'tasa basica pasiva'),
+           procesos=1, hilos=4, duracion=30.0, factor=1.0):
+    """Hacer una prueba de carga de la interfaz gráfica
+
+    Parameters
+    ----------
+    casete : str
+        ruta del casete con las respuestas del BCCR (ver `bccr.transporte.grabar`)
+    codigos : list of str
+        códigos de los indicadores que consultan los usuarios (deben estar grabados en el casete)
+    busquedas : list of str, optional
+        frases que los usuarios buscan en el catálogo
+    procesos : int, optional
+        número de procesos del servidor (como los workers de gunicorn)
+    hilos : int, optional
+        usuarios simultáneos por proceso (como los threads de gunicorn)
+    duracion : float, optional
+        segundos que dura la prueba
+    factor : float, optional
+        multiplicador de la latencia grabada en el casete (0 para no esperar al "BCCR")
+
+    Returns
+    -------
+    dict
+        'callbacks': por callback, número de llamadas, errores, percentiles de la latencia (ms) y llamadas por
+        segundo; 'procesos': por proceso, sesiones completadas y memoria (MB) al inicio y al final
+    """
+    codigos, busquedas = [str(c) for c in codigos], list(busquedas)
+    parametros = [(casete, codigos, busquedas, hilos, duracion, factor, 1000 * k) for k in range(procesos)]
+    inicio = time.perf_counter()
+    if procesos == 1:
+        resultados = [proceso(*parametros[0])]
+    else:
+        with multiprocessing.get_context('spawn').Pool(procesos) as pool:
+            resultados = pool.starmap(proceso, parametros)
+    transcurrido = time.perf_counter() - inicio
+
+    latencias, errores = defaultdict(list), defaultdict(int)
+    for resultado in resultados:
+        for nombre, valores in resultado['latencias'].items():
+            latencias[nombre].extend(valores)
+        for nombre, n in resultado['errores'].items():
+            errores[nombre] += n
+
+    callbacks = dict()
+    for nombre in sorted(set(latencias) | set(errores)):
+        valores = np.asarray(latencias.get(nombre, []))
+        callbacks[nombre] = dict(llamadas=valores.size, errores=errores.get(nombre, 0),
+                                 **{f'p{p}': float(np.percentile(valores, p) * 1000) if valores.size else np.nan
+                                    for p in PERCENTILES},
+                                 por_segundo=valores.size / transcurrido)
+    procesos = [dict(pid=r['pid'], sesiones=r['sesiones'], memoria_inicial=r['memoria_inicial'],
+                     memoria_final=r['memoria_final'], aumento=r['memoria_final'] - r['memoria_inicial'])
+                for r in resultados]
+    return dict(callbacks=callbacks, procesos=procesos, duracion=transcurrido)
+
+
+def reporte(resultado):
+    """Texto con los resultados de `probar`"""
+    lineas = [f"{'callback':<20}{'llamadas':>10}{'errores':>9}" + ''.join(f"{f'p{p} (ms)':>11}" for p in PERCENTILES)
+              + f"{'por seg.':>10}"]
+    for nombre, c in resultado['callbacks'].items():
+        lineas.append(f"{nombre:<20}{c['llamadas']:>10}{c['errores']:>9}"
+                      + ''.join(f"{c[f'p{p}']:>11.1f}" for p in PERCENTILES) + f"{c['por_segundo']:>10.2f}")
+    lineas.append('')
+    lineas.append(f"{'proceso':<20}{'sesiones':>10}{'MB inicio':>11}{'MB final':>11}{'aumento':>11}")
+    for p in resultado['procesos']:
+        lineas.append(f"{p['pid']:<20}{p['sesiones']:>10}{p['memoria_inicial']:>11.1f}{p['memoria_final']:>11.1f}"
+                      f"{p['aumento']:>11.1f}")
+    lineas.append(f"\nDuración: {resultado['duracion']:.1f} segundos.")
+    return '\n'.join(lineas)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Prueba de carga de la interfaz gráfica de bccr')
+    parser.add_argument('casete', help='casete con las respuestas del BCCR (ver bccr.transporte.grabar)')
+    parser.add_argument('--codigos', nargs='+', required=True, help='códigos de los indicadores a consultar')
+    parser.add_argument('--busquedas', nargs='+', default=['indice precios consumidor', 'tipo cambio'],
+                        help='frases a buscar en el catálogo')
+    parser.add_argument('--procesos', type=int, default=1, help='procesos del servidor')
+    parser.add_argument('--hilos', type=int, default=4, help='usuarios simultáneos por proceso')
+    parser.add_argument('--duracion', type=float, default=30, help='segundos que dura la prueba')
+    parser.add_argument('--factor', type=float, default=1.0, help='multiplicador de la latencia grabada')
+    opciones = parser.parse_args()
+    print(reporte(probar(opciones.casete, opciones.codigos, opciones.busquedas, opciones.procesos, opciones.hilos,
+                         opciones.duracion, opciones.factor)))
@@ -0,0 +1,151 @@
+"""
+casete: Un módulo para definir la clase Casete
+
+Este módulo define la clase Casete, que permite grabar todo el tráfico con el BCCR (servicio web, página de indicadores
+y catálogo de cuadros) en un archivo comprimido, y luego reproducirlo sin conexión a internet, simulando la latencia
+de las consultas originales. Esto permite, por ejemplo, comparar cambios en el código que interpreta los datos contra
+exactamente las mismas respuestas, o reproducir en una máquina sin acceso a internet el perfil de tiempos de una
+descarga real.
+
+Normalmente se usa por medio de `bccr.transporte.grabar` y `bccr.transporte.reproducir`:
+
+    >>> from bccr import SW, PW, transporte
+    >>> with transporte.grabar('consultas.zip'):
+    ...     datos = PW(TBP=17)
+    >>> with transporte.reproducir('consultas.zip', factor=0.5):  # la mitad de la latencia grabada
+    ...     datos = PW(TBP=17)
+"""
+
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+import zipfile
+from dataclasses import dataclass
+
+MODOS = ('grabar', 'reproducir')
+
+
+@dataclass
+class Casete:
+    """
+    Archivo de respuestas grabadas del BCCR
+
+    Attributes
+    ----------
+    archivo : str
+        ruta del archivo zip donde se guardan las respuestas.
+    modo : str
+        'grabar' para guardar las respuestas de las consultas reales, 'reproducir' para servirlas desde el archivo.
+    latencia : float, optional
+        segundos de espera al reproducir cada respuesta. Si None, se usa la duración grabada de cada consulta.
+    factor : float
+        multiplicador de la latencia al reproducir (p.ej. 0 para no esperar, 2 para simular una conexión más lenta).
+    """
+    archivo: str
+    modo: str = 'reproducir'
+    latencia: float = None
+    factor: float = 1.0
+
+    def __post_init__(self):
+        if self.modo not in MODOS:
+            raise ValueError("El parámetro 'modo' debe ser uno de " + str(MODOS))
+        self.__candado__ = threading.Lock()
+        self.__indice__ = dict()      # clave -> metadatos de la respuesta
+        self.__textos__ = dict()      # clave -> cuerpo de la respuesta (solo al grabar)
+
+        if os.path.exists(self.archivo):
+            with zipfile.ZipFile(self.archivo) as zf:
+                self.__indice__ = json.loads(zf.read('indice.json').decode('utf-8'))
+                if self.modo == 'grabar':  # conservar lo grabado anteriormente
+                    self.__textos__ = {clave: zf.read(meta['nombre']).decode('utf-8')
+                                       for clave, meta in self.__indice__.items()}
+        elif self.modo == 'reproducir':
+            raise FileNotFoundError(f'No existe el casete {self.archivo}')
+
+    @staticmethod
+    def __nombre__(clave):
+        """Nombre del archivo que contiene la respuesta a la consulta `clave` dentro del casete"""
+        return hashlib.sha1(clave.encode('utf-8')).hexdigest() + '.txt'
+
+    def grabar(self, clave, url, estado, razon, texto, duracion):
+        """Agregar una respuesta al casete
+
+        Parameters
+        ----------
+        clave : str
+            llave normalizada de la consulta (ver `bccr.transporte.llave`)
+        url : str
+            URL consultado
+        estado : int
+            código de estado HTTP
+        razon : str
+            mensaje de estado HTTP
+        texto : str
+            cuerpo de la respuesta
+        duracion : float
+            segundos que tardó la consulta
+
+        Returns
+        -------
+        None
+        """
+        with self.__candado__:
+            self.__indice__[clave] = dict(nombre=self.__nombre__(clave), url=url, estado=estado, razon=razon,
+                                          duracion=duracion)
+            self.__textos__[clave] = texto
+
+    def reproducir(self, clave):
+        """Obtener una respuesta grabada, esperando la latencia simulada
+
+        Parameters
+        ----------
+        clave : str
+            llave normalizada de la consulta
+
+        Returns
+        -------
+        tuple
+            (url, estado, razón, texto)
+        """
+        try:
+            meta = self.__indice__[clave]
+        except KeyError:
+            raise LookupError(f'La consulta {clave} no está grabada en el casete {self.archivo}') from None
+
+        with zipfile.ZipFile(self.archivo) as zf:
+            texto = zf.read(meta['nombre']).decode('utf-8')
+
+        espera = meta['duracion'] if self.latencia is None else self.latencia
+        if espera * self.factor > 0:
+            time.sleep(espera * self.factor)
+        return meta['url'], meta['estado'], meta['razon'], texto
+
+    def guardar(self):
+        """Escribir las respuestas grabadas en el archivo (solo en modo 'grabar')"""
+        if self.modo != 'grabar':
+            return
+        carpeta = os.path.dirname(os.path.abspath(self.archivo))
+        os.makedirs(carpeta, exist_ok=True)
+        with self.__candado__:
+            fd, temporal = tempfile.mkstemp(suffix='.zip', dir=carpeta)
+            os.close(fd)
+            with zipfile.ZipFile(temporal, 'w', compression=zipfile.ZIP_DEFLATED, compresslevel=9) as zf:
+                zf.writestr('indice.json', json.dumps(self.__indice__, ensure_ascii=False, indent=1))
+                for clave, meta in self.__indice__.items():
+                    zf.writestr(meta['nombre'], self.__textos__[clave])
+            os.replace(temporal, self.archivo)
+
+    def __contains__(self, clave):
+        return clave in self.__indice__
+
+    def __len__(self):
+        return len(self.__indice__)
+
+    def __str__(self):
+        return f"Clase Casete: {len(self)} respuestas en {self.archivo} (modo '{self.modo}')."
+
+    def __repr__(self):
+        return self.__str__()
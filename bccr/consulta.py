@@ -0,0 +1,305 @@
+"""
+consulta: Un módulo para definir la clase Consulta
+
+Este módulo define la clase Consulta, que permite construir una consulta de datos paso a paso, sin ejecutarla hasta
+llamar a `collect`:
+
+    >>> from bccr import SW, PW
+    >>> consulta = SW.query(TPM=3541, IMAE=913).desde(2010).freq('Q', 'mean')
+    >>> consulta.plan()      # qué se va a descargar, y qué se va a reutilizar
+    >>> datos = consulta.collect()
+    >>> anual = consulta.freq('A', 'mean').collect()   # otra variante: no se descarga nada de nuevo
+
+    >>> PW.query(M1=125, Npp=177).desde(2015).hasta(2020).collect()
+
+Cada paso devuelve una consulta nueva (las consultas no se modifican), de manera que se pueden construir varias
+variantes a partir de una misma consulta. Al ejecutarla, la consulta:
+
+* pide a cada fuente solo el rango de fechas solicitado,
+* reutiliza las series ya descargadas por consultas anteriores, incluso si se descargaron con un rango de fechas más
+  amplio (guardadas en `PIEZAS`, ver `bccr.series.CacheSeries`),
+* descarga las series que faltan de manera concurrente,
+* cambia la frecuencia de todos los indicadores que tienen la misma frecuencia original en una sola operación, y no
+  cambia la frecuencia de los que ya tienen la frecuencia pedida,
+* lee de `PIEZAS` las agregaciones ya calculadas de las series de `ServicioWeb` (ver `CacheSeries.resumen`), cuando
+  la función de agregación es una de `bccr.gee.FUNCS`, no se rellenan datos faltantes y la serie se guardó con el
+  mismo rango de fechas.
+"""
+
+import warnings
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field, replace
+
+import numpy as np
+import pandas as pd
+
+from .series import CacheSeries, INCREMENTALES
+from .utils import parse_date_parameter
+
+#: CacheSeries: Series descargadas por las consultas, sin cambiar su frecuencia, compartidas por todas las consultas
+PIEZAS = CacheSeries(maximo=512)
+
+#: list: Frecuencias, de la menor a la mayor
+FRECUENCIAS = ['A', '6M', 'Q', 'M', 'W', 'D']
+
+FALTANTES = "Se detectaron valores faltantes antes de cambiar la frecuencia de los datos.\n" \
+            "Considere completar esos datos con .rellenar('ffill') o .rellenar('bfill')."
+
+
+def _fecha(fecha, inicio):
+    """Fecha en formato 'yyyy/mm/dd', o None"""
+    return parse_date_parameter(fecha, inicio=inicio, año_primero=True) if fecha else None
+
+
+def _recortar(datos, inicio, final):
+    """Observaciones de `datos` entre las fechas `inicio` y `final` (texto 'yyyy/mm/dd' o None)"""
+    if datos is None:
+        return None
+    indice = datos.index
+    if inicio:
+        datos = datos[(indice.end_time if isinstance(indice, pd.PeriodIndex) else indice) >= pd.Timestamp(inicio)]
+        indice = datos.index
+    if final:
+        datos = datos[(indice.start_time if isinstance(indice, pd.PeriodIndex) else indice) <= pd.Timestamp(final)]
+    return datos
+
+
+@dataclass(frozen=True)
+class Consulta:
+    """
+    Consulta de datos de `ServicioWeb` o `PaginaWeb`, que se ejecuta solo al llamar a `collect`
+
+    No se crea directamente, sino con `SW.query(...)` o `PW.query(...)`.
+
+    Attributes
+    ----------
+    fuente : ServicioWeb or PaginaWeb
+        de dónde se descargan los datos
+    indicadores : dict
+        pares nombre: código de los indicadores (o cuadros) solicitados
+    FechaInicio, FechaFinal : str, optional
+        rango de fechas, en formato 'yyyy/mm/dd'
+    frecuencia : str, optional
+        frecuencia del resultado. Si None, la menor frecuencia de los indicadores.
+    func : str, callable or dict, optional
+        función para cambiar la frecuencia (ver `ServicioWeb.datos`), o un diccionario nombre: función
+    fillna : str, optional
+        cómo rellenar los datos faltantes antes de cambiar la frecuencia (solo `ServicioWeb`)
+    hilos : int
+        número máximo de descargas simultáneas
+    """
+    fuente: object
+    indicadores: dict = field(default_factory=dict)
+    FechaInicio: str = None
+    FechaFinal: str = None
+    frecuencia: str = None
+    func: object = None
+    fillna: str = None
+    hilos: int = 4
+
+    def desde(self, fecha):
+        """Consulta con datos a partir de `fecha` (ver el formato de fechas en `ServicioWeb.datos`)"""
+        return replace(self, FechaInicio=_fecha(fecha, inicio=True))
+
+    def hasta(self, fecha):
+        """Consulta con datos hasta `fecha`"""
+        return replace(self, FechaFinal=_fecha(fecha, inicio=False))
+
+    def freq(self, frecuencia, func=None):
+        """Consulta con datos en la frecuencia `frecuencia` ('A', '6M', 'Q', 'M', 'W' o 'D'), agregados con `func`"""
+        return replace(self, frecuencia=frecuencia, func=func if func is not None else self.func)
+
+    def rellenar(self, fillna):
+        """Consulta que rellena los datos faltantes con 'ffill' (último dato disponible) o 'bfill' (siguiente)"""
+        return replace(self, fillna=fillna)
+
+    @property
+    def __servicio__(self):
+        """True si la fuente es un `ServicioWeb` (sus series se indexan por fecha), False si es una `PaginaWeb`"""
+        return hasattr(self.fuente, 'indicadores')
+
+    def __nativa__(self, codigo):
+        """Frecuencia original del indicador, según el catálogo de la fuente (None si no aparece)"""
+        catalogo = self.fuente.indicadores if self.__servicio__ else self.fuente.cuadros
+        return catalogo.loc[codigo, 'freq'] if codigo in catalogo.index else None
+
+    def __llave__(self, codigo):
+        """Código del indicador en `PIEZAS`, distinto para cada fuente"""
+        return f"{'SW' if self.__servicio__ else 'PW'}:{codigo}"
+
+    def __descargar__(self, codigo):
+        """Descargar un indicador en su frecuencia original (sin guardarlo en `PIEZAS`)"""
+        if self.__servicio__:
+            return self.fuente.__descargar__(codigo, self.FechaInicio, self.FechaFinal)
+        return self.fuente.__parse__(codigo, self.FechaInicio, self.FechaFinal)
+
+    def plan(self):
+        """Plan de ejecución de la consulta, sin ejecutarla
+
+        Returns
+        -------
+        pd.DataFrame
+            una fila por indicador, con su código, frecuencia original ('nativa'), frecuencia del resultado ('destino',
+            None si no se cambia) y de dónde se obtienen sus datos ('origen': 'descarga', 'caché' o 'caché (recorte)')
+        """
+        nativas = {nombre: self.__nativa__(codigo) for nombre, codigo in self.indicadores.items()}
+        destino = self.__destino__(nativas)
+
+        filas = []
+        for nombre, codigo in self.indicadores.items():
+            llave = self.__llave__(codigo)
+            if PIEZAS.llave(llave, self.FechaInicio, self.FechaFinal) in PIEZAS:
+                origen = 'caché'
+            elif PIEZAS.cubre(llave, self.FechaInicio, self.FechaFinal) is not None:
+                origen = 'caché (recorte)'
+            else:
+                origen = 'descarga'
+            filas.append(dict(nombre=nombre, codigo=codigo, desde=self.FechaInicio, hasta=self.FechaFinal,
+                              nativa=nativas[nombre], destino=destino if destino != nativas[nombre] else None,
+                              origen=origen))
+        return pd.DataFrame(filas, columns=['nombre', 'codigo', 'desde', 'hasta', 'nativa', 'destino', 'origen'])
+
+    def __destino__(self, nativas):
+        """Frecuencia del resultado: la pedida, o la menor de las frecuencias originales"""
+        if self.frecuencia:
+            return self.frecuencia
+        conocidas = [f for f in nativas.values() if f in FRECUENCIAS]
+        return min(conocidas, key=FRECUENCIAS.index) if conocidas else None
+
+    def __pieza__(self, codigo):
+        """Datos de un indicador en su frecuencia original, de `PIEZAS` si es posible"""
+        llave = self.__llave__(codigo)
+        guardada = PIEZAS.cubre(llave, self.FechaInicio, self.FechaFinal)
+        if guardada is not None:
+            return _recortar(guardada, self.FechaInicio, self.FechaFinal)
+        return PIEZAS.obtener(llave, self.FechaInicio, self.FechaFinal, lambda *_: self.__descargar__(codigo))
+
+    def __funciones__(self, nombres):
+        """Función de agregación de cada indicador"""
+        from .gee import FUNCS
+
+        func = self.func
+        if func is None and not self.__servicio__:
+            func = np.sum  # como en `PaginaWeb.datos`
+        elif func is None:
+            warnings.warn("No se indicó la función para cambiar la frecuencia de los datos; se usa numpy.sum. "
+                          "Indíquela con .freq(frecuencia, func).")
+            func = np.sum
+        if isinstance(func, dict):
+            return {nombre: FUNCS.get(func[nombre], func[nombre]) for nombre in nombres}
+        if isinstance(func, str):
+            if func not in FUNCS:
+                raise ValueError("El parámetro 'func' debe ser uno de " + str(list(FUNCS.keys())))
+            func = FUNCS[func]
+        if not callable(func):
+            raise ValueError("El parámetro 'func' debe ser un str, función, o diccionario")
+        return {nombre: func for nombre in nombres}
+
+    def collect(self):
+        """Ejecutar la consulta
+
+        Returns
+        -------
+        pd.DataFrame
+            una tabla con los datos solicitados, filas indexadas por período, cada columna es un indicador.
+        """
+        if not self.indicadores:
+            return pd.DataFrame()
+
+        with ThreadPoolExecutor(max_workers=max(1, self.hilos)) as executor:
+            futuros = {nombre: executor.submit(self.__pieza__, codigo) for nombre, codigo in self.indicadores.items()}
+        piezas = dict()
+        for nombre, futuro in futuros.items():
+            try:
+                pieza = futuro.result()
+            except Exception as error:
+                warnings.warn(f"No se pudo descargar el indicador {self.indicadores[nombre]} ('{nombre}'): {error}")
+                continue
+            if pieza is not None and len(pieza):
+                piezas[nombre] = pieza
+        if not piezas:
+            return pd.DataFrame(columns=self.indicadores.keys())
+
+        # agrupar los indicadores según su frecuencia original
+        nativas = {nombre: self.__nativa__(self.indicadores[nombre]) for nombre in piezas}
+        if self.__servicio__:
+            from .utils import infer_frequency
+            nativas = {nombre: f if f else infer_frequency(piezas[nombre]) for nombre, f in nativas.items()}
+        destino = self.__destino__(nativas)
+        resumidos = self.__resumidos__(nativas, destino)
+        grupos = dict()
+        for nombre, nativa in nativas.items():
+            if nombre not in resumidos:
+                grupos.setdefault(nativa, []).append(nombre)
+
+        partes = [self.__convertir__(piezas, nombres, nativa, destino) for nativa, nombres in grupos.items()]
+        if resumidos:
+            resumidos = pd.DataFrame(resumidos)
+            if resumidos.isna().any().any():
+                warnings.warn(FALTANTES)
+            partes.append(resumidos)
+        datos = pd.concat(partes, axis=1)
+        orden = list(self.indicadores)  # restablecer el orden en que se solicitaron los indicadores
+        datos = datos[sorted(datos.columns, key=lambda c: orden.index(c[0] if isinstance(c, tuple) else c))]
+        if not isinstance(datos.index, pd.PeriodIndex):
+            datos.index = datos.index.to_period(destino) if destino else datos.index.to_period()
+        return datos.sort_index()
+
+    def __resumidos__(self, nativas, destino):
+        """Indicadores de `ServicioWeb` cuya agregación a la frecuencia `destino` se lee de `PIEZAS`, sin calcularla
+
+        Solo se leen las de series guardadas con el mismo rango de fechas de la consulta (las series recortadas de otra
+        más larga empiezan o terminan en otras fechas, y la agregación de sus primeros y últimos períodos podría ser
+        distinta).
+        """
+        if not self.__servicio__ or self.fillna or destino not in INCREMENTALES:
+            return dict()
+
+        from .gee import FUNCS
+
+        resumidos = dict()
+        for nombre, nativa in nativas.items():
+            func = self.func.get(nombre) if isinstance(self.func, dict) else self.func
+            if func not in FUNCS or nativa not in FRECUENCIAS[FRECUENCIAS.index(destino) + 1:]:
+                continue  # la función no es de FUNCS, o la serie no tiene mayor frecuencia que `destino`
+            resumen = PIEZAS.resumen(self.__llave__(self.indicadores[nombre]), self.FechaInicio, self.FechaFinal,
+                                     destino, func, nativa)
+            if resumen is not None:
+                resumidos[nombre] = resumen
+        return resumidos
+
+    def __convertir__(self, piezas, nombres, nativa, destino):
+        """Une los indicadores de un grupo (con la misma frecuencia original) y les cambia la frecuencia, todos a la vez"""
+        if self.__servicio__:
+            grupo = pd.DataFrame({nombre: piezas[nombre] for nombre in nombres})
+            grupo = grupo.resample(nativa).mean() if nativa else grupo  # llenar los espacios en la línea de tiempo
+
+            if self.fillna:
+                # rellenar solo dentro del rango de cada indicador, como si se rellenara cada serie por separado
+                dentro = grupo.notna().cummax() & grupo.notna()[::-1].cummax()[::-1]
+                grupo = grupo.fillna(method=self.fillna).where(dentro)
+        else:
+            grupo = pd.concat([piezas[nombre] for nombre in nombres], keys=nombres, axis=1)
+
+        if destino is None or destino == nativa:  # no hace falta cambiar la frecuencia
+            return grupo
+
+        funciones = self.__funciones__(nombres)
+        if self.__servicio__ and grupo.isna().any().any():
+            warnings.warn(FALTANTES)
+        # `agg` no acepta columnas con varios niveles: se identifican por su posición y luego se restablecen
+        columnas = grupo.columns
+        posiciones = {k: funciones[c[0] if isinstance(c, tuple) else c] for k, c in enumerate(columnas)}
+        grupo = grupo.set_axis(range(len(columnas)), axis=1).resample(destino).agg(posiciones)
+        return grupo.set_axis(columnas, axis=1)
+
+    def __str__(self):
+        indicadores = ', '.join(f'{nombre}={codigo}' for nombre, codigo in self.indicadores.items())
+        pasos = f".desde('{self.FechaInicio}')" if self.FechaInicio else ''
+        pasos += f".hasta('{self.FechaFinal}')" if self.FechaFinal else ''
+        pasos += f".freq('{self.frecuencia}', {self.func!r})" if self.frecuencia else ''
+        pasos += f".rellenar('{self.fillna}')" if self.fillna else ''
+        return f"{'SW' if self.__servicio__ else 'PW'}.query({indicadores}){pasos}"
+
+    def __repr__(self):
+        return self.__str__()
@@ -11,7 +11,8 @@ import time
 import webbrowser
 import pandas as pd
 
-from .utils import findColumnTitles, fixCommas
+from .tabla import leer_tabla
+from . import transporte
 
 pd.set_option('display.width', 500)
 pd.set_option('display.max_colwidth', 120)
@@ -104,15 +105,16 @@ def downloadChart(chart, first=None, last=None, quiet=False):
 
         >>> downloadChart(138, 2011, 2015, quiet=True)
     """
-    rawdata = pd.read_html(api(chart, first, last), thousands="")[0]
-    title, subtitle, subts2 = rawdata.iloc[:3, 0]
-    if pd.notnull(subts2):
-        subtitle += ' --- %s' % subts2
+    return downloadTable(chart, first, last, quiet).to_frame()
 
-    rawdata.set_index(0, inplace=True)
-    h = findColumnTitles(rawdata)
-    rawdata.columns = rawdata.iloc[h]
-    rawdata = rawdata.iloc[h+1:].applymap(fixCommas)
+
+def downloadTable(chart, first=None, last=None, quiet=False):
+    """
+        Downloads a chart from BCCR website, as a `TablaCuadro` (title, subtitle, row and column labels and a NumPy
+        matrix of values). Same parameters as `downloadChart`.
+    """
+    table = leer_tabla(transporte.texto(api(chart, first, last)))
+    title, subtitle = table.titulo, table.subtitulo
 
     if not quiet:
         info = 'Downloading chart %s:' % chart
@@ -122,8 +124,7 @@ def downloadChart(chart, first=None, last=None, quiet=False):
         info += '\n\t' + api(chart, first, last, excel=False) + '\n'
         print(info)
 
-    rawdata._metadata = {'title': title, 'subtitle': subtitle}
-    return rawdata
+    return table
 
 
 def web(chart):
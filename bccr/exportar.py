@@ -0,0 +1,132 @@
+"""
+exportar: Funciones para guardar los datos de la interfaz gráfica como archivos, por partes
+
+La interfaz gráfica permite descargar los datos consultados en formato Excel, Stata, CSV o Parquet. En lugar de
+convertir toda la tabla en memoria (lo que duplica la memoria que usa el servidor), la función `exportar` escribe el
+archivo directamente en el disco, de `filas` en `filas`:
+
+* xlsx: con `xlsxwriter` en modo de memoria constante (cada fila se escribe en el disco apenas se completa).
+* csv: cada grupo de filas se agrega al final del archivo.
+* parquet: cada grupo de filas es un "row group" del archivo (requiere `pyarrow`).
+* dta: Stata no permite escribir por partes, por lo que se escribe toda la tabla de una vez.
+
+El archivo se escribe primero con un nombre temporal, de manera que nunca se sirve un archivo incompleto.
+
+    >>> from bccr.exportar import exportar
+    >>> exportar(datos, '/tmp/datos.xlsx')
+"""
+
+import os
+import time
+
+#: dict: Formatos de archivo disponibles, con su descripción
+FORMATOS = {'xlsx': 'Excel', 'dta': 'Stata', 'csv': 'CSV', 'parquet': 'Parquet'}
+
+
+def _partes(datos, filas):
+    """Grupos consecutivos de a lo sumo `filas` filas de `datos`"""
+    for inicio in range(0, len(datos), filas):
+        yield datos.iloc[inicio:inicio + filas]
+
+
+def _xlsx(datos, archivo, filas, hoja='datos'):
+    try:
+        import xlsxwriter
+    except ImportError:
+        raise ImportError("Para exportar a Excel se requiere el paquete xlsxwriter: pip install xlsxwriter")
+
+    libro = xlsxwriter.Workbook(archivo, {'constant_memory': True})  # en este modo, las filas se escriben en orden
+    try:
+        hoja = libro.add_worksheet(hoja)
+        hoja.write_row(0, 0, [datos.index.name or ''] + [str(col) for col in datos.columns])
+        fila = 1
+        for parte in _partes(datos, filas):
+            parte = parte.astype(object).where(parte.notna(), None)  # las celdas sin dato quedan vacías
+            for indice, valores in zip(parte.index, parte.itertuples(index=False, name=None)):
+                hoja.write_row(fila, 0, (indice,) + valores)
+                fila += 1
+    finally:
+        libro.close()
+
+
+def _csv(datos, archivo, filas):
+    with open(archivo, 'w', newline='', encoding='utf-8') as destino:
+        for k, parte in enumerate(_partes(datos, filas)):
+            parte.to_csv(destino, header=(k == 0))
+        if datos.empty:
+            datos.to_csv(destino)
+
+
+def _parquet(datos, archivo, filas):
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise ImportError("Para exportar a Parquet se requiere el paquete pyarrow: pip install pyarrow")
+
+    datos = datos.set_axis(datos.columns.astype(str), axis=1)
+    esquema = pa.Schema.from_pandas(datos.iloc[:0])
+    with pq.ParquetWriter(archivo, esquema) as destino:
+        for parte in _partes(datos, filas):
+            destino.write_table(pa.Table.from_pandas(parte, schema=esquema))
+
+
+def _dta(datos, archivo, filas):
+    datos.to_stata(archivo)
+
+
+def exportar(datos, archivo, formato=None, filas=10_000):
+    """Guardar `datos` en `archivo`, escribiéndolo por partes
+
+    Parameters
+    ----------
+    datos : pd.DataFrame
+        datos a guardar (el índice se guarda como texto en la primera columna)
+    archivo : str
+        ruta del archivo
+    formato : str, optional
+        uno de 'xlsx', 'dta', 'csv', 'parquet'. Si no se indica, se toma de la extensión de `archivo`.
+    filas : int
+        número de filas que se escriben a la vez
+
+    Returns
+    -------
+    str
+        la ruta del archivo
+    """
+    formato = formato if formato else os.path.splitext(archivo)[1].lstrip('.').lower()
+    escribir = {'xlsx': _xlsx, 'dta': _dta, 'csv': _csv, 'parquet': _parquet}.get(formato)
+    if escribir is None:
+        raise ValueError(f"Formato '{formato}' desconocido; debe ser uno de {list(FORMATOS)}")
+
+    # las fechas se guardan como texto: ni Excel ni Stata aceptan períodos (p.ej. 2020Q1) como índice
+    datos = datos.set_axis(datos.index.astype(str), axis=0)
+    temporal = f'{archivo}.{os.getpid()}.parcial'
+    # `limpiar` pudo borrar la carpeta vacía de otra consulta entre su creación y este momento
+    os.makedirs(os.path.dirname(os.path.abspath(archivo)), exist_ok=True)
+    try:
+        escribir(datos, temporal, max(1, int(filas)))
+        os.replace(temporal, archivo)
+    finally:
+        if os.path.exists(temporal):
+            os.remove(temporal)
+    return archivo
+
+
+def limpiar(carpeta, vigencia=3600):
+    """Borrar los archivos de `carpeta` creados hace más de `vigencia` segundos, y las subcarpetas vacías que no se han
+    modificado en ese tiempo"""
+    limite = time.time() - vigencia
+    for raiz, _, archivos in os.walk(carpeta, topdown=False):
+        for nombre in archivos:
+            ruta = os.path.join(raiz, nombre)
+            try:
+                if os.path.getmtime(ruta) < limite:
+                    os.remove(ruta)
+            except OSError:
+                pass  # otro proceso lo borró primero
+        try:
+            if raiz != carpeta and os.path.getmtime(raiz) < limite and not os.listdir(raiz):
+                os.rmdir(raiz)
+        except OSError:
+            pass  # otro proceso la borró, o escribió en ella
@@ -1,63 +1,21 @@
+from concurrent.futures import ThreadPoolExecutor
+
 import numpy as np
 import pandas as pd
 
-from .download import downloadChart
+from .download import downloadTable
+from .formatos import reformar
 from .scrape import loadIndicators, CHARTFREQUENCIES
-from .utils import parseQuarterYear, parseMonthYear, is_leap_year, parseSeriesFreqInputs, lowestFrequency, parseDay
-
-FIRST_OBSERVATION = {
-    'YearMonth': lambda data: data.index[0] + '/01',
-    'MonthYear': lambda data: data.columns[0] + '/01',
-    'IndicatorYear': lambda data: data.columns[0] + '/12',
-    'IndicatorQuarter': lambda data: parseQuarterYear(data.columns[0]),
-    'QuarterIndicator': lambda data: parseQuarterYear(data.index[0]),
-    'MonthIndicator': lambda data: parseMonthYear(data.index[0]),
-    'IndicatorMonth': lambda data: parseMonthYear(data.columns[0]),
-    'DayYear': lambda data: '%s/01/01' % data.columns[0],
-    'DayIndicator': lambda data: parseDay(data.index[0])
-}
-
-def parse(chart, chartFormat, name=None, first=None, last=None, freq=None, func=None, quiet=True):
-    #TODO: Add chartFormat='DayIndicator' to the possible options!!! Example chart=572
-
-    data = downloadChart(chart, first, last, quiet)
-    title = data._metadata['title']
-
-    ''' CLEAN DATA'''
-    if chartFormat == 'MonthYear' and 'total' in str(data.index[0]).lower():
-        data.drop(data.index[0], inplace=True)
-    elif chartFormat == 'DayYear':
-        nonleap = np.array([~is_leap_year(int(y)) for y in data.columns])
-        data.iloc[59, nonleap] = np.inf  # row 59 = Feb 29 (counting from zero-base)
+from .utils import parseSeriesFreqInputs, lowestFrequency
 
-    ''' GET FIRST OBSERVATION '''
-    try:
-        t0 = FIRST_OBSERVATION[chartFormat](data)
-    except:
-        raise Exception(NotImplemented)
 
+def parse(chart, chartFormat, name=None, first=None, last=None, freq=None, func=None, quiet=True):
 
-    ''' GET DATA IN TIME v. SERIES FORMAT '''
-    if chartFormat in ['IndicatorYear', 'IndicatorQuarter', 'IndicatorMonth', 'MonthYear', 'DayYear']:
-        data = data.transpose()
-
-    ''' STACK DATA '''
-    if chartFormat in ['YearMonth', 'MonthYear', 'DayYear']:
-        data = data.stack(dropna=False)
-
-    ''' REMOVE 29 FEB IN NON-LEAP YEARS '''
-    if chartFormat in ['DayYear']:
-        data = data[data != np.inf]
-
-    ''' REMOVE 29 REB IN NON-LEAP YEARS'''
-    if chartFormat in ['DayIndicator']:
-        not_a_leap_year = ~is_leap_year(np.array([int(x.split()[-1]) for x in data.index]))
-        feb29 = np.array(['29 Feb' in x for x in data.index])
-        wrong_day = feb29 & not_a_leap_year
-        data = data.iloc[~wrong_day]
+    table = downloadTable(chart, first, last, quiet)
+    title = table.titulo
 
-    ''' ADD TIME INDEX '''
-    data.index = pd.period_range(start=t0, periods=data.shape[0], freq=CHARTFREQUENCIES[chartFormat][0])
+    ''' GET DATA IN TIME v. SERIES FORMAT, WITH TIME INDEX '''
+    data = reformar(table, chartFormat)
 
     ''' RENAME TIME SERIES AND DROP MISSING VALUES '''
     if isinstance(data, pd.Series):
@@ -77,7 +35,7 @@ def parse(chart, chartFormat, name=None, first=None, last=None, freq=None, func=
     return data
 
 
-def read(series, first=None, last=None, freq=None, func=None, quiet=True):
+def read(series, first=None, last=None, freq=None, func=None, quiet=True, threads=4):
     """
         Reads BCCR charts.
         * This function allows downloading of charts of different formats in a single call.
@@ -95,6 +53,7 @@ def read(series, first=None, last=None, freq=None, func=None, quiet=True):
     freq    : Data frequency (string, default=None).
     func    : How to summarize data in lower frequency (function, default=np.mean)
     quiet   : Print download info if False, nothing if True
+    threads : Maximum number of charts downloaded simultaneously (integer, default=4)
 
     Returns
     -------
@@ -247,6 +206,8 @@ def read(series, first=None, last=None, freq=None, func=None, quiet=True):
             print('\nDownloading data with frequencies : %s !!!' % original_frequencies.unique())
             print('Returning frequency: %s\n' % freq)
 
-    return pd.concat(
-        [parse(chart, indicators[chart], name, first, last, freq, funcdict[chart], quiet) for chart, name in seriesDict.items()],
-        axis=1)
\ No newline at end of file
+    with ThreadPoolExecutor(max_workers=max(1, threads)) as executor:
+        data = list(executor.map(lambda item: parse(item[0], indicators[item[0]], item[1], first, last, freq,
+                                                    funcdict[item[0]], quiet), seriesDict.items()))
+
+    return pd.concat(data, axis=1)
\ No newline at end of file
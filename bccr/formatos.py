@@ -0,0 +1,142 @@
+"""
+formatos: Funciones para convertir los cuadros del BCCR en series de tiempo, según su formato (`chartFormat`)
+
+Cada formato de cuadro tiene su propia función ("kernel") que toma la matriz de valores de un `TablaCuadro` y
+calcula directamente, con aritmética de NumPy sobre los ordinales de los períodos, el arreglo de valores y su
+`pd.PeriodIndex`, sin transponer ni apilar tablas de pandas.
+
+Los formatos soportados son
+
+* MonthYear: meses en las filas, años en las columnas (un solo indicador)
+* YearMonth: años en las filas, meses en las columnas (un solo indicador)
+* DayYear: días del año (incluyendo 29 de febrero) en las filas, años en las columnas (un solo indicador)
+* DayIndicator: días en las filas, indicadores en las columnas
+* IndicatorYear, IndicatorQuarter, IndicatorMonth: indicadores en las filas, períodos en las columnas
+* QuarterIndicator, MonthIndicator: períodos en las filas, indicadores en las columnas
+
+    >>> from bccr.formatos import reformar
+    >>> serie = reformar(tabla, 'DayYear')
+"""
+
+import numpy as np
+import pandas as pd
+
+from .utils import is_leap_year, periodos, parseDays, parseMonthYears, parseQuarterYears, NaT_ORDINAL
+
+
+def _años(etiquetas):
+    return np.asarray(etiquetas, dtype=str).astype(int)
+
+
+def month_year(tabla):
+    """Meses en las filas (posiblemente precedidos por una fila de totales), años en las columnas"""
+    valores = tabla.valores
+    if tabla.filas.size and 'total' in tabla.filas[0].lower():
+        valores = valores[1:]
+    meses = np.arange(valores.shape[0])
+    ordinales = (_años(tabla.columnas)[:, None] - 1970) * 12 + meses
+    return valores.ravel(order='F'), periodos(ordinales.ravel(), 'M'), None
+
+
+def year_month(tabla):
+    """Años en las filas, meses en las columnas"""
+    meses = np.arange(tabla.valores.shape[1])
+    ordinales = (_años(tabla.filas)[:, None] - 1970) * 12 + meses
+    return tabla.valores.ravel(), periodos(ordinales.ravel(), 'M'), None
+
+
+def day_year(tabla):
+    """Días del año en las filas (366, incluyendo 29 de febrero), años en las columnas
+
+    La fila del 29 de febrero (fila 59, contando desde cero) se descarta en los años no bisiestos, y los días
+    posteriores se corren un día hacia atrás.
+    """
+    años = _años(tabla.columnas)
+    enero1 = (años - 1970).astype('datetime64[Y]').astype('datetime64[D]').astype('int64')
+    dias = np.arange(tabla.valores.shape[0])
+    no_bisiesto = ~is_leap_year(años)[:, None]
+
+    validos = ~((dias == 59) & no_bisiesto)
+    ordinales = enero1[:, None] + dias - ((dias > 59) & no_bisiesto)
+    return tabla.valores.T[validos], periodos(ordinales[validos], 'D'), None
+
+
+def day_indicator(tabla):
+    """Días en las filas (p.ej. '12 Set 2019'), indicadores en las columnas
+
+    Las fechas se calculan a partir de todas las etiquetas de las filas; se descartan las filas que no corresponden a
+    una fecha válida (p.ej. 29 de febrero en años no bisiestos).
+    """
+    fechas = parseDays(tabla.filas)
+    validos = ~np.isnat(fechas)
+    return tabla.valores[validos], periodos(fechas[validos].astype('int64'), 'D'), tabla.columnas
+
+
+def _periodos_etiquetas(etiquetas, chartFormat):
+    """Períodos correspondientes a las etiquetas de un cuadro (años, trimestres o meses)"""
+    if chartFormat == 'IndicatorYear':
+        años = pd.to_numeric(pd.Series(etiquetas), errors='coerce').to_numpy()
+        ordinales = np.full(años.shape, NaT_ORDINAL, dtype='int64')
+        ordinales[~np.isnan(años)] = años[~np.isnan(años)] - 1970
+        return periodos(ordinales, 'A')
+    elif chartFormat in ('IndicatorQuarter', 'QuarterIndicator'):
+        return parseQuarterYears(etiquetas)
+    else:
+        return parseMonthYears(etiquetas)
+
+
+def indicator_x(tabla, chartFormat):
+    """Indicadores en las filas, períodos (años, trimestres o meses) en las columnas"""
+    indice = _periodos_etiquetas(tabla.columnas, chartFormat)
+    validos = ~indice.isna()
+    return tabla.valores[:, validos].T, indice[validos], tabla.filas
+
+
+def x_indicator(tabla, chartFormat):
+    """Períodos (trimestres o meses) en las filas, indicadores en las columnas"""
+    indice = _periodos_etiquetas(tabla.filas, chartFormat)
+    validos = ~indice.isna()
+    return tabla.valores[validos], indice[validos], tabla.columnas
+
+
+#: dict of functions: Diccionario que asocia cada formato de cuadro con la función que lo convierte en serie de tiempo.
+#: Cada función recibe un `TablaCuadro` y devuelve (valores, índice, columnas); columnas es None si el cuadro tiene un
+#: solo indicador.
+KERNELS = {
+    'MonthYear': month_year,
+    'YearMonth': year_month,
+    'DayYear': day_year,
+    'DayIndicator': day_indicator,
+    'IndicatorYear': lambda tabla: indicator_x(tabla, 'IndicatorYear'),
+    'IndicatorQuarter': lambda tabla: indicator_x(tabla, 'IndicatorQuarter'),
+    'IndicatorMonth': lambda tabla: indicator_x(tabla, 'IndicatorMonth'),
+    'QuarterIndicator': lambda tabla: x_indicator(tabla, 'QuarterIndicator'),
+    'MonthIndicator': lambda tabla: x_indicator(tabla, 'MonthIndicator'),
+}
+
+
+def reformar(tabla, chartFormat):
+    """Convertir un cuadro del BCCR en una serie de tiempo
+
+    Parameters
+    ----------
+    tabla : TablaCuadro
+        el cuadro, leído con `bccr.tabla.leer_tabla`
+    chartFormat : str
+        formato del cuadro (ver `KERNELS`)
+
+    Returns
+    -------
+    pd.Series or pd.DataFrame
+        una serie si el cuadro tiene un solo indicador, una tabla (un indicador por columna) en caso contrario. El
+        índice es un pd.PeriodIndex. Los valores faltantes no se descartan.
+    """
+    try:
+        kernel = KERNELS[chartFormat]
+    except KeyError:
+        raise NotImplementedError(f'PaginaWeb aún no tiene soporte para cuadros con formato {chartFormat}') from None
+
+    valores, indice, columnas = kernel(tabla)
+    if columnas is None:
+        return pd.Series(valores, index=indice)
+    return pd.DataFrame(valores, index=indice, columns=pd.Index(columnas))
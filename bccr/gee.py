@@ -31,8 +31,7 @@ La forma usual de utilizar esta clase es
 
 import pandas as pd
 import numpy as np
-from anytree import Node, RenderTree
-import requests
+from anytree import Node, PreOrderIter, RenderTree
 import os
 from dataclasses import dataclass, field
 from datetime import datetime
@@ -40,6 +39,7 @@ from bs4 import BeautifulSoup
 from numpy import nan
 import re
 from .utils import parse_date_parameter, infer_frequency
+from . import transporte
 
 import warnings
 
@@ -180,7 +180,8 @@ class ServicioWeb:
 
 
         host = 'https://gee.bccr.fi.cr/Indicadores/Suscripciones/WS/wsindicadoreseconomicos.asmx/ObtenerIndicadoresEconomicos'
-        resp = requests.get(host, params)
+        # sin FechaFinal se piden los datos hasta hoy: esa fecha no forma parte de la llave de la caché ni del casete
+        resp = transporte.get(host, params, abiertos=() if FechaFinal else ('FechaFinal',))
         error_msg = f'\nNo se obtuvieron datos de indicador {Indicador}. Servidor respondio con mensaje {resp.reason}\n'
         error_msg += "Revise que este indicador efectivamente existe, o intente de nuevo la obtención de los datos."
 
@@ -196,8 +197,11 @@ class ServicioWeb:
                 datos.index = pd.to_datetime(datos.fecha, format="%Y-%m-%d")
                 return datos['valor']
 
+            transporte.marcar_faltante(resp)  # el servidor no reporta datos: no volver a consultarlo por un tiempo
             print(error_msg)
         else:
+            if 400 <= resp.status_code < 500:  # errores del servidor (5xx) pueden ser transitorios
+                transporte.marcar_faltante(resp)
             print(error_msg)
         return None
 
@@ -433,24 +437,6 @@ class ServicioWeb:
         return ind
 
 
-    def __print_node__(self,node):
-        """Imprime un árbol que representa la posición de un nodo en el esquema de cuentas.
-
-        Para uso interno de la clase.
-
-        Parameters
-        ----------
-        node: Node (anytree)
-            indicador que se quiere representar, como un nodo del catálogo de indicadores
-        Returns
-        -------
-        None :
-            El resultado se imprime a pantalla
-        """
-        lista = str(node)[12:-1].split('/')
-        for i, n in enumerate(lista):
-            print('|' + '-' * (3 * (i + 1)) + ' ' + n)
-
     def quien(self, codigo):
         """Imprime información acerca de un indicador
 
@@ -476,15 +462,76 @@ class ServicioWeb:
 
         A = self.indicadores.loc[str(codigo)]
 
-        ind = self.__hacer_arbol__(A['cuenta'][28:], self.indicadores)
         print(f"Variable {codigo} >>>")
         print(f"   Nombre      : {A['nombre']}.")
         print(f"   Descripcion : {A['descripcion']}.")
         print(f"   Unidad      : {A['Unidad']}" + (f" ({A['Medida']})." if int(A['medida']) > 2 else "."))
         print(f"   Periodicidad: {A['periodo']}.\n")
-        self.__print_node__(ind.loc[A['cuenta'][:27]].node)
+        for nivel, nombre, cdg in self.ancestros(codigo).itertuples(index=False):
+            print('|' + '-' * (3 * nivel) + ' ' + nombre + (f' [{cdg}]' if cdg else ''))
         print('\n')
 
+    @staticmethod
+    def __cuenta__(nodo):
+        """Nombre y código (None para los grupos de cuentas) de un nodo del esquema de cuentas"""
+        partes = re.fullmatch(r'(.*?)(?: \[([0-9]+)\])?', nodo.name)
+        return partes[1], partes[2]
+
+    def __nodo__(self, codigo):
+        """Nodo del esquema de cuentas del indicador con ese código"""
+        if str(codigo) not in self.indicadores.index:
+            raise KeyError(f'La variable {codigo} no aparece en la lista de indicadores.')
+        return self.indicadores.loc[str(codigo), 'node']
+
+    def ancestros(self, codigo):
+        """Cuentas superiores de un indicador en el esquema de cuentas (sin imprimir nada)
+
+        Parameters
+        ----------
+        codigo : str or int
+            código numérico del indicador
+
+        Returns
+        -------
+        pd.DataFrame
+            una fila por cuenta, desde la más general (nivel 1) hasta el indicador mismo, con columnas 'nivel',
+            'nombre' y 'codigo' (None para los grupos de cuentas, que no son indicadores)
+
+        Examples
+        --------
+        >>> from bccr import SW
+        >>> SW.ancestros(33438)
+        """
+        nodos = self.__nodo__(codigo).path[1:]  # sin la raíz 'BCCR'
+        return pd.DataFrame([(nivel, *self.__cuenta__(nodo)) for nivel, nodo in enumerate(nodos, 1)],
+                            columns=['nivel', 'nombre', 'codigo'])
+
+    def descendientes(self, codigo, *, maxlevel=9):
+        """Subcuentas de un indicador en el esquema de cuentas (sin imprimir nada)
+
+        Parameters
+        ----------
+        codigo : str or int
+            código numérico del indicador
+        maxlevel : int (=9, opcional)
+            profundidad del árbol. 1= solo ramas directas ("hijos"), 2=incluir "nietos", 3=...
+
+        Returns
+        -------
+        pd.DataFrame
+            una fila por cuenta, en el orden en que aparecen en el árbol de subcuentas, empezando por el indicador mismo
+            (nivel 0), con columnas 'nivel', 'nombre' y 'codigo'
+
+        Examples
+        --------
+        >>> from bccr import SW
+        >>> SW.descendientes(33439, maxlevel=1)
+        """
+        nodo = self.__nodo__(codigo)
+        return pd.DataFrame([(sub.depth - nodo.depth, *self.__cuenta__(sub))
+                             for sub in PreOrderIter(nodo, maxlevel=1 + maxlevel)],
+                            columns=['nivel', 'nombre', 'codigo'])
+
 
     def __nombre__(self, codigo):
         """
@@ -545,12 +592,11 @@ class ServicioWeb:
         >>> from bccr import SW
         >>> SW.subcuentas(33439)
         """
-        cta = self.indicadores.loc[str(codigo), 'node']
-        treestr = RenderTree(cta, maxlevel=1+maxlevel).by_attr()
         if arbol:
-            print(treestr)
-        
-        return re.findall('\[([0-9]+)\]', treestr)
+            cta = self.indicadores.loc[str(codigo), 'node']
+            print(RenderTree(cta, maxlevel=1+maxlevel).by_attr())
+
+        return self.descendientes(codigo, maxlevel=maxlevel)['codigo'].dropna().to_list()
 
     def datos(self, *codigos, FechaInicio=None, FechaFinal=None, func=None, freq=None, fillna=None, **indicadores):
         """
@@ -712,6 +758,28 @@ class ServicioWeb:
         # Descargar los datos
         datos = {nombre: self.__descargar__(codigo, FechaInicio, FechaFinal) for nombre, codigo in indicadores.items()}
 
+        return self.__ensamblar__(datos, indicadores, func=func, freq=freq, fillna=fillna)
+
+    def __ensamblar__(self, datos, indicadores, *, func=None, freq=None, fillna=None):
+        """Une en una sola tabla las series descargadas, cambiando su frecuencia si es necesario
+
+        Para uso interno de la clase (función `datos`) y de la interfaz gráfica, que guarda las series descargadas y
+        solo vuelve a ensamblarlas cuando cambian `func`, `freq` o `fillna`.
+
+        Parameters
+        ----------
+        datos : dict
+            pares nombre: serie, con las series tal como las devuelve `__descargar__` (None si no se descargó). Las
+            series no se modifican.
+        indicadores : dict
+            pares nombre: código (str) de los indicadores solicitados
+        func, freq, fillna :
+            ver la función `datos`
+
+        Returns
+        -------
+        pd.DataFrame
+        """
         # Desechar campos de indicadores no descargados
         datos = {nombre: df for nombre, df in datos.items() if df is not None}
 
@@ -772,6 +840,31 @@ class ServicioWeb:
         datos.index = datos.index.to_period()
         return datos
 
+    def query(self, *codigos, **indicadores):
+        """Consulta de datos que se ejecuta solo al llamar a `collect` (ver `bccr.consulta.Consulta`)
+
+        A diferencia de `datos`, el rango de fechas y la frecuencia se indican paso a paso, y las series descargadas se
+        reutilizan en consultas posteriores, aunque cambien las fechas o la frecuencia.
+
+        Parameters
+        ----------
+        codigos, indicadores :
+            los indicadores solicitados, como en la función `datos`
+
+        Returns
+        -------
+        Consulta
+
+        Examples
+        --------
+        >>> from bccr import SW
+        >>> SW.query(TPM=3541, IMAE=913).desde(2010).freq('Q', 'mean').collect()
+        """
+        from .consulta import Consulta
+
+        for codigo in codigos:
+            indicadores[self.__nombre__(codigo)] = codigo
+        return Consulta(self, {nombre: str(codigo) for nombre, codigo in indicadores.items()})
 
     def __call__(self, *args, **kwargs):
         return self.datos(*args, **kwargs)
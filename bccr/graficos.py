@@ -0,0 +1,92 @@
+"""
+graficos: Funciones para reducir el número de puntos de los gráficos de la interfaz gráfica
+
+Varias décadas de datos diarios son decenas de miles de puntos por indicador, muchos más de los que caben en la pantalla.
+Antes de graficarlos, la interfaz gráfica selecciona en cada serie a lo sumo `puntos` observaciones con el algoritmo
+"Largest Triangle Three Buckets" (LTTB), que conserva la forma de la serie (sus picos y valles). Al acercar el gráfico,
+se vuelve a hacer la selección solo en el rango visible, de manera que siempre se ve el detalle que cabe en la pantalla.
+
+    >>> from bccr.graficos import reducir
+    >>> series = reducir(datos, puntos=2000, desde='2020-01-01', hasta='2020-12-31')
+"""
+
+import numpy as np
+import pandas as pd
+
+#: int: Número predeterminado de puntos por serie en un gráfico
+PUNTOS = 2000
+
+
+def lttb(x, y, puntos):
+    """Posiciones de las observaciones seleccionadas por el algoritmo "Largest Triangle Three Buckets"
+
+    Se conservan la primera y la última observación; las demás se dividen en `puntos - 2` grupos, y de cada grupo se
+    escoge la observación que forma el triángulo más grande con la escogida en el grupo anterior y el promedio del
+    grupo siguiente.
+
+    Parameters
+    ----------
+    x, y : np.ndarray
+        coordenadas de las observaciones (sin valores faltantes), con `x` en orden ascendente
+    puntos : int
+        número de observaciones a seleccionar
+
+    Returns
+    -------
+    np.ndarray
+        posiciones (enteros, en orden ascendente) de las observaciones seleccionadas
+    """
+    n = len(x)
+    if puntos >= n or puntos < 3:
+        return np.arange(n)
+
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    grupo = (n - 2) / (puntos - 2)
+    bordes = (np.arange(puntos - 1) * grupo).astype(int) + 1  # el grupo i va de bordes[i] a bordes[i + 1]
+    bordes[-1] = n - 1
+
+    elegidos = np.empty(puntos, dtype=int)
+    elegidos[0], elegidos[-1] = 0, n - 1
+    a = 0
+    for i in range(puntos - 2):
+        inicio, fin = bordes[i], bordes[i + 1]
+        siguiente = slice(fin, bordes[i + 2]) if i + 2 < len(bordes) else slice(n - 1, n)
+        xm, ym = x[siguiente].mean(), y[siguiente].mean()
+        area = np.abs((x[a] - xm) * (y[inicio:fin] - y[a]) - (x[a] - x[inicio:fin]) * (ym - y[a]))
+        a = inicio + int(area.argmax())
+        elegidos[i + 1] = a
+    return elegidos
+
+
+def reducir(datos, puntos=PUNTOS, desde=None, hasta=None):
+    """Series de `datos` listas para graficar, con a lo sumo `puntos` observaciones cada una
+
+    Parameters
+    ----------
+    datos : pd.DataFrame
+        datos, indexados por período (o por fecha)
+    puntos : int
+        número máximo de observaciones por serie
+    desde, hasta : str or pd.Timestamp, optional
+        rango visible del gráfico. Se incluye además la observación anterior y la siguiente al rango, para que las
+        líneas lleguen hasta los bordes del gráfico.
+
+    Returns
+    -------
+    dict
+        una pd.Series (indexada por fecha, sin valores faltantes) por cada columna de `datos`
+    """
+    fechas = datos.index.to_timestamp() if isinstance(datos.index, pd.PeriodIndex) else pd.DatetimeIndex(datos.index)
+    datos = datos.set_axis(fechas, axis=0)
+
+    inicio = fechas.searchsorted(pd.Timestamp(desde)) - 1 if desde is not None else 0
+    fin = fechas.searchsorted(pd.Timestamp(hasta), side='right') + 1 if hasta is not None else len(fechas)
+    datos = datos.iloc[max(inicio, 0):fin]
+
+    series = dict()
+    for nombre in datos:
+        serie = pd.to_numeric(datos[nombre], errors='coerce').dropna()
+        dias = (serie.index - serie.index[0]) / pd.Timedelta(days=1) if len(serie) else []
+        series[nombre] = serie.iloc[lttb(np.asarray(dias), serie.to_numpy(), puntos)]
+    return series
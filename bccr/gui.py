@@ -1,23 +1,46 @@
-from jupyter_dash import JupyterDash
+import dash
+import numpy as np
 import pandas as pd
+from dash import callback_context, no_update
 from dash.dependencies import Input, Output, State
+from dash.exceptions import PreventUpdate
 from dash import dash_table
 from dash import dcc
 from dash import html
 # import bootstrap_components as dbc  #todo: sería una extensión interesante
 from dash_extensions import Download
-from dash_extensions.snippets import send_data_frame
+from dash_extensions.snippets import send_file
+from flask import abort, request, send_from_directory
 from dash.dash_table.Format import Format, Scheme
-import plotly.express as px
+import plotly.graph_objects as go
 from bccr import SW
-import io
-from contextlib import redirect_stdout
+from bccr.series import CacheSeries
+from bccr.sesiones import crear_almacen
+from bccr.tareas import Tareas, TERMINADA
+from bccr.paginacion import pagina
+from bccr.graficos import reducir
+from bccr.exportar import exportar, limpiar as limpiar_exportaciones
+from bccr.indice import IndicePrefijos
+import os
+import re
+import tempfile
+import threading
+from urllib.parse import quote
+from functools import lru_cache
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, as_completed
+import uuid
 
 from datetime import date
 
 import webbrowser
 
-DATOS_PARA_DESCARGAR = [pd.DataFrame()]
+SERIES = CacheSeries()  # series descargadas del BCCR, compartidas por todas las consultas
+SESIONES = crear_almacen()  # resultados de la última consulta de cada sesión (ver bccr.sesiones)
+TAREAS = Tareas(SESIONES)  # consultas en segundo plano (ver bccr.tareas)
+EXPORTACIONES = os.path.join(tempfile.gettempdir(), 'bccr-exportaciones')  # archivos generados para descargar
+CELDAS_DIRECTAS = 100_000  # tablas más grandes se exportan en segundo plano
+MAXIMO_CÓDIGOS = 100  # filas que se muestran en los resultados de "Buscar códigos"
 
 UNIDADES = SW.indicadores['Unidad'].value_counts().index.to_list()
 PERIODICIDAD = SW.indicadores['periodo'].value_counts().index.to_list()
@@ -25,8 +48,8 @@ PERIODICIDAD = SW.indicadores['periodo'].value_counts().index.to_list()
 
 
 
-# Esta parte controla asuntos de estética de la página
-external_stylesheets = ['https://codepen.io/chriddyp/pen/bWLwgP.css']
+# La estética de la página se define en los archivos de la carpeta `bccr/assets` (hoja de estilo y logo), que Dash
+# sirve desde el mismo servidor, sin depender de sitios externos
 
 
 
@@ -69,21 +92,31 @@ En algunas series es común que hayan brechas en la serie de datos (por ejemplo,
 de semana). Esta opción permite imputar valores a estos datos faltantes (ya sea usando el último dato disponible o el siguiente).
 Esta operación se hace antes de la agregación de datos (si se cambia la frecuencia de las series). 
 
+### Consultar datos
+Los indicadores se descargan en segundo plano: debajo del botón se muestra el avance de la consulta, y la tabla y el
+gráfico se actualizan cada vez que termina de descargarse un indicador. El botón "Cancelar" detiene la consulta.
+
 ---
 
 ## Viñetas
 ### Datos
 Presenta una tabla con los datos descargados. Puede descargar estos datos oprimiendo los botones que aparecen en la parte superior.
+Si la tabla es muy grande, el archivo se prepara en segundo plano y, cuando está listo, aparece un enlace para descargarlo.
+La tabla muestra 50 filas por página. Puede ordenarla haciendo clic en el encabezado de una columna, y filtrarla escribiendo
+una condición debajo del encabezado (por ejemplo, `> 100` en un indicador, o `2020` en la fecha).
 Además, en la parte superior de la viñeta aparece el código de Python que descarga los datos mostrados en la tabla.
 
 ### Gráfico
 Presenta un gráfico de todas las series descargadas. Puede ocultar y volver a mostrar series individuales haciendo clic a su
-nombre en la leyenda del gráfico.
+nombre en la leyenda del gráfico. Las series largas se grafican con una muestra de sus observaciones que conserva su forma;
+al acercar el gráfico (seleccionando un rango con el ratón) se muestra todo el detalle del rango seleccionado.
 
 ### Buscar códigos
 Facilita la obtención de los códigos del catálogo de indicadores del Servicio Web. La tabla resultante de buscar un término
 (palabra o frases) puede filtrarse escribiendo en la fila superior (por ejemplo, para que solo muestre indicadores como 
 porcentaje de variación, o solo indicadores mensuales).
+La búsqueda se hace mientras escribe: basta con escribir el inicio de cada palabra (por ejemplo, "prec consu"). Se muestran
+los primeros 100 resultados.
 
 ### ¿Quién?
 Permite identificar las relaciones de las cuentas, mostrando las cuentas superiores así como las subcuentas, para un código
@@ -109,254 +142,286 @@ Este paquete no es un producto oficial de BCCR. El autor lo provee para facilita
 
 
 
-app = JupyterDash(__name__, external_stylesheets=external_stylesheets, prevent_initial_callbacks=True)
-app.layout = html.Div([
-    html.Div(
-        children=[
-            html.H2('Indicadores'),
-            dash_table.DataTable(
-                id='seleccionar-indicadores',
-                columns=[
-                    {'name': 'Nombre', 'id': 'nombre', 'deletable': False, 'renamable': False},
-                    {'name': 'Código', 'id': 'código', 'deletable': False, 'renamable': False},
-                ],
-                data=[{'nombre': 'nombre_variable', 'código': ''}],
-                editable=True,
-                row_deletable=True
-            ), # fin tabla de códigos a descargar
-            html.Button('Agregar otro código', id='agregar-codigo-button', n_clicks=0),
-            html.H3('Parámetros opcionales'),
-            html.H4('Rango de fechas a consultar'),
-            dcc.DatePickerSingle(
-                id='fecha-primera-observación',
-                display_format='YYYY/MM/DD',
-                min_date_allowed=date(1950, 1, 1),
-                max_date_allowed=date(2030,12,31),
-                initial_visible_month=date(1990, 1, 1),
-                date=None #date(1990, 1, 1)
-            ), # fin fecha de inicio
-            dcc.DatePickerSingle(
-                id='fecha-última-observación',
-                display_format='YYYY/MM/DD',
-                min_date_allowed=date(1950, 1, 1),
-                max_date_allowed=date(2030,12,31),
-                initial_visible_month=date.today(), #(2021, 1, 1),
-                date=None #date.today()
-            ), # fin fecha de cierre
-            html.H4('Frecuencia de los datos'),
-            dcc.Dropdown(
-                id='frecuencia',
-                options=[
-                    {'label': 'Original', 'value': 'O'},
-                    {'label': 'Anual', 'value': 'A'},
-                    {'label': 'Semestral', 'value': '6M'},
-                    {'label': 'Trimestral', 'value': 'Q'},
-                    {'label': 'Mensual', 'value': 'M'},
-                    {'label': 'Semanal', 'value': 'W'},
-                    {'label': 'Diaria', 'value': 'D'}
-                ],
-                value='O'
-            ), # fin de Frecuencia de los datos
-            html.H4('Función para agregación'),
-            dcc.Dropdown(
-                id='func',
-                options=[
-                    {'label': '  ', 'value': 'None'},
-                    {'label': 'Promedio', 'value': 'mean'},
-                    {'label': 'Suma', 'value': 'sum'},
-                    {'label': 'Último', 'value': 'last'},
-                    {'label': 'Primero', 'value': 'first'},
-                    {'label': 'Promedio, ignorando NaN', 'value': 'nanmean'},
-                    {'label': 'Suma, ignorando NaN', 'value': 'nansum'},
-                    {'label': 'Último, ignorando NaN', 'value': 'nanlast'},
-                    {'label': 'Primero, ignorando NaN', 'value': 'nanfirst'},
-                ],
-                value='None'
-            ), # fin de función para cambiar frecuencia de los datos
-            html.H4('Rellenar datos faltantes'),
-            dcc.Dropdown(
-                id='fillna',
-                options=[
-                    {'label': 'No', 'value': 'no'},
-                    {'label': 'Usar último disponible', 'value': 'ffill'},
-                    {'label': 'Usar próximo disponible', 'value': 'bfill'},
-                ],
-                value='no'
-            ), # fin de función para cambiar frecuencia de los datos
-            html.Button('Consultar datos', id='consultar-datos-button', n_clicks=0,
-                        style={'width': '80%', 'font-size': '1.25em', 'margin': '40px',
-                               'color':'white', 'background-color': 'OrangeRed'}),
-            html.Img(src='https://randall-romero.github.io/econometria/_static/r2-logo.png',width='80%', style={'margin-left': '40px'}),
-        ],
-        style={'width': '20%', 'display': 'inline-block', 'background-color': 'AliceBlue'}
-    ), # fin panel controles
-    html.Div( children=[
-                 dcc.Tabs([
-                     # Panel 1: TABLA DE DATOS================================================================
-                     dcc.Tab(label='Datos',
-                             children=[
-                                 dcc.Textarea(id='comando',
-                                              value='Acá aparecerá el código que descarga sus datos',
-                                              readOnly=True,
-                                              style={'width': '100%', 'font-size': '1.5em',
-                                                     'color':'white', 'background-color': 'LightSlateGray'},
-                                              ),
-                                 html.Table(children=[
-                                     html.Tr(children=[
-                                         html.Td(dcc.Markdown("Para descargar los datos ⇒")),
-                                         html.Td(dcc.Input(id='file-name', type='text', value='nombre-de-archivo', size='16')),
-                                         html.Td([html.Button("Download Excel", id='btn-xlsx'),
-                                                  Download(id="download-dataframe-xlsx")]),
-                                         html.Td([html.Button("Download Stata", id='btn-dta'),
-                                                  Download(id="download-dataframe-dta")]),
-                                         html.Td([html.Button("Download CSV", id='btn-csv'),
-                                                  Download(id="download-dataframe-csv")]),
-                                     ])
-                                 ]),
-                                 dash_table.DataTable(
-                                     id='datos-descargados',
-                                     editable=False,
-                                     row_deletable=False,
-                                     style_as_list_view=True,
-                                 )
-                             ],
-                             ),
-                     # PANEL 2:  GRÁFICO======================================================================
-                     dcc.Tab(label='Gráfico',
-                             children=[
-                                 dcc.Graph(id='gráfico-datos'),
-                                 dcc.Markdown(
-                                     """
-                                     **Nota:** Si los indicadores que descarga tienen una escala numérica muy
-                                     distinta, será difícil apreciar algunos de ellos. En este caso puede ocultar
-                                     y mostrar indicadores haciendo clic en la leyenda.
-                                     """
+def diseño():
+    """Diseño de la página; se evalúa cada vez que se carga la página (p.ej., para actualizar la fecha de hoy)"""
+    return html.Div([
+        dcc.Store(id='sesión', storage_type='session'),  # identificador de la sesión (uno por pestaña del navegador)
+        html.Div(
+            children=[
+                html.H2('Indicadores'),
+                dash_table.DataTable(
+                    id='seleccionar-indicadores',
+                    columns=[
+                        {'name': 'Nombre', 'id': 'nombre', 'deletable': False, 'renamable': False},
+                        {'name': 'Código', 'id': 'código', 'deletable': False, 'renamable': False},
+                    ],
+                    data=[{'nombre': 'nombre_variable', 'código': ''}],
+                    editable=True,
+                    row_deletable=True
+                ), # fin tabla de códigos a descargar
+                html.Button('Agregar otro código', id='agregar-codigo-button', n_clicks=0),
+                html.H3('Parámetros opcionales'),
+                html.H4('Rango de fechas a consultar'),
+                dcc.DatePickerSingle(
+                    id='fecha-primera-observación',
+                    display_format='YYYY/MM/DD',
+                    min_date_allowed=date(1950, 1, 1),
+                    max_date_allowed=date(2030,12,31),
+                    initial_visible_month=date(1990, 1, 1),
+                    date=None #date(1990, 1, 1)
+                ), # fin fecha de inicio
+                dcc.DatePickerSingle(
+                    id='fecha-última-observación',
+                    display_format='YYYY/MM/DD',
+                    min_date_allowed=date(1950, 1, 1),
+                    max_date_allowed=date(2030,12,31),
+                    initial_visible_month=date.today(), #(2021, 1, 1),
+                    date=None #date.today()
+                ), # fin fecha de cierre
+                html.H4('Frecuencia de los datos'),
+                dcc.Dropdown(
+                    id='frecuencia',
+                    options=[
+                        {'label': 'Original', 'value': 'O'},
+                        {'label': 'Anual', 'value': 'A'},
+                        {'label': 'Semestral', 'value': '6M'},
+                        {'label': 'Trimestral', 'value': 'Q'},
+                        {'label': 'Mensual', 'value': 'M'},
+                        {'label': 'Semanal', 'value': 'W'},
+                        {'label': 'Diaria', 'value': 'D'}
+                    ],
+                    value='O'
+                ), # fin de Frecuencia de los datos
+                html.H4('Función para agregación'),
+                dcc.Dropdown(
+                    id='func',
+                    options=[
+                        {'label': '  ', 'value': 'None'},
+                        {'label': 'Promedio', 'value': 'mean'},
+                        {'label': 'Suma', 'value': 'sum'},
+                        {'label': 'Último', 'value': 'last'},
+                        {'label': 'Primero', 'value': 'first'},
+                        {'label': 'Promedio, ignorando NaN', 'value': 'nanmean'},
+                        {'label': 'Suma, ignorando NaN', 'value': 'nansum'},
+                        {'label': 'Último, ignorando NaN', 'value': 'nanlast'},
+                        {'label': 'Primero, ignorando NaN', 'value': 'nanfirst'},
+                    ],
+                    value='None'
+                ), # fin de función para cambiar frecuencia de los datos
+                html.H4('Rellenar datos faltantes'),
+                dcc.Dropdown(
+                    id='fillna',
+                    options=[
+                        {'label': 'No', 'value': 'no'},
+                        {'label': 'Usar último disponible', 'value': 'ffill'},
+                        {'label': 'Usar próximo disponible', 'value': 'bfill'},
+                    ],
+                    value='no'
+                ), # fin de función para cambiar frecuencia de los datos
+                html.Button('Consultar datos', id='consultar-datos-button', n_clicks=0,
+                            style={'width': '80%', 'font-size': '1.25em', 'margin': '40px',
+                                   'color':'white', 'background-color': 'OrangeRed'}),
+                html.Button('Cancelar', id='cancelar-consulta-button', n_clicks=0, style={'margin-left': '40px'}),
+                html.Div(id='avance', style={'margin': '10px 40px'}),  # avance de la consulta en curso
+                dcc.Interval(id='avance-intervalo', interval=1000, disabled=True),
+                dcc.Store(id='versión-mostrada'),  # última versión de los datos parciales que se muestra en la página
+                html.Img(src=dash.get_asset_url('r2-logo.png'), width='80%', style={'margin-left': '40px'}),
+            ],
+            style={'width': '20%', 'display': 'inline-block', 'background-color': 'AliceBlue'}
+        ), # fin panel controles
+        html.Div( children=[
+                     dcc.Tabs([
+                         # Panel 1: TABLA DE DATOS================================================================
+                         dcc.Tab(label='Datos',
+                                 children=[
+                                     dcc.Textarea(id='comando',
+                                                  value='Acá aparecerá el código que descarga sus datos',
+                                                  readOnly=True,
+                                                  style={'width': '100%', 'font-size': '1.5em',
+                                                         'color':'white', 'background-color': 'LightSlateGray'},
+                                                  ),
+                                     html.Table(children=[
+                                         html.Tr(children=[
+                                             html.Td(dcc.Markdown("Para descargar los datos ⇒")),
+                                             html.Td(dcc.Input(id='file-name', type='text', value='nombre-de-archivo', size='16')),
+                                             html.Td(html.Button("Download Excel", id='btn-xlsx')),
+                                             html.Td(html.Button("Download Stata", id='btn-dta')),
+                                             html.Td(html.Button("Download CSV", id='btn-csv')),
+                                             html.Td(html.Button("Download Parquet", id='btn-parquet')),
+                                             html.Td([html.Div(id='exportación'),  # avance de las exportaciones grandes
+                                                      Download(id='descargar-archivo'),
+                                                      dcc.Interval(id='exportar-intervalo', interval=1000, disabled=True)]),
+                                         ])
+                                     ]),
+                                     dash_table.DataTable(
+                                         id='datos-descargados',
+                                         editable=False,
+                                         row_deletable=False,
+                                         style_as_list_view=True,
+                                         # solo se envían al navegador las filas de la página visible (ver bccr.paginacion)
+                                         page_action='custom',
+                                         page_current=0,
+                                         page_size=50,
+                                         sort_action='custom',
+                                         sort_mode='multi',
+                                         sort_by=[],
+                                         filter_action='custom',
+                                         filter_query='',
+                                     )
+                                 ],
                                  ),
-                             ],
-                             ),
-                     # PANEL 3: BUSCAR CÓDIGOS================================================================
-                     dcc.Tab(label='Buscar códigos',
-                             children=[
-                                 dcc.Input(
-                                     id='buscar-códigos',
-                                     placeholder='Escriba acá los términos que desea buscar...',
-                                     value='',
-                                     style={'padding': 10, 'width': '25%'}
+                         # PANEL 2:  GRÁFICO======================================================================
+                         dcc.Tab(label='Gráfico',
+                                 children=[
+                                     dcc.Graph(id='gráfico-datos'),
+                                     dcc.Markdown(
+                                         """
+                                         **Nota:** Si los indicadores que descarga tienen una escala numérica muy
+                                         distinta, será difícil apreciar algunos de ellos. En este caso puede ocultar
+                                         y mostrar indicadores haciendo clic en la leyenda.
+                                         """
+                                     ),
+                                 ],
                                  ),
-                                 dcc.Dropdown(
-                                    id='filtrar-unidades',
-                                    options=[dict(label= valor, value=valor) for valor in [''] + UNIDADES],
-                                    value='',
-                                    style={'padding': 10, 'width': '25%', "display": "inline-block"}
-                                 ), # fin de función para filtrar unidades
-                                 dcc.Dropdown(
-                                        id='filtrar-periodos',
-                                        options=[dict(label= valor, value=valor) for valor in [''] + PERIODICIDAD],
+                         # PANEL 3: BUSCAR CÓDIGOS================================================================
+                         dcc.Tab(label='Buscar códigos',
+                                 children=[
+                                     dcc.Input(
+                                         id='buscar-códigos',
+                                         placeholder='Escriba acá los términos que desea buscar...',
+                                         value='',
+                                         debounce=0.3,  # buscar cuando el usuario deja de escribir por un momento
+                                         style={'padding': 10, 'width': '25%'}
+                                     ),
+                                     dcc.Dropdown(
+                                        id='filtrar-unidades',
+                                        options=[dict(label= valor, value=valor) for valor in [''] + UNIDADES],
                                         value='',
                                         style={'padding': 10, 'width': '25%', "display": "inline-block"}
-                                    ), # fin de función para filtrar periodos
-                                 dcc.Markdown('Tipo de búsqueda'),
-                                 dcc.RadioItems(
-                                     id='tipo-búsqueda',
-                                     options=[
-                                         {'label': 'frase exacta', 'value': 'frase'},
-                                         {'label': 'todas las palabras', 'value': 'todos'},
-                                         {'label': 'alguna de las palabras', 'value': 'algunos'}
-                                     ],
-                                     value='todos',
-                                     labelStyle={'display': 'inline-block'}
-                                 ),
-                                 dcc.Markdown('Incluir subcuentas'),
-                                 dcc.RadioItems(
-                                     id='incluir-subcuentas',
-                                     options=[
-                                         {'label': 'No', 'value': 'No'},
-                                         {'label': 'Sí', 'value': 'Sí'}
-                                     ],
-                                     value='No',
-                                     labelStyle={'display': 'inline-block'}
-                                 ),
-                                 html.Button('Buscar', id='buscar-códigos-button', n_clicks=0),
-                                 dcc.Textarea(id='buscar-mensaje',
-                                              value='Ingrese los términos deseados en el cuadro de arriba',
-                                              readOnly=True,
-                                              style={'width': '100%', 'font-size': '1.5em'},
-                                              ),
-                                 dash_table.DataTable(
-                                     id='lista-códigos',
-                                     editable=False,
-                                     sort_action='native',
-                                     style_cell={'textAlign': 'left'},
-                                     row_deletable=False,
-                                     filter_action='native',
-                                     columns=[
-                                         {'name': 'Código', 'id': 'codigo'},
-                                         #{'name': 'Descripción', 'id': 'descripcion'}, ya no se reporta
-                                         {'name': 'Ruta', 'id': 'DESCRIPCION'},
-                                         {'name': 'Unidad', 'id': 'Unidad'},
-                                         {'name': 'Medida', 'id': 'Medida'},
-                                         {'name': 'Periodicidad', 'id': 'periodo'}
-                                     ]
-                                 )
-                             ],
-                             ),
-                     # PANEL 4: QUIÉN ES ESTE INDICADOR================================================
-                     dcc.Tab(label='¿Quién?',
-                             children=[
-                                 dcc.Markdown("Código de cuenta ⇒"),
-                                 dcc.Input(
-                                     id='quién-es-código',
-                                     placeholder='Código...',
-                                     value='',
-                                     style={'padding': 10, 'width': '10%'}
-                                 ),
-                                 dcc.Markdown("Número de subniveles en subcuentas ⇒"),
-                                 dcc.Input(
-                                     id='profundidad-arbol',
-                                     placeholder='(opcional: 1,2,...8)',
-                                     value='',
-                                     style={'padding': 10, 'width': '10%'}
+                                     ), # fin de función para filtrar unidades
+                                     dcc.Dropdown(
+                                            id='filtrar-periodos',
+                                            options=[dict(label= valor, value=valor) for valor in [''] + PERIODICIDAD],
+                                            value='',
+                                            style={'padding': 10, 'width': '25%', "display": "inline-block"}
+                                        ), # fin de función para filtrar periodos
+                                     dcc.Markdown('Tipo de búsqueda'),
+                                     dcc.RadioItems(
+                                         id='tipo-búsqueda',
+                                         options=[
+                                             {'label': 'frase exacta', 'value': 'frase'},
+                                             {'label': 'todas las palabras', 'value': 'todos'},
+                                             {'label': 'alguna de las palabras', 'value': 'algunos'}
+                                         ],
+                                         value='todos',
+                                         labelStyle={'display': 'inline-block'}
+                                     ),
+                                     dcc.Markdown('Incluir subcuentas'),
+                                     dcc.RadioItems(
+                                         id='incluir-subcuentas',
+                                         options=[
+                                             {'label': 'No', 'value': 'No'},
+                                             {'label': 'Sí', 'value': 'Sí'}
+                                         ],
+                                         value='No',
+                                         labelStyle={'display': 'inline-block'}
+                                     ),
+                                     html.Button('Buscar', id='buscar-códigos-button', n_clicks=0),
+                                     dcc.Textarea(id='buscar-mensaje',
+                                                  value='Ingrese los términos deseados en el cuadro de arriba',
+                                                  readOnly=True,
+                                                  style={'width': '100%', 'font-size': '1.5em'},
+                                                  ),
+                                     dash_table.DataTable(
+                                         id='lista-códigos',
+                                         editable=False,
+                                         sort_action='native',
+                                         style_cell={'textAlign': 'left'},
+                                         row_deletable=False,
+                                         filter_action='native',
+                                         columns=[
+                                             {'name': 'Código', 'id': 'codigo'},
+                                             #{'name': 'Descripción', 'id': 'descripcion'}, ya no se reporta
+                                             {'name': 'Ruta', 'id': 'DESCRIPCION'},
+                                             {'name': 'Unidad', 'id': 'Unidad'},
+                                             {'name': 'Medida', 'id': 'Medida'},
+                                             {'name': 'Periodicidad', 'id': 'periodo'}
+                                         ]
+                                     )
+                                 ],
                                  ),
-                                 html.Button('Buscar', id='quién-button', n_clicks=0),
-                                 html.Div(
-                                     children=[
-                                         html.H4('Ubicación de cuenta en el catálogo'),
-                                         dcc.Textarea(id='quién',
-                                                      value='',
-                                                      readOnly=True,
-                                                      style={'width': '100%', 'font-size': '1.25em', 'height': 300},)
-                                     ],
-                                     style={'width': '80%'}
-                                 ),
-                                 html.Div(
-                                     children=[
-                                         html.H4('Subcuentas en el catálogo'),
-                                         dcc.Textarea(id='subcuentas',
-                                                      value='',
-                                                      readOnly=True,
-                                                      style={'width': '100%', 'font-size': '1.25em', 'height': 300},)
-                                     ],
-                                     style={'width': '80%'}
-                                 ),
-                             ],
-                     ),
-                     # PANEL 5: AYUDA======================================================================
-                     dcc.Tab(label='Ayuda',
-                             children=[
-                                 dcc.Markdown(ayuda)
-                             ],
-                             ), #final tab 'Trend'
-                     ]
-                 )
-        ],
-        style={'width': '80%','float': 'right', 'display': 'inline-block'}
-    )
-    ]
-) # fin app layout
-
-
-
-@app.callback(
+                         # PANEL 4: QUIÉN ES ESTE INDICADOR================================================
+                         dcc.Tab(label='¿Quién?',
+                                 children=[
+                                     dcc.Markdown("Código de cuenta ⇒"),
+                                     dcc.Input(
+                                         id='quién-es-código',
+                                         placeholder='Código...',
+                                         value='',
+                                         style={'padding': 10, 'width': '10%'}
+                                     ),
+                                     dcc.Markdown("Número de subniveles en subcuentas ⇒"),
+                                     dcc.Input(
+                                         id='profundidad-arbol',
+                                         placeholder='(opcional: 1,2,...8)',
+                                         value='',
+                                         style={'padding': 10, 'width': '10%'}
+                                     ),
+                                     html.Button('Buscar', id='quién-button', n_clicks=0),
+                                     html.Div(
+                                         children=[
+                                             html.H4('Ubicación de cuenta en el catálogo'),
+                                             dcc.Textarea(id='quién',
+                                                          value='',
+                                                          readOnly=True,
+                                                          style={'width': '100%', 'font-size': '1.25em', 'height': 300},)
+                                         ],
+                                         style={'width': '80%'}
+                                     ),
+                                     html.Div(
+                                         children=[
+                                             html.H4('Subcuentas en el catálogo'),
+                                             dcc.Textarea(id='subcuentas',
+                                                          value='',
+                                                          readOnly=True,
+                                                          style={'width': '100%', 'font-size': '1.25em', 'height': 300},)
+                                         ],
+                                         style={'width': '80%'}
+                                     ),
+                                 ],
+                         ),
+                         # PANEL 5: AYUDA======================================================================
+                         dcc.Tab(label='Ayuda',
+                                 children=[
+                                     dcc.Markdown(ayuda)
+                                 ],
+                                 ), #final tab 'Trend'
+                         ]
+                     )
+            ],
+            style={'width': '80%','float': 'right', 'display': 'inline-block'}
+        )
+        ]
+    ) # fin app layout
+
+
+CALLBACKS = []  # (args, kwargs, función) de cada callback; `crear_app` los registra en cada aplicación
+
+
+def callback(*args, **kwargs):
+    """Definir un callback, que `crear_app` registra en cada aplicación que crea (con `app.callback`, no con el
+    registro global de Dash, que solo sirve a la primera aplicación que atiende una consulta). Como en la aplicación
+    original (prevent_initial_callbacks=True), los callbacks no se ejecutan al cargar la página, salvo que se indique
+    otra cosa"""
+    kwargs.setdefault('prevent_initial_call', True)
+
+    def definir(funcion):
+        CALLBACKS.append((args, kwargs, funcion))
+        return funcion
+    return definir
+
+
+@callback(
     Output('seleccionar-indicadores', 'data'),
     Input('agregar-codigo-button', 'n_clicks'),
     State('seleccionar-indicadores', 'data'),
@@ -368,7 +433,33 @@ def add_row(n_clicks, rows, columns):
 
 
 # FUNCIÓN PARA CONSULTAR QUIÉN ES UNA CUENTA
-@app.callback(
+def cuenta(nombre, codigo):
+    """Nombre de una cuenta en el árbol, con su código si es un indicador"""
+    return nombre + (f' [{codigo}]' if codigo else '')
+
+
+@lru_cache(maxsize=1024)
+def texto_quien(código):
+    """Descripción de un indicador y su posición en el esquema de cuentas (como `SW.quien`, sin imprimirla)"""
+    A = SW.indicadores.loc[código]
+    texto = f"Variable {código} >>>\n"
+    texto += f"   Nombre      : {A['nombre']}.\n"
+    texto += f"   Descripcion : {A['descripcion']}.\n"
+    texto += f"   Unidad      : {A['Unidad']}" + (f" ({A['Medida']}).\n" if int(A['medida']) > 2 else ".\n")
+    texto += f"   Periodicidad: {A['periodo']}.\n\n"
+    texto += '\n'.join('|' + '-' * (3 * nivel) + ' ' + cuenta(nombre, codigo)
+                       for nivel, nombre, codigo in SW.ancestros(código).itertuples(index=False))
+    return texto
+
+
+@lru_cache(maxsize=1024)
+def texto_subcuentas(código, maxlevel):
+    """Árbol de subcuentas de un indicador (como `SW.subcuentas`, sin imprimirlo)"""
+    return '\n'.join('    ' * (nivel - 1) + ('└── ' if nivel else '') + cuenta(nombre, codigo)
+                     for nivel, nombre, codigo in SW.descendientes(código, maxlevel=maxlevel).itertuples(index=False))
+
+
+@callback(
     Output('quién', 'value'),
     Output('subcuentas', 'value'),
     Input('quién-button', 'n_clicks'),
@@ -379,14 +470,8 @@ def quién_subcuentas(n_clicks, código, maxlevel):
 
     if código in SW.indicadores.index:
         maxlevel = int(maxlevel if maxlevel else 9)
-
-        with io.StringIO() as buf, redirect_stdout(buf):
-            SW.quien(código)
-            quien = buf.getvalue()
-
-        with io.StringIO() as buf, redirect_stdout(buf):
-            SW.subcuentas(código, maxlevel=maxlevel)
-            subcuentas = buf.getvalue()
+        quien = texto_quien(código)
+        subcuentas = texto_subcuentas(código, maxlevel)
     elif código == '':
         quien = subcuentas = f'Escriba el código deseado en el espacio de arriba.'
     else:
@@ -401,28 +486,58 @@ def quién_subcuentas(n_clicks, código, maxlevel):
 
 
 # FUNCIÓN PARA CONSULTAR EL CATÁLOGO (Buscar códigos)
-@app.callback(
+@lru_cache(maxsize=1)
+def indice_catalogo():
+    """Índice de las palabras de las descripciones del catálogo de indicadores (se construye una sola vez). Como en
+    SW.buscar, solo se usa la columna 'DESCRIPCION': la columna 'descripcion' parece ser inconsistente"""
+    return IndicePrefijos(SW.indicadores['DESCRIPCION'].astype(str))
+
+
+@lru_cache(maxsize=1024)
+def buscar_códigos(frase, tipo, unidad, periodo, subcuentas):
+    """Primeros `MAXIMO_CÓDIGOS` resultados de una búsqueda en el catálogo, listos para la tabla, y el número total de
+    resultados. Se guardan las búsquedas recientes: mientras el usuario escribe, cada prefijo de la frase es una
+    búsqueda, que comparten todos los usuarios"""
+    catalogo = SW.indicadores
+    mascara = np.ones(len(catalogo), dtype=bool)
+    if unidad:
+        mascara &= (catalogo['Unidad'] == unidad).to_numpy()
+    if periodo:
+        mascara &= (catalogo['periodo'] == periodo).to_numpy()
+    posiciones, total = indice_catalogo().buscar(frase, tipo, mascara=mascara)
+
+    # filtrar subcuentas
+    if not subcuentas and total:
+        nodos = catalogo['node'].to_numpy()[posiciones]
+        presentes = set(nodos)
+        posiciones = posiciones[[nodo.parent not in presentes for nodo in nodos]]
+        total = len(posiciones)
+
+    resultados = catalogo.iloc[posiciones[:MAXIMO_CÓDIGOS]]
+    resultados = resultados.assign(DESCRIPCION=resultados['DESCRIPCION'].apply(str).str.slice(12, -1))  # abreviar ruta
+    tabla = resultados[['DESCRIPCION', 'Unidad', 'Medida', 'periodo']].reset_index().to_dict(orient='records')
+    return tabla, total
+
+
+@callback(
     Output('lista-códigos', 'data'),
     Output('buscar-mensaje', 'value'),
+    Input('buscar-códigos', 'value'),
     Input('buscar-códigos-button', 'n_clicks'),
-    State('buscar-códigos', 'value'),
-    State('tipo-búsqueda', 'value'),
-    State('filtrar-unidades', 'value'),
-    State('filtrar-periodos', 'value'),
-    State('incluir-subcuentas', 'value'),
+    Input('tipo-búsqueda', 'value'),
+    Input('filtrar-unidades', 'value'),
+    Input('filtrar-periodos', 'value'),
+    Input('incluir-subcuentas', 'value'),
 )
-def mostrar_códigos(n_clicks, frase, tipo,unidades,periodos,subcuentas):
+def mostrar_códigos(frase, n_clicks, tipo,unidades,periodos,subcuentas):
     subcuentas = (subcuentas=='Sí')
 
-    if frase:
-        # Acomodar la lista de indicadores
-        resultados = SW.buscar(**{tipo: frase}, Unidad=unidades, periodo=periodos, subcuentas=subcuentas)
-
-        # Acomodar los datos descargados como un diccionario, para que lo lea dash
-        tabla = resultados.reset_index().to_dict(orient='records')
-        nrecords = resultados.shape[0]
+    if frase and frase.strip():
+        tabla, nrecords = buscar_códigos(frase.strip(), tipo, unidades or None, periodos or None, subcuentas)
         msg = f"Hay {nrecords} indicadores que satisface{'n' if nrecords > 1 else ''} su búsqueda." if nrecords \
             else 'No se encontró ningún indicador; intente la búsqueda con otros términos.'
+        if nrecords > len(tabla):
+            msg += f" Se muestran los primeros {len(tabla)}; agregue términos para precisar la búsqueda."
 
         # dar los resultados
         return tabla, msg
@@ -433,115 +548,314 @@ def mostrar_códigos(n_clicks, frase, tipo,unidades,periodos,subcuentas):
 
 
 # FUNCIÓN PARA CONSULTAR LOS DATOS DEL BCCR (Datos y Gráfico)
-@app.callback(
-    Output('gráfico-datos', 'figure'),
+def descargar_datos(avance, indicadores, FechaInicio, FechaFinal, freq, func, fillna):
+    """Tarea en segundo plano: descarga los indicadores simultáneamente, guardando en la sesión los datos parciales
+    cada vez que termina uno de ellos"""
+    total = len(indicadores)
+    avance.informar(0, total, f'Descargando {total} indicador{"es" if total > 1 else ""}...')
+
+    series = dict()
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        # las series se guardan tal como se descargan: si solo cambia freq, func o fillna, no se consulta al BCCR
+        futuros = {executor.submit(SERIES.obtener, codigo, FechaInicio, FechaFinal, SW.__descargar__): nombre
+                   for nombre, codigo in indicadores.items()}
+        for futuro in as_completed(futuros):
+            if avance.cancelado():
+                for pendiente in futuros:
+                    pendiente.cancel()
+                return
+            nombre = futuros[futuro]
+            series[nombre] = futuro.result()
+            listos = {nombre: codigo for nombre, codigo in indicadores.items() if nombre in series}
+            datos = SW.__ensamblar__({nombre: series[nombre] for nombre in listos}, listos,
+                                     func=func, freq=freq, fillna=fillna)
+            estado = 'no disponible' if series[nombre] is None else 'descargado'
+            avance.informar(len(series), total, f'{nombre}: {estado} ({len(series)} de {total})', datos=datos)
+
+
+def presentar(datos):
+    """Columnas de la tabla de datos, para mostrar los datos en la página (las filas se envían por página, en
+    `paginar_datos`, y el gráfico se hace en `graficar_datos`)"""
+    # Especificar las columnas de la tabla
+    columns = [{'name': 'Fecha', 'id': 'fecha' ,'deletable': False, 'renamable': False}]
+    columns += [{'name': col, 'id': col ,'deletable': False, 'renamable': False, 'type':'numeric', 'format':Format(precision=4, scheme=Scheme.fixed)} for col in datos]
+    return columns
+
+
+@callback(
     Output('datos-descargados', 'columns'),
-    Output('datos-descargados', 'data'),
     Output('comando', 'value'),
+    Output('sesión', 'data'),
+    Output('avance-intervalo', 'disabled'),
+    Output('avance', 'children'),
+    Output('versión-mostrada', 'data'),
     Input('consultar-datos-button', 'n_clicks'),
+    Input('avance-intervalo', 'n_intervals'),
+    Input('cancelar-consulta-button', 'n_clicks'),
     State('seleccionar-indicadores', 'data'),
     State('fecha-primera-observación', 'date'),
     State('fecha-última-observación', 'date'),
     State('frecuencia', 'value'),
     State('func', 'value'),
     State('fillna', 'value'),
+    State('sesión', 'data'),
+    State('versión-mostrada', 'data'),
 )
-def display_output(n_clicks, rows, FechaInicio, FechaFinal, freq, func, fillna):
+def display_output(n_clicks, n_intervals, n_cancelar, rows, FechaInicio, FechaFinal, freq, func, fillna, sesion, version):
+    """Inicia la consulta (botón 'Consultar datos'), la cancela (botón 'Cancelar'), o muestra su avance (cada vez que
+    se activa el intervalo de actualización, mientras la consulta está en curso)"""
+    activado = callback_context.triggered[0]['prop_id'].split('.')[0] if callback_context.triggered else ''
+    sesion = sesion if sesion else uuid.uuid4().hex
 
+    if activado == 'consultar-datos-button':
+        # Acomodar la lista de indicadores
+        indicadores = dict()
+        for item in rows:
+            indicadores[item['nombre']] = item['código']
 
-    # Acomodar la lista de indicadores
-    indicadores = dict()
-    for item in rows:       
-        indicadores[item['nombre']] = item['código']
+        # Interpretar parámetros freq y fillna
+        if freq == 'O':
+            freq = None
 
-    # Interpretar parámetros freq y fillna
-    if freq == 'O':
-        freq = None
+        if fillna == 'no':
+            fillna = None
 
-    if fillna == 'no':
-        fillna = None
+        if func == 'None':
+            func = None
 
-    if func == 'None':
-        func = None
+        if '' in indicadores.values():  # no consultar al BCCR al arrancar
+            datos = pd.DataFrame(columns=indicadores.keys())
+            SESIONES.guardar(sesion, 'datos', datos)
+            return presentar(datos), "SW()", sesion, True, '', uuid.uuid4().hex
 
-    # Descargar los datos del BCCR
-    #busqueda_str = "from bccr import SW\n"
-    if '' in indicadores.values():  # no consultar al BCCR al arrancar
-        datos = pd.DataFrame(columns=indicadores.keys())
-        busqueda_str = "SW()"
-    else:
         busqueda_str = "SW("
         busqueda_str += ', '.join([f'{key}={val}' for key, val in indicadores.items()]) + ', '
-
-
         busqueda_str += f"FechaInicio='{FechaInicio}', " if FechaInicio else ""
         busqueda_str += f"FechaFinal='{FechaFinal}', " if FechaFinal else ""
         busqueda_str += f"func='{func}', " if func else ""
         busqueda_str += f"freq='{freq}', " if freq else ""
         busqueda_str += f"fillna='{fillna}')" if fillna else ")"
         busqueda_str = busqueda_str[:-3] + ")" if busqueda_str[-3:] == ', )' else busqueda_str
-        datos = SW(FechaInicio=FechaInicio, FechaFinal=FechaFinal, func=func, freq=freq, fillna=fillna, **indicadores)
 
-    DATOS_PARA_DESCARGAR[0] = datos  # para poder descargarlos después
-
-    # Hacer la figura
-    if datos.shape[0]:
-        fig = px.line(datos, x=datos.index.to_timestamp(), y=datos.columns, height=800)
+        # Descargar los datos del BCCR en segundo plano; la página consulta el avance periódicamente
+        indicadores = {nombre: str(codigo) for nombre, codigo in indicadores.items()}
+        TAREAS.iniciar(sesion, descargar_datos, indicadores, FechaInicio, FechaFinal, freq, func, fillna)
+        return no_update, busqueda_str, sesion, False, 'Iniciando la consulta...', None
+
+    if activado == 'cancelar-consulta-button':
+        TAREAS.cancelar(sesion)
+
+    # Mostrar el avance de la consulta, solo si hay algo nuevo
+    estado = TAREAS.estado(sesion)
+    if estado is None:  # el estado de la consulta venció: dejar de consultar su avance
+        return no_update, no_update, no_update, True, no_update, no_update
+    terminada = estado['estado'] in TERMINADA
+    marca = f"{estado['id']}:{estado['version']}"  # identifica los datos guardados en la sesión
+    if marca == version:
+        if not terminada:
+            raise PreventUpdate
+        return no_update, no_update, no_update, True, no_update, no_update
+
+    datos = SESIONES.leer(sesion, 'datos', pd.DataFrame())
+    total = f" de {estado['total']}" if estado['total'] else ''
+    mensaje = f"{estado['mensaje']}" if terminada else f"[{estado['hechos']}{total}] {estado['mensaje']}"
+    if estado['estado'] == 'cancelada':
+        mensaje = 'Consulta cancelada: ' + mensaje
+    return presentar(datos), no_update, no_update, terminada, mensaje, marca
+
+
+MARCAS = OrderedDict()  # sesión -> (marca, datos, bytes): la última versión leída de los datos de cada sesión
+MARCAS_PRESUPUESTO = 100 * 2**20  # bytes que pueden ocupar los datos guardados en MARCAS
+_MARCAS_CANDADO = threading.Lock()
+
+
+def datos_marca(sesion, marca):
+    """Datos de la sesión con la marca `marca`, guardados para no leerlos del almacén en cada cambio de página.
+    Solo se guarda la última versión de cada sesión, y se desechan las de las sesiones usadas menos recientemente
+    cuando ocupan más de MARCAS_PRESUPUESTO bytes"""
+    with _MARCAS_CANDADO:
+        guardado = MARCAS.get(sesion)
+        if guardado is not None and guardado[0] == marca:
+            MARCAS.move_to_end(sesion)
+            return guardado[1]
+    datos = SESIONES.leer(sesion, 'datos', pd.DataFrame())
+    tamano = int(datos.memory_usage(deep=True).sum())
+    with _MARCAS_CANDADO:
+        MARCAS[sesion] = (marca, datos, tamano)
+        MARCAS.move_to_end(sesion)
+        total = sum(guardado[2] for guardado in MARCAS.values())
+        while total > MARCAS_PRESUPUESTO and len(MARCAS) > 1:
+            total -= MARCAS.popitem(last=False)[1][2]
+    return datos
+
+
+@callback(
+    Output('datos-descargados', 'data'),
+    Output('datos-descargados', 'page_count'),
+    Input('datos-descargados', 'page_current'),
+    Input('datos-descargados', 'page_size'),
+    Input('datos-descargados', 'sort_by'),
+    Input('datos-descargados', 'filter_query'),
+    Input('versión-mostrada', 'data'),
+    State('sesión', 'data'),
+)
+def paginar_datos(page_current, page_size, sort_by, filter_query, marca, sesion):
+    """Filas de la página visible de la tabla de datos, filtradas y ordenadas en el servidor"""
+    if not sesion:
+        return [], 1
+    # cada versión de los datos tiene su propia marca, por lo que la copia guardada nunca está desactualizada
+    datos = datos_marca(sesion, marca) if marca else SESIONES.leer(sesion, 'datos', pd.DataFrame())
+    return pagina(datos, page_current, page_size, sort_by, filter_query)
+
+
+def rango_visible(relayout):
+    """Rango del eje horizontal que el usuario seleccionó en el gráfico: (desde, hasta), o None si muestra todo"""
+    relayout = relayout or dict()
+    if 'xaxis.range[0]' in relayout:
+        return relayout['xaxis.range[0]'], relayout['xaxis.range[1]']
+    if 'xaxis.range' in relayout:
+        return tuple(relayout['xaxis.range'])
+    return None
+
+
+@callback(
+    Output('gráfico-datos', 'figure'),
+    Input('versión-mostrada', 'data'),
+    Input('gráfico-datos', 'relayoutData'),
+    State('sesión', 'data'),
+)
+def graficar_datos(marca, relayout, sesion):
+    """Gráfico de los datos, con a lo sumo 2000 observaciones por indicador en el rango visible (ver bccr.graficos).
+    Al acercar el gráfico, se vuelven a seleccionar las observaciones del nuevo rango a partir de los datos de la
+    sesión"""
+    activado = callback_context.triggered[0]['prop_id'].split('.')[0] if callback_context.triggered else ''
+    rango = rango_visible(relayout) if activado == 'gráfico-datos' else None
+    if activado == 'gráfico-datos' and rango is None and not (relayout or dict()).get('xaxis.autorange'):
+        raise PreventUpdate  # p.ej., cambios de tamaño de la página
+
+    if not sesion:
+        datos = pd.DataFrame()
     else:
-        fig = px.line(x=[0], y=[0])
-
-    # Cambiar índice para mostrarlo bien en la tabla
-    datos.index = datos.index.astype(str)
-
-    # Especificar las columnas de la tabla
-    columns = [{'name': 'Fecha', 'id': 'fecha' ,'deletable': False, 'renamable': False}]
-    columns += [{'name': col, 'id': col ,'deletable': False, 'renamable': False, 'type':'numeric', 'format':Format(precision=4, scheme=Scheme.fixed)} for col in datos]
-
-    # Acomodar los datos descargados como un diccionario, para que lo lea dash
-    tabla = datos.reset_index().to_dict(orient='records')
+        datos = datos_marca(sesion, marca) if marca else SESIONES.leer(sesion, 'datos', pd.DataFrame())
 
-    # dar los resultados
-    return fig, columns, tabla, busqueda_str
+    # uirevision conserva las series ocultas (clic en la leyenda) al actualizar el gráfico
+    fig = go.Figure(layout=dict(height=800, uirevision=str(marca)))
+    for nombre, serie in reducir(datos, desde=rango[0] if rango else None, hasta=rango[1] if rango else None).items():
+        fig.add_trace(go.Scattergl(x=serie.index, y=serie.values, mode='lines', name=nombre))
+    if rango:
+        fig.update_xaxes(range=list(rango))
+    return fig
 
 
 # FUNCIÓN PARA DESCARGAR LOS DATOS COMO ARCHIVOS A LA COMPUTADORA LOCAL
-@app.callback(
-    Output("download-dataframe-xlsx", "data"),
-    Input("btn-xlsx", "n_clicks"),
-    State("file-name", "value"),
+def generar_archivo(avance, sesion, formato, nombre):
+    """Tarea en segundo plano: escribe en el disco el archivo con los datos de la sesión (ver bccr.exportar)"""
+    avance.informar(0, 1, f'Preparando {nombre}.{formato}...')
+    carpeta = os.path.join(EXPORTACIONES, sesion)
+    os.makedirs(carpeta, exist_ok=True)
+    archivo = f'{avance.tarea}.{formato}'
+    exportar(SESIONES.leer(sesion, 'datos', pd.DataFrame()), os.path.join(carpeta, archivo), formato)
+    avance.informar(1, 1, f'{nombre}.{formato} está listo', archivo=dict(archivo=archivo, nombre=f'{nombre}.{formato}'))
+
+
+@callback(
+    Output('descargar-archivo', 'data'),
+    Output('exportación', 'children'),
+    Output('exportar-intervalo', 'disabled'),
+    Input('btn-xlsx', 'n_clicks'),
+    Input('btn-dta', 'n_clicks'),
+    Input('btn-csv', 'n_clicks'),
+    Input('btn-parquet', 'n_clicks'),
+    Input('exportar-intervalo', 'n_intervals'),
+    State('file-name', 'value'),
+    State('sesión', 'data'),
     prevent_initial_call=True,
 )
-def descargar_excel(n_clicks, nombre):
-    datos = DATOS_PARA_DESCARGAR[0]
-    return send_data_frame(datos.to_excel, f"{nombre}.xlsx", sheet_name="datos")
-
-
-@app.callback(
-    Output("download-dataframe-dta", "data"),
-    Input("btn-dta", "n_clicks"),
-    State("file-name", "value"),
-    prevent_initial_call=True,
-)
-def descargar_stata(n_clicks, nombre):
-    datos = DATOS_PARA_DESCARGAR[0]
-    return send_data_frame(datos.to_stata, f"{nombre}.dta")
-
-
-@app.callback(
-    Output("download-dataframe-csv", "data"),
-    Input("btn-csv", "n_clicks"),
-    State("file-name", "value"),
-    prevent_initial_call=True,
-)
-def descargar_csv(n_clicks, nombre):
-    datos = DATOS_PARA_DESCARGAR[0]
-    return send_data_frame(datos.to_csv, f"{nombre}.csv")
-
-
-
+def exportar_datos(n_xlsx, n_dta, n_csv, n_parquet, n_intervals, nombre, sesion):
+    """Exporta los datos de la sesión. Las tablas pequeñas se envían de inmediato; las grandes se escriben en segundo
+    plano, y al terminar se muestra un enlace para descargar el archivo"""
+    activado = callback_context.triggered[0]['prop_id'].split('.')[0] if callback_context.triggered else ''
+    if not sesion:
+        raise PreventUpdate
+    exportacion = f'{sesion}/exportar'  # sesión propia, para no reemplazar la consulta en curso
+
+    if activado.startswith('btn-'):
+        formato = activado[4:]
+        limpiar_exportaciones(EXPORTACIONES)
+        if SESIONES.leer(sesion, 'datos', pd.DataFrame()).size > CELDAS_DIRECTAS:
+            TAREAS.iniciar(exportacion, generar_archivo, sesion, formato, nombre)
+            return no_update, f'Preparando {nombre}.{formato}...', False
+
+        carpeta = os.path.join(EXPORTACIONES, sesion)
+        os.makedirs(carpeta, exist_ok=True)
+        try:
+            archivo = exportar(SESIONES.leer(sesion, 'datos', pd.DataFrame()),
+                               os.path.join(carpeta, f'{uuid.uuid4().hex}.{formato}'), formato)
+        except ImportError as error:  # falta xlsxwriter o pyarrow
+            return no_update, str(error), True
+        try:
+            return send_file(archivo, f'{nombre}.{formato}'), '', True
+        finally:
+            os.remove(archivo)
+
+    estado = TAREAS.estado(exportacion)
+    if estado is None:  # el estado de la exportación venció: dejar de consultar su avance
+        return no_update, no_update, True
+    if estado['estado'] not in TERMINADA:
+        return no_update, estado['mensaje'], False
+    if estado['estado'] != 'lista':
+        return no_update, estado['mensaje'], True
+    archivo = SESIONES.leer(exportacion, 'archivo')
+    if archivo is None:
+        return no_update, 'El archivo ya no está disponible; expórtelo de nuevo.', True
+    # la ruta relativa incluye `requests_pathname_prefix`, si la interfaz no se sirve en la raíz del sitio
+    ruta = dash.get_relative_path(f"/exportaciones/{sesion}/{archivo['archivo']}")
+    enlace = html.A(f"Descargar {archivo['nombre']}", href=f"{ruta}?nombre={quote(archivo['nombre'])}")
+    return no_update, enlace, True
+
+
+def servir_archivo(sesion, archivo):
+    """Envía un archivo exportado en segundo plano, leyéndolo del disco por partes"""
+    if not re.fullmatch(r'[0-9a-f]+', sesion) or not re.fullmatch(r'[0-9a-f]+\.[a-z]+', archivo):
+        abort(404)
+    return send_from_directory(os.path.join(EXPORTACIONES, sesion), archivo, as_attachment=True,
+                               download_name=request.args.get('nombre', archivo))
+
+
+def crear_app(jupyter=False, **opciones):
+    """Crear la aplicación de la interfaz gráfica, sin iniciar el servidor
+
+    Crear la aplicación no consulta al BCCR ni abre el navegador, por lo que puede usarse con un servidor WSGI con
+    varios procesos (ver `bccr.wsgi`).
+
+    Parameters
+    ----------
+    jupyter : bool
+        usar JupyterDash (para ejecutar la interfaz desde Jupyter o Colab) en lugar de Dash
+    opciones :
+        otros parámetros de Dash (p.ej., `requests_pathname_prefix` si la interfaz no se sirve en la raíz del sitio)
+
+    Returns
+    -------
+    dash.Dash
+        la aplicación; su servidor WSGI (Flask) es `app.server`
+    """
+    if jupyter:
+        from jupyter_dash import JupyterDash
+        app = JupyterDash(__name__, title='bccr', **opciones)
+    else:
+        app = dash.Dash(__name__, title='bccr', **opciones)
+    indice_catalogo()  # con gunicorn --preload, el índice se construye una sola vez para todos los procesos
+    app.layout = diseño
+    for args, kwargs, funcion in CALLBACKS:
+        app.callback(*args, **kwargs)(funcion)
+    app.server.add_url_rule(f"{app.config.routes_pathname_prefix}exportaciones/<sesion>/<archivo>", 'exportaciones',
+                            servir_archivo)
+    return app
 
 
 def GUI(colab=False):
+    app = crear_app(jupyter=True)
     if colab:
         app.run_server(mode='external')
     else:
@@ -0,0 +1,232 @@
+"""
+indice: Un módulo para definir las clases IndiceTrigramas e IndicePrefijos
+
+Este módulo define la clase IndiceTrigramas, un índice invertido de trigramas de caracteres que permite buscar textos
+(p.ej., los títulos de los cuadros de `PaginaWeb`) de manera aproximada: sin distinguir mayúsculas ni tildes, y
+tolerando errores de digitación. Los resultados se ordenan según su parecido con la consulta.
+
+Cada palabra se descompone en trigramas (con un espacio al inicio y al final, así 'ipc' da ' ip', 'ipc' y 'pc ').
+El puntaje de un texto es la fracción de los trigramas de la consulta que aparecen en él, ponderando cada trigrama
+por su rareza en el catálogo (idf), de manera que un error de digitación solo reduce el puntaje en lugar de descartar
+el resultado.
+
+    >>> from bccr.indice import IndiceTrigramas
+    >>> indice = IndiceTrigramas(PW.cuadros['title'] + ' ' + PW.cuadros['subtitle'].fillna(''))
+    >>> posiciones, puntajes = indice.buscar('indice precios consumidr', k=5)
+
+La clase IndicePrefijos es un índice invertido de palabras completas, ordenadas alfabéticamente, que permite buscar
+textos con palabras que comienzan con los términos de la consulta. Sirve para buscar mientras el usuario escribe: la
+última palabra de la consulta casi siempre está incompleta.
+
+    >>> from bccr.indice import IndicePrefijos
+    >>> indice = IndicePrefijos(SW.indicadores['descripcion'])
+    >>> posiciones, total = indice.buscar('indice prec consu', k=100)
+"""
+
+import re
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+
+from .utils import normalizar_texto
+
+
+def trigramas(texto):
+    """Trigramas de las palabras de un texto ya normalizado
+
+    Parameters
+    ----------
+    texto : str
+
+    Returns
+    -------
+    list of str
+
+    Examples
+    --------
+    >>> trigramas('ipc')
+    [' ip', 'ipc', 'pc ']
+    """
+    return [f' {palabra} '[k:k + 3] for palabra in texto.split() for k in range(len(palabra))]
+
+
+@dataclass
+class IndiceTrigramas:
+    """
+    Índice invertido de trigramas de caracteres, para búsqueda aproximada de textos
+
+    Attributes
+    ----------
+    textos : pd.Series
+        los textos a indexar. Los resultados de `buscar` son posiciones en esta serie.
+    """
+    textos: pd.Series
+
+    def __post_init__(self):
+        normalizados = normalizar_texto(pd.Series(self.textos)).str.replace(r'[^\w\s]', ' ', regex=True)
+
+        # pares (trigrama, documento), sin repetir trigramas dentro de un mismo documento
+        grams, docs = [], []
+        for doc, texto in enumerate(normalizados):
+            propios = set(trigramas(texto))
+            grams.extend(propios)
+            docs.extend([doc] * len(propios))
+
+        codigos, vocabulario = pd.factorize(pd.Series(grams, dtype=object))
+        orden = np.argsort(codigos, kind='stable')
+        self.__vocabulario__ = {gram: k for k, gram in enumerate(vocabulario)}
+        self.__documentos__ = np.asarray(docs, dtype=np.int64)[orden]   # documentos, agrupados por trigrama
+        self.__inicios__ = np.searchsorted(codigos[orden], np.arange(len(vocabulario) + 1))
+
+        n = len(normalizados)
+        frecuencia = np.diff(self.__inicios__)
+        self.__idf__ = np.log1p(n / np.maximum(frecuencia, 1))
+        self.__tamaños__ = np.bincount(self.__documentos__, minlength=n)
+
+    def buscar(self, consulta, k=10, mascara=None, minimo=0.3):
+        """Los `k` textos más parecidos a la consulta
+
+        Parameters
+        ----------
+        consulta : str
+            texto a buscar (no importan mayúsculas ni tildes)
+        k : int, optional
+            número máximo de resultados (predeterminado: 10)
+        mascara : np.ndarray of bool, optional
+            si se indica, solo se consideran los textos donde `mascara` es True
+        minimo : float, optional
+            puntaje mínimo (entre 0 y 1) de los resultados (predeterminado: 0.3)
+
+        Returns
+        -------
+        posiciones : np.ndarray of int
+            posiciones de los textos encontrados en `textos`, del más parecido al menos parecido
+        puntajes : np.ndarray of float
+            puntaje de cada resultado: 1 si el texto contiene todos los trigramas de la consulta
+        """
+        n = len(self.__tamaños__)
+        gramas = [self.__vocabulario__.get(g, -1) for g in set(trigramas(normalizar_texto(consulta)))]
+        if not gramas:
+            return np.empty(0, dtype=np.int64), np.empty(0)
+
+        # los trigramas que no aparecen en el catálogo cuentan en el total, con el mayor peso posible
+        conocidos = np.array([g for g in gramas if g >= 0], dtype=np.int64)
+        total = self.__idf__[conocidos].sum() + (len(gramas) - conocidos.size) * np.log1p(n)
+
+        puntajes = np.zeros(n)
+        for g in conocidos:
+            puntajes[self.__documentos__[self.__inicios__[g]:self.__inicios__[g + 1]]] += self.__idf__[g]
+        puntajes /= total
+        if mascara is not None:
+            puntajes[~np.asarray(mascara, dtype=bool)] = 0.0
+
+        candidatos = np.flatnonzero(puntajes >= minimo)
+        if candidatos.size > k:
+            candidatos = candidatos[np.argpartition(-puntajes[candidatos], k - 1)[:k]]
+
+        # mayor puntaje primero; a igual puntaje, los textos más cortos
+        orden = np.lexsort((self.__tamaños__[candidatos], -puntajes[candidatos]))
+        return candidatos[orden], puntajes[candidatos[orden]]
+
+    def __len__(self):
+        return len(self.__tamaños__)
+
+    def __str__(self):
+        return f"Clase IndiceTrigramas: {len(self)} textos, {len(self.__vocabulario__)} trigramas."
+
+    def __repr__(self):
+        return self.__str__()
+
+
+def _palabras(texto):
+    """Palabras de un texto, sin mayúsculas, tildes ni signos de puntuación"""
+    return re.sub(r'[^\w\s]', ' ', normalizar_texto(texto)).split()
+
+
+@dataclass
+class IndicePrefijos:
+    """
+    Índice invertido de palabras, para buscar textos con palabras que comienzan con los términos de la consulta
+
+    Attributes
+    ----------
+    textos : pd.Series
+        los textos a indexar. Los resultados de `buscar` son posiciones en esta serie.
+    """
+    textos: pd.Series
+
+    def __post_init__(self):
+        normalizados = normalizar_texto(pd.Series(self.textos)).str.replace(r'[^\w\s]', ' ', regex=True)
+        self.__normalizados__ = normalizados.to_numpy(dtype=object)
+
+        # pares (palabra, documento), sin repetir palabras dentro de un mismo documento
+        palabras, docs = [], []
+        for doc, texto in enumerate(self.__normalizados__):
+            propias = set(texto.split())
+            palabras.extend(propias)
+            docs.extend([doc] * len(propias))
+
+        codigos, vocabulario = pd.factorize(pd.Series(palabras, dtype=object), sort=True)
+        orden = np.argsort(codigos, kind='stable')
+        self.__vocabulario__ = np.asarray(vocabulario, dtype=str)  # en orden alfabético, para buscar prefijos
+        self.__documentos__ = np.asarray(docs, dtype=np.int64)[orden]   # documentos, agrupados por palabra
+        self.__inicios__ = np.searchsorted(codigos[orden], np.arange(len(vocabulario) + 1))
+
+    def prefijo(self, prefijo):
+        """Posiciones (en orden ascendente) de los textos que tienen alguna palabra que comienza con `prefijo`"""
+        desde = np.searchsorted(self.__vocabulario__, prefijo, side='left')
+        hasta = np.searchsorted(self.__vocabulario__, prefijo + '\uffff', side='left')
+        return np.unique(self.__documentos__[self.__inicios__[desde]:self.__inicios__[hasta]])
+
+    def buscar(self, consulta, tipo='todos', k=None, mascara=None):
+        """Textos que contienen las palabras de la consulta (o palabras que comienzan con ellas)
+
+        Parameters
+        ----------
+        consulta : str
+            texto a buscar (no importan mayúsculas ni tildes)
+        tipo : str, optional
+            'todos' (predeterminado): textos con todas las palabras; 'algunos': textos con al menos una de ellas,
+            primero los que tienen más; 'frase': textos que contienen la consulta literalmente
+        k : int, optional
+            número máximo de resultados (predeterminado: todos)
+        mascara : np.ndarray of bool, optional
+            si se indica, solo se consideran los textos donde `mascara` es True
+
+        Returns
+        -------
+        posiciones : np.ndarray of int
+            posiciones de los textos encontrados en `textos` (en orden ascendente, salvo con tipo='algunos')
+        total : int
+            número de textos encontrados (antes de limitarlos a `k`)
+        """
+        palabras = _palabras(consulta)
+        if not palabras:
+            return np.empty(0, dtype=np.int64), 0
+
+        conjuntos = [self.prefijo(palabra) for palabra in palabras]
+        if tipo == 'algunos':
+            conteo = np.bincount(np.concatenate(conjuntos), minlength=len(self))
+            posiciones = np.flatnonzero(conteo)
+            posiciones = posiciones[np.argsort(-conteo[posiciones], kind='stable')]
+        else:
+            posiciones = conjuntos[0]
+            for conjunto in conjuntos[1:]:
+                posiciones = np.intersect1d(posiciones, conjunto, assume_unique=True)
+            if tipo == 'frase':
+                frase = ' '.join(palabras)
+                posiciones = posiciones[[frase in self.__normalizados__[p] for p in posiciones]].astype(np.int64)
+
+        if mascara is not None:
+            posiciones = posiciones[np.asarray(mascara, dtype=bool)[posiciones]]
+        return posiciones[:k], len(posiciones)
+
+    def __len__(self):
+        return len(self.__normalizados__)
+
+    def __str__(self):
+        return f"Clase IndicePrefijos: {len(self)} textos, {len(self.__vocabulario__)} palabras."
+
+    def __repr__(self):
+        return self.__str__()
@@ -20,28 +20,56 @@ La forma usual de utilizar esta clase es
 """
 
 
+from concurrent.futures import ThreadPoolExecutor
 from dataclasses import dataclass
 import pandas as pd
 import numpy as np
+import asyncio
+import functools
 import os
+import threading
 import time
 import warnings
 import webbrowser
 
 from .utils import parse_date_parameter
-from .scrape import CHARTFREQUENCIES
-from .utils import findColumnTitles, fixCommas, is_leap_year
-from .fetch import FIRST_OBSERVATION
+from .tabla import leer_tabla
+from .formatos import reformar
+from .almacen import AlmacenCuadros
+from .indice import IndiceTrigramas
+from . import transporte
 
 BCCR_FOLDER = os.path.dirname(os.path.abspath(__file__))
 DATA_FOLDER = os.path.join(BCCR_FOLDER, 'data')
 PICKLE_FILE = os.path.join(DATA_FOLDER, 'cuadros.pkl') # en desuso, servirá para cuando se actualice localmente el catálogo
 PICKLE_FILE_ONLINE = "https://github.com/randall-romero/bccr/raw/main/bccr/data/cuadros.pkl" # Para mantener catálogo actualizado
 
+_CANDADO = threading.Lock()  # para crear el límite de descargas simultáneas de cada instancia
+
 
 @dataclass
 class PaginaWeb:
+    """
+    Una clase para buscar y descargar cuadros del sitio de indicadores económicos del Banco Central de Costa Rica
+
+    Attributes
+    ----------
+    cuadros : pd.DataFrame
+        una tabla con la descripción de los cuadros disponibles en el sitio de indicadores económicos.
+    hilos : int
+        número máximo de cuadros que se descargan simultáneamente (predeterminado: 4).
+    almacen : AlmacenCuadros, optional
+        almacén local de cuadros. Si se indica, los cuadros se guardan localmente y en cada consulta solo se
+        descargan sus datos recientes (ver `bccr.almacen.AlmacenCuadros`).
+    bloque : int, optional
+        número de años que abarca cada descarga de un cuadro diario (predeterminado: 5). Los cuadros diarios se
+        descargan por bloques de años, simultáneamente, en vez de en un único cuadro HTML muy grande. Si None o 0, se
+        descargan completos.
+    """
     cuadros: pd.DataFrame
+    hilos: int = 4
+    almacen: AlmacenCuadros = None
+    bloque: int = 5
 
     def api(self, Cuadro, *, FechaInicio=None, FechaFinal=None, excel=True, abrir=False):
         """
@@ -169,16 +197,18 @@ class PaginaWeb:
 
             >>> self.__downloadChart__(138, 2011, 2015, quiet=True)
         """
-        chart_url = self.api(chart, FechaInicio=first, FechaFinal=last,excel=True, abrir=False)
-        rawdata = pd.read_html(chart_url, thousands="")[0]
-        title, subtitle, subts2 = rawdata.iloc[:3, 0]
-        if pd.notnull(subts2):
-            subtitle += ' --- %s' % subts2
+        return self.__downloadTable__(chart, first, last, quiet).to_frame()
 
-        rawdata.set_index(0, inplace=True)
-        h = findColumnTitles(rawdata)
-        rawdata.columns = rawdata.iloc[h]
-        rawdata = rawdata.iloc[h + 1:].applymap(fixCommas)
+    def __downloadTable__(self, chart, first=None, last=None, quiet=False):
+        """
+            Downloads a chart from BCCR website, as a `TablaCuadro` (title, subtitle, row and column labels and a NumPy
+            matrix of values). Same parameters as `__downloadChart__`.
+        """
+        chart_url = self.api(chart, FechaInicio=first, FechaFinal=last,excel=True, abrir=False)
+        with self.__limite__():
+            texto = transporte.texto(chart_url)
+        tabla = leer_tabla(texto)
+        title, subtitle = tabla.titulo, tabla.subtitulo
 
         if not quiet:
             info = 'Descargando el cuadro %s:' % chart
@@ -188,52 +218,56 @@ class PaginaWeb:
             info += '\n\t' + chart_url + '\n'
             print(info)
 
-        rawdata._metadata = {'title': title, 'subtitle': subtitle}
-        return rawdata
+        return tabla
 
-    def __parse__(self, chart, first=None, last=None, freq=None, func=None, quiet=True):
+    def __limite__(self):
+        """Semáforo que limita a `self.hilos` las descargas simultáneas de esta instancia
 
-        # TODO: Add chartFormat='DayIndicator' to the possible options!!! Example chart=572
+        Los cuadros de `__parse_varios__` y los bloques de `__leer_bloques__` se descargan en hilos distintos (y los
+        segundos dentro de los primeros); el semáforo evita que lleguen a hacerse `hilos` x `hilos` consultas a la vez.
+        """
+        with _CANDADO:
+            limite = getattr(self, '_limite', None)
+            if limite is None or limite[0] != self.hilos:
+                limite = (self.hilos, threading.BoundedSemaphore(max(1, self.hilos)))
+                self._limite = limite
+        return limite[1]
 
-        chartFormat = self.cuadros.loc[chart, 'chartFormat']
+    def __parse__(self, chart, first=None, last=None, freq=None, func=None, quiet=True):
 
-        data = self.__downloadChart__(chart, first, last, quiet)
-        title = data._metadata['title']
+        if self.almacen is None:
+            data = self.__leer__(chart, first, last, quiet)
+        else:
+            ''' UPDATE STORED CHART, THEN SELECT REQUESTED DATES '''
+            data = self.almacen.actualizar(chart, lambda desde: self.__leer__(chart, desde, None, quiet))
+            if first:
+                data = data[data.index.end_time >= pd.Timestamp(parse_date_parameter(first, inicio=True, año_primero=True))]
+            if last:
+                data = data[data.index.start_time <= pd.Timestamp(parse_date_parameter(last, inicio=False, año_primero=True))]
 
-        ''' CLEAN DATA'''
-        if chartFormat == 'MonthYear' and 'total' in str(data.index[0]).lower():
-            data.drop(data.index[0], inplace=True)
-        elif chartFormat == 'DayYear':
-            nonleap = np.array([~is_leap_year(int(y)) for y in data.columns])
-            data.iloc[59, nonleap] = np.inf  # row 59 = Feb 29 (counting from zero-base)
+        ''' RESAMPLE DATA '''
+        if freq:
+            func = func if func else np.mean
+            data = data.resample(freq).apply(func)
 
-        ''' GET FIRST OBSERVATION '''
-        try:
-            t0 = FIRST_OBSERVATION[chartFormat](data)
-        except:
-            raise Exception(NotImplemented)
+        return data
 
-        ''' GET DATA IN TIME v. SERIES FORMAT '''
-        if chartFormat in ['IndicatorYear', 'IndicatorQuarter', 'IndicatorMonth', 'MonthYear', 'DayYear']:
-            data = data.transpose()
+    def __leer__(self, chart, first=None, last=None, quiet=True):
+        """Descarga un cuadro y lo convierte en serie de tiempo (sin cambiar su frecuencia)"""
 
-        ''' STACK DATA '''
-        if chartFormat in ['YearMonth', 'MonthYear', 'DayYear']:
-            data = data.stack(dropna=False)
+        if self.bloque and self.cuadros.loc[chart, 'freq'] == 'D':
+            return self.__leer_bloques__(chart, first, last, quiet)
+        return self.__leer_bloque__(chart, first, last, quiet)
 
-        ''' REMOVE 29 FEB IN NON-LEAP YEARS '''
-        if chartFormat in ['DayYear']:
-            data = data[data != np.inf]
+    def __leer_bloque__(self, chart, first=None, last=None, quiet=True):
+        """Descarga un cuadro (en una sola consulta) y lo convierte en serie de tiempo"""
+
+        chartFormat = self.cuadros.loc[chart, 'chartFormat']
 
-        ''' REMOVE 29 REB IN NON-LEAP YEARS'''
-        if chartFormat in ['DayIndicator']:
-            not_a_leap_year = ~is_leap_year(np.array([int(x.split()[-1]) for x in data.index]))
-            feb29 = np.array(['29 Feb' in x for x in data.index])
-            wrong_day = feb29 & not_a_leap_year
-            data = data.iloc[~wrong_day]
+        tabla = self.__downloadTable__(chart, first, last, quiet)
 
-        ''' ADD TIME INDEX '''
-        data.index = pd.period_range(start=t0, periods=data.shape[0], freq=CHARTFREQUENCIES[chartFormat][0])
+        ''' GET DATA IN TIME v. SERIES FORMAT, WITH TIME INDEX '''
+        data = reformar(tabla, chartFormat)
 
         ''' DROP MISSING VALUES '''
         if isinstance(data, pd.Series):
@@ -245,13 +279,80 @@ class PaginaWeb:
         else:
             raise ValueError('Unexpected data type: %s' % type(data))
 
-        ''' RESAMPLE DATA '''
-        if freq:
-            func = func if func else np.mean
-            data = data.resample(freq).apply(func)
-
         return data
 
+    def __bloques__(self, first, last):
+        """Fechas (inicio, final) de los bloques de `self.bloque` años que cubren el período de `first` a `last`
+
+        Los bloques comienzan en los años múltiplos de `self.bloque` (p.ej. 2020, 2025), y se ordenan del más reciente
+        al más antiguo. Si `last` es None, el bloque más reciente no tiene fecha final (llega hasta el último dato), de
+        manera que sus consultas no cambian cada día en la caché ni en los casetes. Si `first` es None, se generan
+        bloques indefinidamente hacia atrás.
+        """
+        fin = pd.Timestamp(parse_date_parameter(last, inicio=False, año_primero=True)) if last else None
+        inicio = pd.Timestamp(parse_date_parameter(first, inicio=True, año_primero=True)) if first else None
+
+        año = (pd.Timestamp.today() if fin is None else fin).year // self.bloque * self.bloque
+        while inicio is None or año + self.bloque > inicio.year:  # el bloque termina después de `first`
+            desde = max(pd.Timestamp(año, 1, 1), inicio) if inicio else pd.Timestamp(año, 1, 1)
+            if fin is None or fin >= desde:
+                yield desde.strftime('%Y/%m/%d'), fin.strftime('%Y/%m/%d') if fin is not None else None
+            fin = pd.Timestamp(año - 1, 12, 31)
+            año -= self.bloque
+
+    def __leer_bloques__(self, chart, first=None, last=None, quiet=True):
+        """Descarga un cuadro por bloques de `self.bloque` años, de manera concurrente
+
+        Los bloques se descargan en tandas de `self.hilos` bloques, del más reciente al más antiguo. Si no se indica
+        la fecha inicial, se omiten los bloques vacíos posteriores al último dato del cuadro (p.ej. si el cuadro se
+        descontinuó), y se deja de descargar al encontrar un bloque vacío anterior a su primer dato. Los bloques se
+        unen en una sola serie, sin observaciones repetidas.
+
+        Un bloque cuya descarga falla se intenta descargar una vez más; si vuelve a fallar, se genera el error (un
+        bloque fallido no se confunde con uno vacío, lo que recortaría la historia del cuadro sin aviso).
+        """
+        bloques = self.__bloques__(first, last)
+        partes = []
+        with ThreadPoolExecutor(max_workers=max(1, self.hilos)) as executor:
+            while True:
+                tanda = [b for _, b in zip(range(max(1, self.hilos)), bloques)]
+                if not tanda:
+                    break
+                futuros = [executor.submit(self.__leer_bloque__, chart, desde, hasta, quiet or bool(partes) or k > 0)
+                           for k, (desde, hasta) in enumerate(tanda)]
+                resultados = [self.__resultado__(futuro, chart, desde, hasta)
+                              for futuro, (desde, hasta) in zip(futuros, tanda)]
+
+                if first:  # período conocido: se descargan todos los bloques
+                    partes.extend(resultados)
+                    continue
+
+                if not partes and all(r.empty for r in resultados):
+                    # ningún dato reciente (p.ej. cuadro descontinuado hace años): descargar el cuadro completo
+                    return self.__leer_bloque__(chart, None, last, quiet)
+
+                terminado = False
+                for resultado in resultados:
+                    if not resultado.empty:
+                        partes.append(resultado)
+                    elif partes:  # bloque vacío anterior al primer dato del cuadro
+                        terminado = True
+                        break
+                if terminado:
+                    break
+
+        if not partes:  # rango de fechas vacío
+            return self.__leer_bloque__(chart, first, last, quiet)
+        datos = pd.concat(partes[::-1]).sort_index()
+        return datos[~datos.index.duplicated(keep='last')]
+
+    def __resultado__(self, futuro, chart, desde, hasta):
+        """Datos de un bloque descargado por `__leer_bloques__`, reintentando la descarga una vez si falló"""
+        try:
+            return futuro.result()
+        except Exception:
+            return self.__leer_bloque__(chart, desde, hasta, True)
+
     def soporte(self, cuadro):
         """
         Indica si un `cuadro` específico puede descargarse con PaginaWeb
@@ -401,8 +502,12 @@ class PaginaWeb:
                 print(f"PaginaWeb aún no tiene soporte para el cuadro {codigo}, o bien no existe")
 
         if indicadores_válidos:
-            #__parse__(self, chart, first=None, last=None, freq=None, func=None, quiet=True):
-            datos = {nombre: self.__parse__(codigo, first=FechaInicio, last=FechaFinal, freq=freq, func=func, quiet=not info) for nombre, codigo in indicadores_válidos.items()}
+            datos = self.__parse_varios__(indicadores_válidos, first=FechaInicio, last=FechaFinal, freq=freq, func=func, quiet=not info)
+
+            # Desechar cuadros que no se pudieron descargar
+            indicadores_válidos = {nombre: codigo for nombre, codigo in indicadores_válidos.items() if nombre in datos}
+            if not datos:
+                return pd.DataFrame(columns=indicadores.keys())
 
             freqs = pd.Series({codigo: self.cuadros.loc[codigo, 'freq'] for codigo in indicadores_válidos.values()})
             freqs = freqs.astype('category').cat.set_categories(['A', '6M', 'Q', 'M', 'W', 'D'], ordered=True)
@@ -421,6 +526,79 @@ class PaginaWeb:
             return results
 
 
+    def __parse_varios__(self, cuadros, first=None, last=None, freq=None, func=None, quiet=True):
+        """Descargar y procesar varios cuadros de manera concurrente
+
+        Usa a lo sumo `self.hilos` descargas simultáneas. Si falla la descarga de algún cuadro, se emite una advertencia
+        y se continúa con los demás.
+
+        Parameters
+        ----------
+        cuadros : dict
+            pares nombre: código de los cuadros a descargar
+        first, last, freq, func, quiet :
+            ver `__parse__`
+
+        Returns
+        -------
+        dict
+            pares nombre: datos, en el mismo orden de `cuadros` (sin los cuadros que no se pudieron descargar)
+        """
+        with ThreadPoolExecutor(max_workers=max(1, self.hilos)) as executor:
+            futuros = {nombre: executor.submit(self.__parse__, codigo, first, last, freq, func, quiet)
+                       for nombre, codigo in cuadros.items()}
+
+        datos = dict()
+        for nombre, futuro in futuros.items():
+            try:
+                datos[nombre] = futuro.result()
+            except Exception as error:
+                warnings.warn(f"No se pudo descargar el cuadro {cuadros[nombre]} ('{nombre}'): {error}")
+        return datos
+
+    async def adatos(self, *Cuadros, **kwargs):
+        """Versión asíncrona de `datos`
+
+        Acepta los mismos parámetros que `datos`. Permite descargar cuadros sin bloquear el ciclo de eventos (por
+        ejemplo, en un cuaderno de Jupyter o en una aplicación web asíncrona).
+
+        Examples
+        --------
+        >>> from bccr import PW
+        >>> datos = await PW.adatos(M1=125, Npp=177)
+        """
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, functools.partial(self.datos, *Cuadros, **kwargs))
+
+    def query(self, *Cuadros, **indicadores):
+        """Consulta de datos que se ejecuta solo al llamar a `collect` (ver `bccr.consulta.Consulta`)
+
+        Parameters
+        ----------
+        Cuadros, indicadores :
+            los cuadros solicitados, como en la función `datos`
+
+        Returns
+        -------
+        Consulta
+
+        Examples
+        --------
+        >>> from bccr import PW
+        >>> PW.query(M1=125, Npp=177).desde(2015).hasta(2020).collect()
+        """
+        from .consulta import Consulta
+
+        for cuadro in Cuadros:
+            indicadores[self.__nombre__(int(cuadro))] = cuadro
+        válidos = dict()
+        for nombre, codigo in indicadores.items():
+            if self.soporte(codigo):
+                válidos[nombre] = int(codigo)
+            else:
+                print(f"PaginaWeb aún no tiene soporte para el cuadro {codigo}, o bien no existe")
+        return Consulta(self, válidos, hilos=self.hilos)
+
     def __call__(self, *args, **kwargs):
         return self.datos(*args, **kwargs)
 
@@ -428,19 +606,32 @@ class PaginaWeb:
         CAMPOS = ['title', 'subtitle']
         return pd.DataFrame([self.cuadros[campo].str.contains(frase, case=False) for campo in CAMPOS]).any()
 
-    def buscar(self, todos=None, *, frase=None, algunos=None, frecuencia=None):
+    def __indice__(self):
+        """Índice de trigramas de los títulos y subtítulos de los cuadros (se construye una vez por catálogo)"""
+        indice = getattr(self, '_indice', None)
+        if indice is None or indice[0] is not self.cuadros:
+            textos = self.cuadros['title'].fillna('') + ' ' + self.cuadros['subtitle'].fillna('')
+            indice = (self.cuadros, IndiceTrigramas(textos))
+            self._indice = indice
+        return indice[1]
+
+    def buscar(self, todos=None, *, frase=None, algunos=None, parecido=None, frecuencia=None, n=10):
         """buscar códigos de indicadores según su descripción
 
         Parameters
         ----------
-        frase, todos, algunos : str
-            texto que debe aparecer en la descripción del indicador. Sólo una de estos tres parámetros debe utilizarse
+        frase, todos, algunos, parecido : str
+            texto que debe aparecer en la descripción del indicador. Sólo una de estos cuatro parámetros debe utilizarse
             a la vez. 'frase' busca una coincidencia exacta, 'todos' que todas las palabras aparezcan (en cualquier
             orden), 'algunos' que al menos una de las palabras aparezca. La búsqueda no es sensible a mayúscula/minúscula.
+            'parecido' busca los `n` cuadros cuya descripción más se parece al texto, sin distinguir tildes y tolerando
+            errores de digitación; los resultados se ordenan según su puntaje (columna 'score', entre 0 y 1).
             Si no se indica un parámetro [por ejemplo, PW.buscar('precios consumidor')], se asume que
-            PW.buscar(todos='precio consumidor')
+            PW.buscar(todos='precio consumidor'); si así no se encuentra ningún cuadro, se usa PW.buscar(parecido=...)
         frecuencia : str, optional. uno de ('Q', 'A', 'M', 'D')
             mostrar solo indicadores que tengan la frecuencia indicada.
+        n : int, optional
+            número máximo de resultados de la búsqueda por `parecido` (predeterminado: 10)
 
         Returns
         -------
@@ -462,6 +653,10 @@ class PaginaWeb:
 
         >>> PW.buscar(algunos="exportaciones importaciones")
 
+        Para buscar los 5 cuadros más parecidos a "indice precios consumidr" (sin tildes y con un error)
+
+        >>> PW.buscar(parecido="indice precios consumidr", n=5)
+
         Para buscar los términos "precios transables", y filtrar que muestre solo resultados con medida "Variación interanual"
 
         >>> PW.buscar('precios transables', Medida='Variación interanual')
@@ -475,6 +670,11 @@ class PaginaWeb:
 
 
         CAMPOS = ['title', 'subtitle', 'freq']
+        freq = (self.cuadros['freq'] == frecuencia[0].upper()) if frecuencia else None
+
+        if parecido:
+            posiciones, puntajes = self.__indice__().buscar(parecido, k=n, mascara=freq)
+            return self.cuadros.iloc[posiciones][CAMPOS].assign(score=puntajes)
 
         if frase:
             temp = self.__buscar_frase__(frase)
@@ -485,23 +685,24 @@ class PaginaWeb:
         else:
             ayuda = """ BUSCAR
             Esta función ayuda a buscar los códigos de indicadores, utilizando palabras descriptivas.
-            Exactamente un parámetro de [frase, todos, algunos] debe ser proporcionado.
+            Exactamente un parámetro de [frase, todos, algunos, parecido] debe ser proporcionado.
 
             Ejemplos de uso:
                 buscar(frase="descripción contiene esta frase literalmente")
                 buscar(todos="descripción contiene todos estos términos en cualquir orden")
                 buscar(algunos="descripción contiene alguno de estos términos")
+                buscar(parecido="descripción se parece a este texto")
                 buscar()  # muestra este mensaje de ayuda
             """
             print(ayuda)
             return
 
-
         if frecuencia:
-            freq = self.cuadros['freq'] == frecuencia[0].upper()
-            return self.cuadros[temp & freq][CAMPOS]
-        else:
-            return self.cuadros[temp][CAMPOS]
+            temp = temp & freq
+
+        if todos and not temp.any():
+            return self.buscar(parecido=todos, frecuencia=frecuencia, n=n)
+        return self.cuadros[temp][CAMPOS]
 
     def __str__(self):
         return "Clase PaginaWeb: permite buscar y descargar datos del sitio de indicadores económicos del Banco Central de Costa Rica."
@@ -0,0 +1,126 @@
+"""
+paginacion: Funciones para mostrar por páginas una tabla de datos en la interfaz gráfica
+
+La tabla de datos de la interfaz gráfica (`dash_table.DataTable`) se pagina, ordena y filtra en el servidor: el
+navegador solo recibe las filas de la página visible, en lugar de la tabla completa (que para varias décadas de datos
+diarios puede ocupar varios megabytes).
+
+La función `pagina` aplica, en este orden, el filtro (`filter_query` de la tabla, p.ej. "{IMAE} > 100 && {fecha}
+datestartswith 2020"), el orden (`sort_by`) y la paginación (`page_current`, `page_size`).
+
+    >>> from bccr.paginacion import pagina
+    >>> filas, paginas = pagina(datos, 0, 50, [{'column_id': 'IMAE', 'direction': 'desc'}], '{IMAE} > 100')
+"""
+
+import math
+import re
+
+import numpy as np
+import pandas as pd
+
+#: str: Nombre de la columna de fechas en la tabla (el índice de los datos)
+FECHA = 'fecha'
+
+#: dict: Operadores de `filter_query` que se aplican sobre valores numéricos o de texto
+OPERADORES = {
+    'gt': np.greater, '>': np.greater,
+    'ge': np.greater_equal, '>=': np.greater_equal,
+    'lt': np.less, '<': np.less,
+    'le': np.less_equal, '<=': np.less_equal,
+    'eq': np.equal, '=': np.equal,
+    'ne': np.not_equal, '!=': np.not_equal,
+}
+
+_CONDICION = re.compile(r'^\{(?P<columna>[^}]+)\}\s*(?P<operador>s?(?:[a-z]+|[<>!=]=?))\s*(?P<valor>.*)$')
+
+
+def _valor(texto):
+    """Valor de una condición: número si es posible, texto (sin comillas) en caso contrario"""
+    texto = texto.strip()
+    if len(texto) > 1 and texto[0] == texto[-1] and texto[0] in '"\'`':
+        return texto[1:-1]
+    try:
+        return float(texto)
+    except ValueError:
+        return texto
+
+
+def filtrar(tabla, filtro):
+    """Filas de `tabla` que cumplen todas las condiciones de `filtro`
+
+    Parameters
+    ----------
+    tabla : pd.DataFrame
+        datos, con las fechas en la columna `FECHA` (como texto)
+    filtro : str
+        condiciones de `filter_query` de la tabla, unidas por ' && '. Las condiciones que no se entienden se ignoran.
+
+    Returns
+    -------
+    pd.DataFrame
+    """
+    seleccion = np.ones(len(tabla), dtype=bool)
+    for parte in (filtro or '').split(' && '):
+        condicion = _CONDICION.match(parte.strip())
+        if condicion is None or condicion['columna'] not in tabla:
+            continue
+        columna, operador, valor = tabla[condicion['columna']], condicion['operador'], _valor(condicion['valor'])
+        operador = operador[1:] if operador.startswith('s') and operador[1:] in OPERADORES else operador
+
+        if operador in ('contains', 'datestartswith'):
+            texto = columna.astype(str)
+            valor = str(valor) if isinstance(valor, str) else condicion['valor'].strip()  # '2015', no '2015.0'
+            cumple = texto.str.contains(valor, regex=False) if operador == 'contains' else texto.str.startswith(valor)
+        elif operador in OPERADORES:
+            if isinstance(valor, float) and columna.name != FECHA:
+                cumple = OPERADORES[operador](pd.to_numeric(columna, errors='coerce').to_numpy(), valor)
+            else:
+                valor = valor if isinstance(valor, str) else condicion['valor'].strip()
+                cumple = OPERADORES[operador](columna.astype(str).to_numpy(), valor)
+        else:
+            continue
+        seleccion &= np.asarray(cumple, dtype=bool)
+    return tabla[seleccion]
+
+
+def ordenar(tabla, orden):
+    """Ordenar `tabla` según `orden` (el `sort_by` de la tabla: lista de {'column_id', 'direction'})"""
+    orden = [o for o in (orden or []) if o['column_id'] in tabla]
+    if not orden:
+        return tabla
+    return tabla.sort_values([o['column_id'] for o in orden], ascending=[o['direction'] == 'asc' for o in orden],
+                             kind='stable', na_position='last')
+
+
+def pagina(datos, actual=0, tamaño=50, orden=None, filtro=None):
+    """Filas de una página de la tabla de datos, ya filtradas y ordenadas
+
+    Parameters
+    ----------
+    datos : pd.DataFrame
+        datos, indexados por período
+    actual : int
+        número de la página (desde 0)
+    tamaño : int
+        filas por página
+    orden : list of dict, optional
+        `sort_by` de la tabla
+    filtro : str, optional
+        `filter_query` de la tabla
+
+    Returns
+    -------
+    filas : list of dict
+        las filas de la página, listas para la propiedad `data` de la tabla
+    paginas : int
+        número total de páginas (al menos 1)
+    """
+    tabla = datos.rename_axis(FECHA).reset_index()
+    tabla[FECHA] = tabla[FECHA].astype(str)  # los períodos en formato ISO se ordenan bien como texto
+    tabla = ordenar(filtrar(tabla, filtro), orden)
+
+    tamaño = max(1, int(tamaño or 50))
+    paginas = max(1, math.ceil(len(tabla) / tamaño))
+    actual = min(max(0, int(actual or 0)), paginas - 1)
+    filas = tabla.iloc[actual * tamaño:(actual + 1) * tamaño]
+    return filas.to_dict(orient='records'), paginas
@@ -1,11 +1,23 @@
 import os
 import re
-import requests
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+import numpy as np
 import pandas as pd
 from bs4 import BeautifulSoup
 
 from .download import api
+from .tabla import leer_encabezado
+from .utils import normalizar_texto
+from . import transporte
 
+DATA_FOLDER = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data')
+INDICATORS_FILE = os.path.join(DATA_FOLDER, 'indicators.pkl')
+
+_INDICATORS = {}  # catalog of indicators, loaded on first use (see loadIndicators)
+_INDICATORS_LOCK = threading.Lock()
 
 CHARTFREQUENCIES = {
     'MonthYear': 'Monthly',
@@ -24,48 +36,43 @@ CHARTFREQUENCIES = {
 
 def fastTitle(chart, quiet=True):
     """
-        Read title of a single chart. Optimized for speed: try to download as little data as possible, if it fails then
-        download using default dates
+        Read title of a single chart. Optimized for speed: the chart is streamed, and the download stops as soon as
+        the title rows have been read (only a few kilobytes are transferred, regardless of the size of the chart)
     Parameters
     ----------
     chart   : chart number (integer)
 
     Returns
     -------
-            A pandas series with two elements (title and subtitle)
+            A pandas dataframe with one row (indexed by chart number) and two columns (title and subtitle)
     """
 
     if not quiet:
         print(api(chart, excel=False))
 
-    try:
-        rawdata = pd.read_html(api(chart, 2015, 2015), thousands="")[0]
-    except:
-        rawdata = pd.read_html(api(chart), thousands="")[0]
-
     df = pd.DataFrame(index=[chart])
-    df['title'], df['subtitle'], subts2 = rawdata.iloc[:3, 0]
-    if not pd.isnull(subts2):
-        df['subtitle'] += ' --- %s' % subts2
-
+    df['title'], df['subtitle'] = leer_encabezado(transporte.fragmentos(api(chart)))
     return df
 
 
-def readTitle(series, quiet=True):
+def readTitle(series, quiet=True, threads=8):
     """
-        Reads the title and subtitle of indicated series
+        Reads the title and subtitle of indicated series, downloading several charts concurrently
 
     Parameters
     ----------
     series  : An iterable of integers, indicating chart numbers
+    threads : Maximum number of simultaneous downloads (integer, default=8)
 
     Returns
     -------
         A pandas dataframe, indexed by chart numbers
 
     """
-    seriesSet = [series] if isinstance(series, int) else set(series)
-    return pd.concat([fastTitle(v, quiet) for v in seriesSet])
+    seriesSet = [series] if isinstance(series, int) else list(dict.fromkeys(series))
+    with ThreadPoolExecutor(max_workers=threads) as executor:
+        titles = list(executor.map(lambda v: fastTitle(v, quiet), seriesSet))
+    return pd.concat(titles)
 
 
 
@@ -73,54 +80,115 @@ def readTitle(series, quiet=True):
 
 
 
-def findAllCharts():
-    baseURL = 'https://www.bccr.fi.cr/seccion-indicadores-economicos/'
-    pages = ['mercado-negociación',
-             'monetario-y-financiero',
-             'producción-y-empleo',
-             'sector-externo',
-             'tasas-de-interés',
-             'tipos-de-cambio',
-             'encuestas_economicas',
-             'finanzas-públicas',
-             'índices-de-precios']
+#: dict: Sector pages of the BCCR website, and the name of the corresponding sector in the charts catalog
+SECTORS = {
+    'mercado-negociación': 'Mercados_negociacion',
+    'monetario-y-financiero': 'Monetario_financiero',
+    'producción-y-empleo': 'Produccion_empleo',
+    'sector-externo': 'Sector_Externo',
+    'tasas-de-interés': 'Tasas_interes',
+    'tipos-de-cambio': 'Tipos_cambio',
+    'encuestas_economicas': 'Encuestas_economicas',
+    'finanzas-públicas': 'finanzas_publicas',
+    'índices-de-precios': 'Indices_Precios'
+}
 
-    urls = {page: baseURL + page for page in pages}
+CATALOG_FILE = os.path.join(DATA_FOLDER, 'cuadros.pkl')
+WEB_FILE = os.path.join(DATA_FOLDER, 'asReadFromBCCR.pkl')  # charts as listed in the website, read by updateIndicators
 
 
-    pagesCharts = []
-    for sector, url in urls.items():
-        print('Buscando cuadros en', url)
+def sectorCharts(page):
+    """
+        Find the charts listed in a sector page of the BCCR website
 
-        chartsList = list()
+    Parameters
+    ----------
+    page    : name of the sector page (one of the keys of SECTORS)
 
-        access_page = requests.get(url).content
-        soup = BeautifulSoup(access_page, 'lxml')
-        url_list_of_indicators = soup.findAll('iframe')[0]['src']
+    Returns
+    -------
+        A list of chart numbers (integers), in the order they appear in the page
+    """
+    soup = BeautifulSoup(transporte.texto('https://www.bccr.fi.cr/seccion-indicadores-economicos/' + page), 'lxml')
+    iframe = soup.find('iframe')['src']
+    soup = BeautifulSoup(transporte.texto(iframe), 'lxml')
 
-        sector_page = requests.get(url_list_of_indicators).content
-        soup = BeautifulSoup(sector_page, 'lxml')
+    charts = [int(a['href'].split('CodCuadro=')[1]) for a in soup.find_all('a', href=True)
+              if 'CodCuadro=' in a['href']]
+    return list(dict.fromkeys(charts))
 
-        print('\n\nsector = ', sector)
 
-        for kk in soup.find_all('a'):
-            link = kk['href']
-            if 'CodCuadro=' in link:
-                chartsList.append(int(link.split('CodCuadro=')[1]))
+def findAllCharts(catalog=CATALOG_FILE, output=WEB_FILE, refresh=(), threads=8, quiet=False):
+    """
+        Find the charts currently listed in the BCCR website, and merge them with the charts catalog
 
-        titlestable = readTitle(chartsList, False)
-        titlestable['sector'] = sector
-        print(titlestable)
-        pagesCharts.append(titlestable)
+        All sector pages (and their lists of charts) are downloaded concurrently. The charts found are compared with
+        the existing catalog, and titles are downloaded only for new charts, for charts that moved to another sector
+        and for charts in `refresh`. Charts no longer listed in the website are dropped. New charts are added with
+        chartFormat 'NOT-SUPPORTED-YET' (their format must be set by hand before PaginaWeb can read them).
 
-    data = pd.concat(pagesCharts, axis=0)
+        The charts as read from the website (title, subtitle and sector) are saved in `output`, which by default is the
+        file read by updateIndicators. The catalog itself is only read, never modified.
+
+    Parameters
+    ----------
+    catalog : path of the current catalog (default: bccr/data/cuadros.pkl). If None or missing, all titles are
+              downloaded
+    output  : where to save the title, subtitle and sector of the charts found (default: bccr/data/asReadFromBCCR.pkl).
+              The file is replaced atomically. If None, nothing is saved
+    refresh : an iterable of chart numbers whose titles must be downloaded again
+    threads : maximum number of simultaneous downloads (integer, default=8)
+    quiet   : print a summary of changes if False
+
+    Returns
+    -------
+        A pandas dataframe with the updated catalog (also with chartFormat and freq)
+    """
+    with ThreadPoolExecutor(max_workers=threads) as executor:
+        found = dict(zip(SECTORS.values(), executor.map(sectorCharts, SECTORS.keys())))
+
+    sectors = pd.Series({chart: sector for sector, charts in found.items() for chart in charts}, dtype=object)
+
+    if catalog and os.path.exists(catalog):
+        old = pd.read_pickle(catalog)
+    else:
+        old = pd.DataFrame(columns=['title', 'subtitle', 'sector', 'chartFormat', 'freq'])
+
+    known = sectors.index.intersection(old.index)
+    moved = known[old.loc[known, 'sector'].astype(object).values != sectors[known].values]
+    new = sectors.index.difference(old.index)
+    update = new.union(moved).union(known.intersection(pd.Index(list(refresh))))
+    dropped = old.index.difference(sectors.index)
+
+    '''MERGE THE CATALOG WITH THE CHARTS FOUND'''
+    data = old.reindex(sectors.index).astype({'sector': object, 'chartFormat': object})
+    data['sector'] = sectors
+    data.loc[new, 'chartFormat'] = 'NOT-SUPPORTED-YET'
+    data.loc[new, 'freq'] = '?'
+    if len(update):
+        titles = readTitle(list(update), threads=threads)
+        data.loc[update, ['title', 'subtitle']] = titles.loc[update, ['title', 'subtitle']].values
+
+    data.index.name = 'chart'
     data['sector'] = pd.Categorical(data['sector'])
+    data['chartFormat'] = pd.Categorical(data['chartFormat'])
+
+    if not quiet:
+        print(f'{len(sectors)} charts found: {len(new)} new, {len(moved)} moved to another sector, '
+              f'{len(dropped)} no longer listed')
+        for label, charts in (('New', new), ('Moved', moved), ('Dropped', dropped)):
+            if len(charts):
+                print(f'{label}: {", ".join(map(str, charts))}')
 
     '''SAVE THE DATA'''
-    oldDir = os.getcwd()
-    os.chdir(os.path.dirname(os.path.abspath(__file__)))
-    pd.to_pickle(data, './data/asReadFromBCCR.pkl')
-    os.chdir(oldDir)
+    if output:
+        web = data[['title', 'subtitle', 'sector']].rename_axis(None)  # same layout as the output of readTitle
+        fd, temp = tempfile.mkstemp(suffix='.pkl', dir=os.path.dirname(os.path.abspath(output)))
+        os.close(fd)
+        pd.to_pickle(web, temp)
+        os.replace(temp, output)
+
+    return data
 
 
 
@@ -130,14 +198,53 @@ def findAllCharts():
 
 
 
-def search(expression, match_all=True, subtitle=False):
+def _normalizedTitles(subtitle=False):
+    """
+        Normalized titles (lowercase, without accents) of all charts in the catalog, one by one and joined in a single
+        string
+
+        Computed once per catalog and kept with it (see loadIndicators), so that searches do not normalize the titles
+        again on every call.
+
+    Returns
+    -------
+        titles  : the normalized titles (list of strings)
+        text    : all normalized titles, one per line (string)
+        starts  : position in `text` where each title starts (numpy array of integers)
+    """
+    key = 'titles+subtitles' if subtitle else 'titles'
+    found = _INDICATORS.get(key)
+    if found is None:
+        indicators = loadIndicators()
+        titles = normalizar_texto(indicators['title'])
+        if subtitle:
+            titles = titles + ' ' + normalizar_texto(indicators['subtitle'])
+        titles = titles.str.replace('\n', ' ', regex=False)
+        starts = np.concatenate([[0], np.cumsum(titles.str.len().to_numpy() + 1)[:-1]])
+        found = _keep(key, (titles.to_list(), '\n'.join(titles), starts), indicators)
+    return found
+
+
+def _keep(key, value, indicators):
+    """Keep `value`, computed from the catalog `indicators`, unless another thread already did it
+
+    Under the lock, so that a value computed from a catalog that was reloaded meanwhile is not kept with the new one.
+    """
+    with _INDICATORS_LOCK:
+        if _INDICATORS.get('indicators') is not indicators:
+            return value
+        return _INDICATORS.setdefault(key, value)
+
+
+def search(expression, match_all=True, subtitle=False, regex=False):
     """
         Find indicators by (partial) name match
     Parameters
     ----------
-    expression  : A string to search in chart titles (case insensitive), terms separated by spaces
+    expression  : A string to search in chart titles, terms separated by spaces. The search ignores case and accents
     match_all   : match all terms if True, match any term if False
     subtitle    : whether to search in chart subtitle too.
+    regex       : if True, each term is a regular expression; if False (default), terms are matched literally
 
     Returns
     -------
@@ -151,26 +258,60 @@ def search(expression, match_all=True, subtitle=False):
         >>> search('precio consumidor')
         >>> search('exportaciones importaciones')
         >>> search('exportaciones importaciones', False)
+        >>> search('^tasa', regex=True)
     """
     indicators = loadIndicators()
-    titles = indicators['title'] + (indicators['subtitle'] if subtitle else '')
+    titles, text, starts = _normalizedTitles(subtitle)
 
-    tt = [titles.apply(lambda x: bool(re.search(name, x, re.IGNORECASE))) for name in expression.split()]
-    tt = pd.concat(tt, axis=1)
-    tt = tt.all(1) if match_all else tt.any(1)
-    results = indicators.loc[tt, ['title', 'subtitle', 'chartFormat']]
+    found = np.full(starts.size, match_all)
+    # regular expressions keep their case: lowercasing would turn escapes like \D, \S, \W into \d, \s, \w
+    for term in normalizar_texto(expression, minusculas=not regex).split():
+        if regex:  # each title on its own: a match in the joined text could span titles, or hide the next one
+            pattern = _compile(term, re.IGNORECASE)
+            matches = np.fromiter((pattern.search(title) is not None for title in titles), dtype=bool, count=len(titles))
+        else:  # a literal term has no line breaks, so it is found in the joined text at once
+            positions = np.fromiter((m.start() for m in _compile(re.escape(term)).finditer(text)), dtype=np.int64)
+            matches = np.zeros(starts.size, dtype=bool)
+            matches[np.searchsorted(starts, positions, side='right') - 1] = True
+        found = (found & matches) if match_all else (found | matches)
 
+    results = _INDICATORS.get('results')
+    if results is None:
+        results = indicators[['title', 'subtitle']].assign(
+            frequency=indicators['chartFormat'].astype(object).map(CHARTFREQUENCIES).str.lower())
+        results = _keep('results', results, indicators)
 
-    results['frequency'] = results['chartFormat'].apply(lambda x: CHARTFREQUENCIES[x].lower())
+    return results.iloc[np.flatnonzero(found)].copy()
 
-    return results[['title', 'subtitle', 'frequency']]
 
+@lru_cache(maxsize=256)
+def _compile(pattern, flags=0):
+    """Compiled regular expression (each pattern is compiled only once)"""
+    return re.compile(pattern, flags)
 
-def loadIndicators():
-    oldDir = os.getcwd()
-    os.chdir(os.path.dirname(os.path.abspath(__file__)))
-    indicators = pd.read_pickle('data/indicators.pkl')
-    os.chdir(oldDir)
+
+def loadIndicators(reload=False):
+    """
+        Catalog of indicators (data/indicators.pkl)
+
+        The catalog is read from disk only once per process (on first use, or when `reload` is True), and then shared
+        by all callers and threads. It must be treated as read-only: make a copy before modifying it.
+
+    Parameters
+    ----------
+    reload  : read the catalog from disk again, even if it is already loaded (boolean, default=False)
+
+    Returns
+    -------
+        A pandas dataframe, indexed by chart number
+    """
+    indicators = _INDICATORS.get('indicators')
+    if indicators is None or reload:
+        with _INDICATORS_LOCK:
+            if reload or 'indicators' not in _INDICATORS:
+                _INDICATORS.clear()  # also discard anything computed from the previous catalog
+                _INDICATORS['indicators'] = pd.read_pickle(INDICATORS_FILE)
+            indicators = _INDICATORS['indicators']
     return indicators
 
 
@@ -199,15 +340,11 @@ def updateIndicators():
         A pandas dataframe with metadata for all charts in the BCCR website
 
     '''
-    oldDir = os.getcwd()
-    os.chdir(os.path.dirname(os.path.abspath(__file__)))
-
     ''' OPEN DATABASES, DELETE DUPLICATES'''
-    webData = dropDuplicateIndices(pd.read_pickle('./data/asReadFromBCCR.pkl'))
-    chartData = dropDuplicateIndices(pd.read_excel('./data/allChartFormats.xlsx'))
+    webData = dropDuplicateIndices(pd.read_pickle(WEB_FILE))
+    chartData = dropDuplicateIndices(pd.read_excel(os.path.join(DATA_FOLDER, 'allChartFormats.xlsx')))
     indicators = pd.concat([webData, chartData], axis=1)
     indicators['chartFormat'] = pd.Categorical(indicators['chartFormat'])
     indicators.index.names = ['chart']
-    pd.to_pickle(indicators, './data/indicators.pkl')
-    os.chdir(oldDir)
-    return indicators
+    pd.to_pickle(indicators, INDICATORS_FILE)
+    return loadIndicators(reload=True)
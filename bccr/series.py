@@ -0,0 +1,224 @@
+"""
+series: Un módulo para definir la clase CacheSeries
+
+Este módulo define la clase CacheSeries, que guarda en memoria las series descargadas del servicio web del BCCR, tal
+como las devuelve `ServicioWeb.__descargar__` (antes de cambiar su frecuencia o rellenar datos faltantes). La usa la
+interfaz gráfica: al cambiar solo la frecuencia, la función de agregación o el método de relleno, la consulta se
+vuelve a ensamblar a partir de las series guardadas, sin consultar de nuevo al BCCR.
+
+    >>> from bccr import SW
+    >>> from bccr.series import CacheSeries
+    >>> cache = CacheSeries()
+    >>> serie = cache.obtener('3541', '2020/01/01', None, SW.__descargar__)
+
+Además, para cada serie guardada se pueden materializar sus agregaciones a menor frecuencia (una por cada función de
+`bccr.gee.FUNCS` y frecuencia solicitadas), de manera que leer la versión mensual o trimestral de una serie diaria no
+requiere volver a calcularla:
+
+    >>> mensual = cache.resumen('3541', '2020/01/01', None, 'M', 'mean', nativa='D')
+
+Cuando la serie se vuelve a descargar (al vencer su vigencia), solo se recalculan los últimos períodos de cada
+agregación, siempre que las observaciones anteriores no hayan cambiado.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+
+import pandas as pd
+
+#: tuple: Frecuencias de las agregaciones que se actualizan por partes (sus períodos no dependen de la primera fecha)
+INCREMENTALES = ('A', 'Q', 'M', 'W')
+
+
+def agregar(serie, freq, func, nativa=None):
+    """Cambiar la frecuencia de `serie` a `freq` con la función `func` (igual que `ServicioWeb.datos`)
+
+    Parameters
+    ----------
+    serie : pd.Series
+        datos indexados por fecha
+    freq : str
+        frecuencia del resultado
+    func : str
+        una de las funciones de `bccr.gee.FUNCS`
+    nativa : str, optional
+        frecuencia original de la serie: antes de agregarla, se llenan los espacios en su línea de tiempo
+
+    Returns
+    -------
+    pd.Series
+    """
+    from .gee import FUNCS
+
+    serie = serie.resample(nativa).mean() if nativa else serie
+    return serie.resample(freq).agg(FUNCS[func])
+
+
+def actualizar(anterior, resumen, serie, freq, func, nativa=None):
+    """Agregación de `serie`, reutilizando la agregación `resumen` de la serie `anterior`
+
+    Si `serie` tiene las mismas observaciones que `anterior` hasta el inicio del último período de `resumen` (es decir,
+    solo tiene observaciones nuevas o revisadas en los últimos períodos), solo se recalculan esos últimos períodos. De
+    lo contrario, se recalcula toda la agregación.
+    """
+    if freq not in INCREMENTALES or len(resumen) < 2:
+        return agregar(serie, freq, func, nativa)
+
+    corte = resumen.index[-2]  # las observaciones posteriores pertenecen al último período (o a períodos nuevos)
+    if not serie[serie.index <= corte].equals(anterior[anterior.index <= corte]):
+        return agregar(serie, freq, func, nativa)
+
+    nuevos = serie[serie.index > corte]
+    if nuevos.empty:
+        return resumen[resumen.index <= corte]
+    return pd.concat([resumen[resumen.index <= corte], agregar(nuevos, freq, func, nativa)])
+
+
+@dataclass
+class CacheSeries:
+    """
+    Caché en memoria de series descargadas, indexada por código de indicador y rango de fechas
+
+    Attributes
+    ----------
+    maximo : int
+        número máximo de series guardadas; al superarlo se desechan las usadas menos recientemente.
+    vigencia : float
+        segundos durante los cuales se usa una serie guardada (predeterminado: una hora). Las series sin fecha final
+        incluyen datos nuevos cada día, por lo que no conviene guardarlas indefinidamente.
+    """
+    maximo: int = 256
+    vigencia: float = 3600
+
+    def __post_init__(self):
+        self.__candado__ = threading.Lock()
+        self.__series__ = OrderedDict()  # (codigo, FechaInicio, FechaFinal) -> (momento de descarga, serie)
+        self.__resumenes__ = dict()  # (llave de la serie, freq, func, nativa) -> (serie agregada, agregación)
+
+    @staticmethod
+    def llave(codigo, FechaInicio=None, FechaFinal=None):
+        """Llave de una serie en la caché"""
+        return str(codigo), str(FechaInicio) if FechaInicio else None, str(FechaFinal) if FechaFinal else None
+
+    def obtener(self, codigo, FechaInicio, FechaFinal, descargar):
+        """Obtener una serie, descargándola solo si no está guardada
+
+        Parameters
+        ----------
+        codigo : str or int
+            código del indicador
+        FechaInicio, FechaFinal : str, optional
+            rango de fechas de la consulta
+        descargar : callable
+            función que descarga la serie, con parámetros (codigo, FechaInicio, FechaFinal). Puede devolver None (p.ej.
+            si el indicador no existe); ese resultado también se guarda.
+
+        Returns
+        -------
+        pd.Series or None
+            la serie, que no debe modificarse (es compartida por todas las consultas)
+        """
+        llave = self.llave(codigo, FechaInicio, FechaFinal)
+        with self.__candado__:
+            guardada = self.__series__.get(llave)
+            if guardada is not None and time.time() - guardada[0] < self.vigencia:
+                self.__series__.move_to_end(llave)
+                return guardada[1]
+
+        serie = descargar(str(codigo), FechaInicio, FechaFinal)
+        with self.__candado__:
+            self.__series__[llave] = (time.time(), serie)
+            self.__series__.move_to_end(llave)
+            while len(self.__series__) > self.maximo:
+                desechada, _ = self.__series__.popitem(last=False)
+                for clave in [clave for clave in self.__resumenes__ if clave[0] == desechada]:
+                    del self.__resumenes__[clave]
+        return serie
+
+    def cubre(self, codigo, FechaInicio=None, FechaFinal=None):
+        """Una serie guardada del indicador cuyo rango de fechas incluye el rango pedido, para no descargarla de nuevo
+
+        Las fechas deben estar en formato 'yyyy/mm/dd' (para compararlas como texto); None significa sin límite.
+
+        Returns
+        -------
+        pd.Series or pd.DataFrame or None
+            la serie guardada (completa: se debe recortar al rango pedido), o None si no hay ninguna que lo incluya
+        """
+        codigo, inicio, final = self.llave(codigo, FechaInicio, FechaFinal)
+        ahora = time.time()
+        with self.__candado__:
+            for llave, (momento, serie) in reversed(self.__series__.items()):
+                if llave[0] != codigo or serie is None or ahora - momento >= self.vigencia:
+                    continue
+                if (llave[1] is None or (inicio is not None and llave[1] <= inicio)) and \
+                        (llave[2] is None or (final is not None and llave[2] >= final)):
+                    self.__series__.move_to_end(llave)
+                    return serie
+        return None
+
+    def resumen(self, codigo, FechaInicio, FechaFinal, freq, func, nativa=None):
+        """Agregación de una serie guardada a la frecuencia `freq`, calculada solo una vez
+
+        La agregación se guarda junto con la serie. Si la serie se descargó de nuevo desde que se calculó, solo se
+        recalculan los últimos períodos (ver `actualizar`).
+
+        Parameters
+        ----------
+        codigo : str or int
+            código del indicador
+        FechaInicio, FechaFinal : str, optional
+            rango de fechas de la consulta con que se guardó la serie
+        freq : str
+            frecuencia de la agregación
+        func : str
+            una de las funciones de `bccr.gee.FUNCS`
+        nativa : str, optional
+            frecuencia original de la serie
+
+        Returns
+        -------
+        pd.Series or None
+            la agregación, indexada por la fecha final de cada período (no debe modificarse); None si la serie no está
+            guardada o ya venció.
+        """
+        llave = self.llave(codigo, FechaInicio, FechaFinal)
+        with self.__candado__:
+            momento, serie = self.__series__.get(llave, (0, None))
+        if serie is None or time.time() - momento >= self.vigencia:
+            return None
+
+        clave = (llave, freq, func, nativa)
+        with self.__candado__:
+            anterior, resumen = self.__resumenes__.get(clave, (None, None))
+        if anterior is serie:
+            return resumen
+
+        if anterior is None:
+            resumen = agregar(serie, freq, func, nativa)
+        else:
+            resumen = actualizar(anterior, resumen, serie, freq, func, nativa)
+        with self.__candado__:
+            if llave in self.__series__:
+                self.__resumenes__[clave] = (serie, resumen)
+        return resumen
+
+    def limpiar(self):
+        """Desechar todas las series guardadas"""
+        with self.__candado__:
+            self.__series__.clear()
+            self.__resumenes__.clear()
+
+    def __contains__(self, llave):
+        return llave in self.__series__
+
+    def __len__(self):
+        return len(self.__series__)
+
+    def __str__(self):
+        return f"Clase CacheSeries: {len(self)} series guardadas (máximo {self.maximo})."
+
+    def __repr__(self):
+        return self.__str__()
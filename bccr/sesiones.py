@@ -0,0 +1,308 @@
+"""
+sesiones: Un módulo para guardar los datos de cada sesión de la interfaz gráfica
+
+La interfaz gráfica (`bccr.gui`) guarda en el servidor los resultados de la última consulta de cada usuario, para
+poder descargarlos después como archivos. Cada pestaña del navegador tiene su propia sesión (identificada por un texto
+aleatorio guardado en el navegador), de manera que varios usuarios pueden compartir el mismo servidor sin sobrescribir
+los datos de los demás.
+
+Hay dos tipos de almacén, con la misma interfaz (`guardar`, `leer`, `borrar`):
+
+* AlmacenMemoria: en la memoria del proceso. Es el predeterminado, y sirve cuando el servidor tiene un solo proceso.
+* AlmacenDisco: en un archivo SQLite, que pueden compartir varios procesos (p.ej., varios workers de gunicorn).
+
+Ambos tienen un tamaño máximo y desechan primero los datos usados menos recientemente, excepto las claves `fijas`
+(valores pequeños de control, como el estado de las tareas de `bccr.tareas`), que solo se desechan al vencer. El método
+`modificar` lee y guarda valores de una sesión en una sola operación atómica. La función `crear_almacen` escoge uno de
+los almacenes según la variable de ambiente `BCCR_SESIONES`:
+
+    >>> from bccr.sesiones import crear_almacen
+    >>> almacen = crear_almacen()                       # en memoria
+    >>> almacen = crear_almacen('/srv/bccr/sesiones.sqlite')  # compartido entre procesos
+    >>> almacen.guardar(sesion, 'datos', tabla)
+    >>> almacen.leer(sesion, 'datos')
+"""
+
+import os
+import pickle
+import sqlite3
+import sys
+import threading
+import time
+import zlib
+from collections import OrderedDict
+from dataclasses import dataclass
+
+import pandas as pd
+
+#: tuple: Claves que no se desechan para cumplir con el presupuesto del almacén: el estado de las tareas (ver
+#: `bccr.tareas`), que es pequeño y sin el cual la página no sabría que su consulta terminó
+FIJAS = ('tarea', 'cancelar')
+
+
+def tamaño(valor):
+    """Tamaño aproximado (en bytes) de un valor guardado en la memoria"""
+    if isinstance(valor, (pd.DataFrame, pd.Series)):
+        return int(valor.memory_usage(deep=True).sum()) if isinstance(valor, pd.DataFrame) \
+            else int(valor.memory_usage(deep=True))
+    if isinstance(valor, (bytes, str)):
+        return len(valor)
+    return sys.getsizeof(valor)
+
+
+@dataclass
+class AlmacenMemoria:
+    """
+    Almacén de datos de sesiones en la memoria del proceso
+
+    Attributes
+    ----------
+    presupuesto : int
+        tamaño máximo (en bytes, aproximado) de los datos guardados; al excederlo, se desechan los usados menos
+        recientemente.
+    vigencia : float
+        segundos sin uso después de los cuales se desechan los datos de una sesión (predeterminado: un día).
+    fijas : tuple
+        claves que no cuentan para el presupuesto ni se desechan para cumplirlo (solo al vencer)
+    """
+    presupuesto: int = 500 * 2**20
+    vigencia: float = 24 * 3600
+    fijas: tuple = FIJAS
+
+    def __post_init__(self):
+        self.__candado__ = threading.Lock()
+        self.__datos__ = OrderedDict()  # (sesion, clave) -> (usado, tamaño, valor)
+
+    def guardar(self, sesion, clave, valor):
+        """Guardar un valor de la sesión `sesion` (reemplaza el valor anterior con la misma clave)"""
+        tam = tamaño(valor)
+        with self.__candado__:
+            self.__datos__[(sesion, clave)] = (time.time(), tam, valor)
+            self.__datos__.move_to_end((sesion, clave))
+            self.__podar__()
+
+    def leer(self, sesion, clave, predeterminado=None):
+        """Valor guardado de la sesión `sesion`, o `predeterminado` si no existe o ya se desechó"""
+        with self.__candado__:
+            return self.__leer__(sesion, clave, predeterminado)
+
+    def modificar(self, sesion, clave, funcion, predeterminado=None):
+        """Leer el valor `clave` de la sesión y guardar los valores que devuelve `funcion(valor)`, atómicamente
+
+        Parameters
+        ----------
+        sesion, clave :
+            el valor a leer (`predeterminado` si no existe)
+        funcion : callable
+            recibe el valor leído y devuelve un diccionario clave: valor con los valores a guardar en la sesión (vacío
+            para no guardar nada). Ningún otro hilo lee ni guarda valores mientras se ejecuta.
+
+        Returns
+        -------
+        dict
+            los valores guardados
+        """
+        with self.__candado__:
+            nuevos = funcion(self.__leer__(sesion, clave, predeterminado))
+            for otra, valor in nuevos.items():
+                self.__datos__[(sesion, otra)] = (time.time(), tamaño(valor), valor)
+                self.__datos__.move_to_end((sesion, otra))
+            self.__podar__()
+        return nuevos
+
+    def __leer__(self, sesion, clave, predeterminado):
+        guardado = self.__datos__.get((sesion, clave))
+        if guardado is None:
+            return predeterminado
+        if time.time() - guardado[0] > self.vigencia:
+            del self.__datos__[(sesion, clave)]
+            return predeterminado
+        self.__datos__[(sesion, clave)] = (time.time(),) + guardado[1:]
+        self.__datos__.move_to_end((sesion, clave))
+        return guardado[2]
+
+    def borrar(self, sesion, clave=None):
+        """Desechar un valor de la sesión `sesion` (o todos, si `clave` es None)"""
+        with self.__candado__:
+            for llave in [llave for llave in self.__datos__ if llave[0] == sesion and clave in (None, llave[1])]:
+                del self.__datos__[llave]
+
+    def __podar__(self):
+        """Desechar los datos vencidos y los usados menos recientemente hasta cumplir con el presupuesto"""
+        ahora = time.time()
+        total = sum(tam for (_, clave), (_, tam, _) in self.__datos__.items() if clave not in self.fijas)
+        for llave, (usado, tam, _) in list(self.__datos__.items()):
+            fija = llave[1] in self.fijas
+            if ahora - usado > self.vigencia:
+                del self.__datos__[llave]
+                total -= 0 if fija else tam
+            elif total <= self.presupuesto:
+                break  # los demás se usaron más recientemente: tampoco están vencidos
+            elif not fija:
+                del self.__datos__[llave]
+                total -= tam
+
+    def __len__(self):
+        return len(self.__datos__)
+
+    def __str__(self):
+        return f"Clase AlmacenMemoria: {len(self)} valores guardados en memoria."
+
+    def __repr__(self):
+        return self.__str__()
+
+
+@dataclass
+class AlmacenDisco:
+    """
+    Almacén de datos de sesiones en un archivo SQLite, que pueden compartir varios procesos
+
+    Attributes
+    ----------
+    archivo : str
+        ruta del archivo SQLite.
+    presupuesto : int
+        tamaño máximo (en bytes, ya comprimidos) de los datos guardados; al excederlo, se desechan los usados menos
+        recientemente.
+    vigencia : float
+        segundos sin uso después de los cuales se desechan los datos de una sesión (predeterminado: un día).
+    nivel : int
+        nivel de compresión de zlib (1 a 9).
+    fijas : tuple
+        claves que no cuentan para el presupuesto ni se desechan para cumplirlo (solo al vencer)
+    """
+    archivo: str
+    presupuesto: int = 2 * 2**30
+    vigencia: float = 24 * 3600
+    nivel: int = 1
+    fijas: tuple = FIJAS
+
+    def __post_init__(self):
+        os.makedirs(os.path.dirname(os.path.abspath(self.archivo)), exist_ok=True)
+        self.__candado__ = threading.Lock()
+        self.__proceso__ = None
+        with self.__candado__, self.__conexion__() as con:
+            con.execute("PRAGMA journal_mode=WAL")  # lectores de otros procesos no bloquean las escrituras
+            con.execute("""CREATE TABLE IF NOT EXISTS sesiones (
+                               sesion TEXT,
+                               clave TEXT,
+                               datos BLOB,
+                               tamano INTEGER,
+                               usado REAL,
+                               PRIMARY KEY (sesion, clave))""")
+            con.execute("CREATE INDEX IF NOT EXISTS sesiones_usado ON sesiones (usado)")
+        # el almacén suele crearse antes de los procesos del servidor (`gunicorn --preload`): SQLite no permite que
+        # un proceso hijo herede una conexión abierta, por lo que cada proceso abre la suya al usar el almacén
+        self.cerrar()
+
+    def __conexion__(self):
+        """Conexión con el archivo, propia de cada proceso: una conexión abierta antes de crear los procesos del servidor
+        (p.ej., con `gunicorn --preload`) no debe usarse en ellos"""
+        if self.__proceso__ != os.getpid():
+            self.__proceso__ = os.getpid()
+            self.__con__ = sqlite3.connect(self.archivo, timeout=30, check_same_thread=False)
+        return self.__con__
+
+    def guardar(self, sesion, clave, valor):
+        """Guardar un valor de la sesión `sesion` (reemplaza el valor anterior con la misma clave)"""
+        datos = zlib.compress(pickle.dumps(valor, protocol=pickle.HIGHEST_PROTOCOL), self.nivel)
+        with self.__candado__, self.__conexion__() as con:
+            con.execute("INSERT OR REPLACE INTO sesiones VALUES (?, ?, ?, ?, ?)",
+                        (sesion, clave, datos, len(datos), time.time()))
+            self.__podar__(con)
+
+    def leer(self, sesion, clave, predeterminado=None):
+        """Valor guardado de la sesión `sesion`, o `predeterminado` si no existe o ya se desechó"""
+        with self.__candado__, self.__conexion__() as con:
+            datos = self.__leer__(con, sesion, clave)
+        return predeterminado if datos is None else pickle.loads(zlib.decompress(datos))
+
+    def modificar(self, sesion, clave, funcion, predeterminado=None):
+        """Leer el valor `clave` de la sesión y guardar los valores que devuelve `funcion(valor)`, atómicamente
+
+        La lectura y la escritura se hacen en una sola transacción, que bloquea las escrituras de los demás procesos.
+        Ver `AlmacenMemoria.modificar`.
+        """
+        with self.__candado__, self.__conexion__() as con:
+            con.execute("BEGIN IMMEDIATE")
+            datos = self.__leer__(con, sesion, clave)
+            nuevos = funcion(predeterminado if datos is None else pickle.loads(zlib.decompress(datos)))
+            for otra, valor in nuevos.items():
+                datos = zlib.compress(pickle.dumps(valor, protocol=pickle.HIGHEST_PROTOCOL), self.nivel)
+                con.execute("INSERT OR REPLACE INTO sesiones VALUES (?, ?, ?, ?, ?)",
+                            (sesion, otra, datos, len(datos), time.time()))
+            self.__podar__(con)
+        return nuevos
+
+    def __leer__(self, con, sesion, clave):
+        """Datos comprimidos del valor guardado, o None"""
+        ahora = time.time()
+        fila = con.execute("SELECT datos, usado FROM sesiones WHERE sesion = ? AND clave = ?",
+                           (sesion, clave)).fetchone()
+        if fila is None:
+            return None
+        if ahora - fila[1] > self.vigencia:
+            con.execute("DELETE FROM sesiones WHERE sesion = ? AND clave = ?", (sesion, clave))
+            return None
+        con.execute("UPDATE sesiones SET usado = ? WHERE sesion = ? AND clave = ?", (ahora, sesion, clave))
+        return fila[0]
+
+    def borrar(self, sesion, clave=None):
+        """Desechar un valor de la sesión `sesion` (o todos, si `clave` es None)"""
+        with self.__candado__, self.__conexion__() as con:
+            if clave is None:
+                con.execute("DELETE FROM sesiones WHERE sesion = ?", (sesion,))
+            else:
+                con.execute("DELETE FROM sesiones WHERE sesion = ? AND clave = ?", (sesion, clave))
+
+    def __podar__(self, con):
+        """Desechar los datos vencidos y los usados menos recientemente hasta cumplir con el presupuesto"""
+        con.execute("DELETE FROM sesiones WHERE usado < ?", (time.time() - self.vigencia,))
+        fijas = f"clave NOT IN ({', '.join('?' * len(self.fijas))})" if self.fijas else "1"
+        total = con.execute(f"SELECT COALESCE(SUM(tamano), 0) FROM sesiones WHERE {fijas}", self.fijas).fetchone()[0]
+        if total <= self.presupuesto:
+            return
+        desechar = []
+        for sesion, clave, tamano in con.execute(f"SELECT sesion, clave, tamano FROM sesiones WHERE {fijas} "
+                                                 "ORDER BY usado", self.fijas):
+            if total <= self.presupuesto:
+                break
+            desechar.append((sesion, clave))
+            total -= tamano
+        con.executemany("DELETE FROM sesiones WHERE sesion = ? AND clave = ?", desechar)
+
+    def cerrar(self):
+        """Cerrar la conexión con el archivo"""
+        with self.__candado__:
+            if self.__proceso__ is not None:
+                self.__con__.close()
+                self.__proceso__ = None
+
+    def __len__(self):
+        with self.__candado__:
+            return self.__conexion__().execute("SELECT COUNT(*) FROM sesiones").fetchone()[0]
+
+    def __str__(self):
+        return f"Clase AlmacenDisco: {len(self)} valores guardados en {self.archivo}."
+
+    def __repr__(self):
+        return self.__str__()
+
+
+def crear_almacen(archivo=None, **opciones):
+    """Crear el almacén de sesiones de la interfaz gráfica
+
+    Parameters
+    ----------
+    archivo : str, optional
+        ruta de un archivo SQLite para usar `AlmacenDisco`. Si no se indica, se usa la variable de ambiente
+        `BCCR_SESIONES`; si esta tampoco está definida, se usa `AlmacenMemoria`.
+    opciones :
+        parámetros del almacén (presupuesto, vigencia, ...)
+
+    Returns
+    -------
+    AlmacenMemoria or AlmacenDisco
+    """
+    archivo = archivo if archivo else os.environ.get('BCCR_SESIONES')
+    return AlmacenDisco(archivo, **opciones) if archivo else AlmacenMemoria(**opciones)
@@ -0,0 +1,178 @@
+"""
+tabla: Un módulo para leer los cuadros HTML exportados por la página de indicadores económicos del BCCR
+
+Los cuadros de `frmVerCatCuadro.aspx` tienen siempre la misma estructura: en las primeras filas el título y los
+subtítulos del cuadro, luego una fila de encabezados (la primera fila con todas sus celdas llenas) y finalmente el
+cuerpo, donde la primera columna identifica cada fila y el resto son números escritos con "." como separador de
+miles y "," como separador decimal (p.ej. "1.234,56").
+
+La función `leer_tabla` recorre el HTML una sola vez y convierte el cuerpo completo en una matriz de NumPy, sin
+procesar las celdas una por una con pandas.
+
+    >>> from bccr import transporte
+    >>> from bccr.tabla import leer_tabla
+    >>> tabla = leer_tabla(transporte.texto(PW.api(17)))
+    >>> tabla.titulo, tabla.valores.shape
+"""
+
+from dataclasses import dataclass
+
+import lxml.html
+from lxml import etree
+import numpy as np
+import pandas as pd
+
+
+@dataclass
+class TablaCuadro:
+    """
+    Contenido de un cuadro de la página de indicadores económicos
+
+    Attributes
+    ----------
+    titulo : str
+        título del cuadro
+    subtitulo : str
+        subtítulo del cuadro (si hay dos subtítulos, se unen con ' --- ')
+    filas : np.ndarray
+        etiquetas de las filas del cuerpo (primera columna del cuadro), como texto
+    columnas : np.ndarray
+        encabezados de las columnas del cuerpo, como texto
+    valores : np.ndarray
+        matriz de números (float) con el cuerpo del cuadro, de tamaño len(filas) x len(columnas). Las celdas vacías
+        son NaN.
+    """
+    titulo: str
+    subtitulo: str
+    filas: np.ndarray
+    columnas: np.ndarray
+    valores: np.ndarray
+
+    def to_frame(self):
+        """Cuerpo del cuadro como pd.DataFrame, con título y subtítulo en el atributo `_metadata`"""
+        datos = pd.DataFrame(self.valores, index=pd.Index(self.filas), columns=pd.Index(self.columnas))
+        datos._metadata = {'title': self.titulo, 'subtitle': self.subtitulo}
+        return datos
+
+
+def convertir_numeros(celdas):
+    """Convertir texto en formato numérico del BCCR ("1.234,56") a números
+
+    Parameters
+    ----------
+    celdas : np.ndarray
+        arreglo de textos, de cualquier dimensión. Las celdas vacías ('') se convierten en NaN.
+
+    Returns
+    -------
+    np.ndarray
+        arreglo de float con la misma forma que `celdas`
+
+    Examples
+    --------
+    >>> convertir_numeros(np.array(['1.234,56', '', '-0,5']))
+    array([1234.56,     nan,   -0.5 ])
+    """
+    celdas = np.asarray(celdas, dtype=str)
+    if celdas.size == 0:
+        return np.empty(celdas.shape, dtype=float)
+    texto = np.char.replace(np.char.replace(celdas, '.', ''), ',', '.')
+    texto = np.where(texto == '', 'nan', texto)
+    try:
+        return texto.astype(float)
+    except ValueError:  # alguna celda no es numérica (p.ej. "n.d."): se interpreta como faltante
+        return pd.to_numeric(pd.Series(texto.ravel()), errors='coerce').to_numpy(dtype=float).reshape(texto.shape)
+
+
+def _celdas(tabla):
+    """Textos de las celdas de cada fila no vacía de una tabla HTML, repitiendo las celdas con `colspan`"""
+    filas = []
+    for tr in tabla.iter('tr'):
+        fila = []
+        for celda in tr:
+            if celda.tag not in ('td', 'th'):
+                continue
+            # casi todas las celdas contienen solo texto: evitar itertext() cuando no tienen elementos internos
+            texto = (''.join(celda.itertext()) if len(celda) else (celda.text or '')).strip()
+            span = celda.get('colspan')
+            if span and span.isdigit():
+                fila.extend([texto] * int(span))
+            else:
+                fila.append(texto)
+        if any(fila):
+            filas.append(fila)
+    return filas
+
+
+def leer_encabezado(fragmentos, filas=3):
+    """Leer el título y subtítulos de un cuadro a partir de los primeros fragmentos de su HTML
+
+    Los fragmentos se procesan a medida que llegan, y se deja de leer en cuanto se completan las primeras `filas`
+    filas no vacías del cuadro, de manera que no es necesario descargar el cuadro completo.
+
+    Parameters
+    ----------
+    fragmentos : iterable of str
+        fragmentos sucesivos del HTML del cuadro (p.ej., `bccr.transporte.fragmentos(PW.api(cuadro))`)
+    filas : int, optional
+        número de filas del encabezado (predeterminado: 3, título y dos subtítulos)
+
+    Returns
+    -------
+    titulo : str
+        título del cuadro (None si no tiene)
+    subtitulo : str
+        subtítulo del cuadro, como en `TablaCuadro.subtitulo` (None si no tiene)
+    """
+    lector = etree.HTMLPullParser(events=('end',), tag='tr')
+    primeras = []
+    for fragmento in fragmentos:
+        lector.feed(fragmento)
+        for _, tr in lector.read_events():
+            primeras += [fila[0] if fila else '' for fila in _celdas(tr)]
+        if len(primeras) >= filas:
+            break
+    if hasattr(fragmentos, 'close'):
+        fragmentos.close()
+
+    titulo, subtitulo, subts2 = (primeras + ['', '', ''])[:3]
+    if subts2:
+        subtitulo += ' --- %s' % subts2
+    return titulo if titulo else None, subtitulo if subtitulo else None
+
+
+def leer_tabla(html):
+    """Leer un cuadro HTML exportado por la página de indicadores económicos del BCCR
+
+    Parameters
+    ----------
+    html : str
+        texto HTML del cuadro (p.ej., obtenido con `bccr.transporte.texto(PW.api(cuadro))`)
+
+    Returns
+    -------
+    TablaCuadro
+    """
+    documento = lxml.html.fromstring(html)
+    tabla = documento if documento.tag == 'table' else documento.find('.//table')
+    if tabla is None:
+        raise ValueError('El documento no contiene ningún cuadro')
+
+    filas = _celdas(tabla)
+    ancho = max(len(fila) for fila in filas)
+    celdas = np.array([fila + [''] * (ancho - len(fila)) for fila in filas], dtype=object)
+
+    titulo, subtitulo, subts2 = (list(celdas[:3, 0]) + ['', '', ''])[:3]
+    if subts2:
+        subtitulo += ' --- %s' % subts2
+
+    llenas = np.flatnonzero((celdas[:, 1:] != '').all(axis=1))
+    if llenas.size == 0:
+        raise ValueError('No se encontró la fila de encabezados del cuadro')
+    h = llenas[0]
+
+    return TablaCuadro(titulo=titulo if titulo else None,
+                       subtitulo=subtitulo if subtitulo else None,
+                       filas=celdas[h + 1:, 0].astype(str),
+                       columnas=celdas[h, 1:].astype(str),
+                       valores=convertir_numeros(celdas[h + 1:, 1:].astype(str)))
@@ -0,0 +1,177 @@
+"""
+tareas: Un módulo para ejecutar en segundo plano las consultas largas de la interfaz gráfica
+
+Descargar varios indicadores diarios puede tardar más que el tiempo máximo de espera de una solicitud del navegador.
+En lugar de bloquear el servidor durante la descarga, la interfaz gráfica inicia una tarea en segundo plano con
+`Tareas.iniciar`, y la página consulta periódicamente su avance con `Tareas.estado`. La tarea informa su avance (y
+sus resultados parciales) por medio de un objeto `Avance`, y puede ser cancelada por el usuario.
+
+El estado de las tareas y sus resultados se guardan en el almacén de sesiones (ver `bccr.sesiones`), de manera que
+cualquier proceso del servidor puede informar el avance de una tarea o cancelarla. El estado ('tarea') es una de las
+claves fijas del almacén: no se desecha para dar espacio a resultados grandes.
+
+    >>> from bccr.sesiones import crear_almacen
+    >>> from bccr.tareas import Tareas
+    >>> tareas = Tareas(crear_almacen())
+    >>> def contar(avance, n):
+    ...     for k in range(n):
+    ...         if avance.cancelado():
+    ...             return
+    ...         avance.informar(k + 1, n, resultado=k)
+    >>> tareas.iniciar('sesion-1', contar, 10)
+    >>> tareas.estado('sesion-1')
+"""
+
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+
+#: tuple: Estados en que una tarea ya terminó
+TERMINADA = ('lista', 'cancelada', 'error')
+
+
+@dataclass
+class Avance:
+    """
+    Medio por el cual una tarea informa su avance y revisa si fue cancelada
+
+    Attributes
+    ----------
+    almacen : AlmacenMemoria or AlmacenDisco
+        almacén de sesiones
+    sesion : str
+        sesión que inició la tarea
+    tarea : str
+        identificador de la tarea
+    """
+    almacen: object
+    sesion: str
+    tarea: str
+
+    def vigente(self):
+        """True si esta sigue siendo la tarea actual de la sesión (no fue reemplazada por una consulta nueva)"""
+        estado = self.almacen.leer(self.sesion, 'tarea')
+        return estado is not None and estado['id'] == self.tarea
+
+    def cancelado(self):
+        """True si el usuario canceló la tarea, o si inició otra en la misma sesión"""
+        return self.almacen.leer(self.sesion, 'cancelar') == self.tarea or not self.vigente()
+
+    def informar(self, hechos, total=None, mensaje='', estado='en curso', **resultados):
+        """Informar el avance de la tarea
+
+        Parameters
+        ----------
+        hechos : int
+            número de pasos terminados
+        total : int, optional
+            número total de pasos
+        mensaje : str, optional
+            descripción del avance, para mostrar al usuario
+        estado : str, optional
+            'en curso' (predeterminado), 'lista', 'cancelada' o 'error'
+        resultados :
+            resultados (parciales o finales) de la tarea, que se guardan en la sesión con su nombre como clave
+
+        Returns
+        -------
+        None
+        """
+        def actualizar(anterior):
+            # si la sesión inició otra tarea (o su estado venció), esta ya no guarda nada
+            if anterior is None or anterior['id'] != self.tarea:
+                return dict()
+            return dict(resultados, tarea=dict(anterior, estado=estado, hechos=hechos, mensaje=mensaje,
+                                               total=total if total is not None else anterior['total'],
+                                               version=anterior['version'] + 1, actualizado=time.time()))
+
+        # revisar que la tarea sigue vigente y guardar sus resultados en una sola operación, para que una tarea
+        # reemplazada no sobrescriba los resultados de la nueva
+        self.almacen.modificar(self.sesion, 'tarea', actualizar)
+
+
+@dataclass
+class Tareas:
+    """
+    Ejecutor de tareas en segundo plano, una por sesión
+
+    Attributes
+    ----------
+    almacen : AlmacenMemoria or AlmacenDisco
+        almacén de sesiones, donde se guardan el estado y los resultados de las tareas
+    hilos : int
+        número máximo de tareas que se ejecutan simultáneamente (las demás esperan su turno)
+    """
+    almacen: object
+    hilos: int = 4
+
+    def __post_init__(self):
+        self.__candado__ = threading.Lock()
+        self.__ejecutor__ = None
+
+    def iniciar(self, sesion, funcion, *args, **kwargs):
+        """Iniciar una tarea en segundo plano, reemplazando la tarea anterior de la sesión (si la hay)
+
+        Parameters
+        ----------
+        sesion : str
+            identificador de la sesión
+        funcion : callable
+            la tarea; recibe un objeto `Avance` como primer argumento, seguido de `args` y `kwargs`
+        args, kwargs :
+            parámetros de la tarea
+
+        Returns
+        -------
+        str
+            identificador de la tarea
+        """
+        tarea = uuid.uuid4().hex
+        self.almacen.guardar(sesion, 'tarea', dict(id=tarea, estado='en espera', hechos=0, total=None, mensaje='',
+                                                   version=0, actualizado=time.time()))
+        with self.__candado__:
+            if self.__ejecutor__ is None:  # los hilos se crean solo cuando se necesitan
+                self.__ejecutor__ = ThreadPoolExecutor(max_workers=self.hilos, thread_name_prefix='bccr-tarea')
+            self.__ejecutor__.submit(self.__ejecutar__, Avance(self.almacen, sesion, tarea), funcion, args, kwargs)
+        return tarea
+
+    @staticmethod
+    def __ejecutar__(avance, funcion, args, kwargs):
+        if avance.cancelado():
+            avance.informar(0, mensaje='Consulta cancelada', estado='cancelada')
+            return
+        try:
+            funcion(avance, *args, **kwargs)
+        except Exception as error:
+            avance.informar(0, mensaje=f'Error: {error}', estado='error')
+            return
+        estado = avance.almacen.leer(avance.sesion, 'tarea')
+        if estado is not None and estado['estado'] not in TERMINADA:
+            cancelada = avance.cancelado()
+            avance.informar(estado['hechos'], mensaje=estado['mensaje'],
+                            estado='cancelada' if cancelada else 'lista')
+
+    def cancelar(self, sesion):
+        """Pedir la cancelación de la tarea actual de la sesión (la tarea se detiene en su próximo paso)"""
+        estado = self.almacen.leer(sesion, 'tarea')
+        if estado is not None and estado['estado'] not in TERMINADA:
+            self.almacen.guardar(sesion, 'cancelar', estado['id'])
+
+    def estado(self, sesion):
+        """Estado de la tarea actual de la sesión
+
+        Returns
+        -------
+        dict or None
+            con llaves 'id', 'estado', 'hechos', 'total', 'mensaje' y 'version' (aumenta cada vez que la tarea informa
+            su avance). None si la sesión no tiene tareas.
+        """
+        return self.almacen.leer(sesion, 'tarea')
+
+    def __str__(self):
+        return f"Clase Tareas: ejecuta hasta {self.hilos} tareas simultáneamente."
+
+    def __repr__(self):
+        return self.__str__()
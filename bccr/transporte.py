@@ -0,0 +1,368 @@
+"""
+transporte: Un módulo para centralizar las consultas HTTP al BCCR
+
+Todas las descargas del paquete (servicio web, página de indicadores y catálogo de cuadros) pasan por la función
+`get` de este módulo. Esto permite guardar las respuestas crudas en una caché en disco (ver `bccr.cache.CacheHTTP`),
+de manera que al volver a ejecutar un cuaderno de Jupyter o un trabajo de integración continua no sea necesario
+consultar de nuevo al BCCR. También permite grabar las consultas en un casete y reproducirlas sin conexión a
+internet (ver `bccr.casete.Casete`).
+
+La caché está desactivada de manera predeterminada. Para activarla:
+
+    >>> from bccr import transporte
+    >>> transporte.activar_cache()
+
+o bien definir la variable de ambiente `BCCR_CACHE` con la ruta del archivo de la caché antes de importar `bccr`.
+
+Para grabar y reproducir consultas:
+
+    >>> with transporte.grabar('consultas.zip'):
+    ...     datos = SW(TPM=3541)
+    >>> with transporte.reproducir('consultas.zip', latencia=0.1):
+    ...     datos = SW(TPM=3541)
+"""
+
+import os
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass
+from urllib.parse import urlsplit, parse_qsl, urlencode
+
+import requests
+
+from .cache import CacheHTTP
+from .casete import Casete
+
+#: str: Carpeta predeterminada para los archivos locales del paquete
+CARPETA_LOCAL = os.path.join(os.path.expanduser('~'), '.bccr')
+
+#: set: Parámetros que no alteran la respuesta del BCCR (credenciales del servicio web), y que por lo tanto no forman
+#: parte de la llave de la caché
+PARAMETROS_IGNORADOS = {'Nombre', 'CorreoElectronico', 'Token'}
+
+_CACHE = [None]  # caché activa (None si está desactivada)
+_CASETE = [None]  # casete activo (None si no se está grabando ni reproduciendo)
+
+
+@dataclass
+class Respuesta:
+    """
+    Respuesta de una consulta HTTP, con la misma interfaz básica de `requests.Response`
+
+    Attributes
+    ----------
+    url : str
+        URL consultado
+    status_code : int
+        código de estado HTTP
+    reason : str
+        mensaje de estado HTTP
+    text : str
+        cuerpo de la respuesta
+    clave : str
+        llave normalizada de la consulta
+    host : str
+        servidor consultado
+    desde_cache : bool
+        True si la respuesta se obtuvo de la caché
+    """
+    url: str
+    status_code: int
+    reason: str
+    text: str
+    clave: str
+    host: str
+    desde_cache: bool = False
+
+    @property
+    def ok(self):
+        return self.status_code < 400
+
+    def raise_for_status(self):
+        if not self.ok:
+            raise requests.HTTPError(f'{self.status_code} {self.reason}: {self.url}')
+
+
+def llave(url, params=None, abiertos=()):
+    """Normalizar una consulta, para usarla como llave de la caché
+
+    Combina los parámetros del URL con los de `params`, descarta las credenciales y los ordena alfabéticamente, de
+    manera que consultas equivalentes tengan la misma llave.
+
+    Parameters
+    ----------
+    url : str
+        URL consultado, posiblemente con parámetros
+    params : dict, optional
+        parámetros adicionales de la consulta
+    abiertos : iterable, optional
+        parámetros cuyo valor no forma parte de la llave (solo su nombre), porque depende del día de la consulta y no
+        de lo que se pidió: p.ej. la fecha final predeterminada del servicio web (el día de hoy). Así, una consulta
+        "hasta hoy" grabada en un casete se puede reproducir cualquier otro día.
+
+    Returns
+    -------
+    clave : str
+        la consulta normalizada
+    host : str
+        el servidor consultado
+
+    Examples
+    --------
+    >>> llave('https://gee.bccr.fi.cr/indicadoreseconomicos/Cuadros/frmVerCatCuadro.aspx?Excel=True&CodCuadro=9')
+    ('https://gee.bccr.fi.cr/indicadoreseconomicos/Cuadros/frmVerCatCuadro.aspx?CodCuadro=9&Excel=True', 'gee.bccr.fi.cr')
+    """
+    partes = urlsplit(url)
+    host = partes.netloc.lower()
+    pares = parse_qsl(partes.query, keep_blank_values=True)
+    if params:
+        pares += [(k, '' if k in abiertos else str(v)) for k, v in params.items()]
+    pares = sorted((k, v) for k, v in pares if k not in PARAMETROS_IGNORADOS)
+    clave = f"{partes.scheme.lower()}://{host}{partes.path}?{urlencode(pares)}"
+    return clave, host
+
+
+def get(url, params=None, abiertos=()):
+    """Consultar un URL, usando la caché si está activa
+
+    Si hay un casete en modo 'reproducir', la respuesta se obtiene del casete (nunca de internet). Si hay un casete en
+    modo 'grabar', la consulta se hace siempre a internet (sin usar la caché, para grabar su latencia real).
+
+    Parameters
+    ----------
+    url : str
+        URL a consultar
+    params : dict, optional
+        parámetros de la consulta (método GET)
+    abiertos : iterable, optional
+        parámetros que no forman parte de la llave de la caché (ver `llave`)
+
+    Returns
+    -------
+    Respuesta
+    """
+    clave, host = llave(url, params, abiertos)
+    cache = _CACHE[0]
+    casete = _CASETE[0]
+
+    if casete is not None and casete.modo == 'reproducir':
+        url, estado, razon, texto = casete.reproducir(clave)
+        return Respuesta(url, estado, razon, texto, clave, host)
+
+    if cache is not None and casete is None:
+        guardada = cache.leer(clave)
+        if guardada is not None:
+            estado, razon, texto, _ = guardada
+            return Respuesta(url, estado, razon, texto, clave, host, desde_cache=True)
+
+    inicio = time.perf_counter()
+    resp = requests.get(url, params)
+    respuesta = Respuesta(resp.url, resp.status_code, resp.reason, resp.text, clave, host)
+
+    if casete is not None:
+        casete.grabar(clave, resp.url, resp.status_code, resp.reason, resp.text, time.perf_counter() - inicio)
+
+    if cache is not None and resp.status_code == 200:
+        cache.guardar(clave, host, resp.status_code, resp.reason, resp.text)
+
+    return respuesta
+
+
+def texto(url, params=None):
+    """Consultar un URL y devolver el cuerpo de la respuesta
+
+    Igual que `get`, pero genera un error `requests.HTTPError` si el servidor no responde exitosamente.
+
+    Returns
+    -------
+    str
+    """
+    resp = get(url, params)
+    resp.raise_for_status()
+    return resp.text
+
+
+def fragmentos(url, params=None, tamaño=8192):
+    """Recorrer el cuerpo de una respuesta por fragmentos, sin descargarlo completo
+
+    La descarga se interrumpe en cuanto se deja de iterar (p.ej. con `break`, o al cerrar el generador), de manera que
+    para leer el inicio de un documento grande solo se transfieren unos pocos kilobytes. El texto efectivamente leído
+    se guarda en la caché (y en el casete que se esté grabando) con una llave propia, distinta de la de la respuesta
+    completa.
+
+    Parameters
+    ----------
+    url : str
+        URL a consultar
+    params : dict, optional
+        parámetros de la consulta (método GET)
+    tamaño : int, optional
+        número de bytes de cada fragmento (predeterminado: 8192)
+
+    Yields
+    ------
+    str
+        fragmentos sucesivos del cuerpo de la respuesta
+
+    Examples
+    --------
+    >>> from contextlib import closing
+    >>> with closing(fragmentos(url)) as partes:
+    ...     inicio = next(partes)
+    """
+    clave, host = llave(url, params)
+    clave += '#parcial'
+    cache = _CACHE[0]
+    casete = _CASETE[0]
+
+    if casete is not None and casete.modo == 'reproducir':
+        yield casete.reproducir(clave)[3]
+        return
+
+    if cache is not None and casete is None:
+        guardada = cache.leer(clave)
+        if guardada is not None:
+            yield guardada[2]
+            return
+
+    leidos = []
+    inicio = time.perf_counter()
+    with requests.get(url, params, stream=True) as resp:
+        resp.raise_for_status()
+        resp.encoding = resp.encoding or 'utf-8'
+        try:
+            for fragmento in resp.iter_content(tamaño, decode_unicode=True):
+                leidos.append(fragmento)
+                yield fragmento
+        finally:
+            texto_leido = ''.join(leidos)
+            if casete is not None:
+                casete.grabar(clave, resp.url, resp.status_code, resp.reason, texto_leido,
+                              time.perf_counter() - inicio)
+            if cache is not None:
+                cache.guardar(clave, host, resp.status_code, resp.reason, texto_leido)
+
+
+def marcar_faltante(respuesta):
+    """Registrar en la caché que la respuesta corresponde a un indicador inexistente o sin datos
+
+    Las respuestas negativas se guardan con una vigencia menor (`CacheHTTP.ttl_negativo`), para no consultar
+    repetidamente al BCCR por indicadores que no existen, pero sí volver a intentarlo después de un tiempo.
+
+    Parameters
+    ----------
+    respuesta : Respuesta
+        la respuesta obtenida con `get`
+
+    Returns
+    -------
+    None
+    """
+    cache = _CACHE[0]
+    if cache is None:
+        return
+    if respuesta.desde_cache:
+        cache.marcar_negativo(respuesta.clave)
+    else:
+        cache.guardar(respuesta.clave, respuesta.host, respuesta.status_code, respuesta.reason, respuesta.text,
+                      negativo=True)
+
+
+def activar_cache(archivo=None, **opciones):
+    """Activar la caché de respuestas HTTP
+
+    Parameters
+    ----------
+    archivo : str, optional
+        ruta del archivo de la caché (predeterminado: ~/.bccr/cache.sqlite)
+    opciones :
+        parámetros de `bccr.cache.CacheHTTP` (presupuesto, ttl, ttl_predeterminado, ttl_negativo, nivel)
+
+    Returns
+    -------
+    CacheHTTP
+        la caché activada
+
+    Examples
+    --------
+    >>> from bccr import transporte
+    >>> transporte.activar_cache(presupuesto=50 * 2**20, ttl={'gee.bccr.fi.cr': 6 * 3600})
+    """
+    archivo = archivo if archivo else os.path.join(CARPETA_LOCAL, 'cache.sqlite')
+    _CACHE[0] = CacheHTTP(archivo, **opciones)
+    return _CACHE[0]
+
+
+def desactivar_cache():
+    """Desactivar la caché de respuestas HTTP (los datos guardados se conservan en disco)"""
+    _CACHE[0] = None
+
+
+def cache_activa():
+    """La caché activa, o None si está desactivada"""
+    return _CACHE[0]
+
+
+@contextmanager
+def grabar(archivo):
+    """Grabar en un casete todas las consultas al BCCR hechas dentro del bloque `with`
+
+    Parameters
+    ----------
+    archivo : str
+        ruta del archivo zip del casete. Si ya existe, las nuevas respuestas se agregan a las grabadas anteriormente.
+
+    Returns
+    -------
+    Casete
+
+    Examples
+    --------
+    >>> from bccr import PW, transporte
+    >>> with transporte.grabar('tasa-basica.zip'):
+    ...     PW(TBP=17)
+    """
+    casete = Casete(archivo, modo='grabar')
+    _CASETE[0] = casete
+    try:
+        yield casete
+    finally:
+        _CASETE[0] = None
+        casete.guardar()
+
+
+@contextmanager
+def reproducir(archivo, *, latencia=None, factor=1.0):
+    """Servir desde un casete todas las consultas al BCCR hechas dentro del bloque `with`
+
+    Las consultas que no estén grabadas en el casete generan un error `LookupError`.
+
+    Parameters
+    ----------
+    archivo : str
+        ruta del archivo zip del casete
+    latencia : float, optional
+        segundos de espera por consulta. Si None (predeterminado), se usa la duración grabada de cada consulta.
+    factor : float, optional
+        multiplicador de la latencia (predeterminado: 1.0). Use 0 para no esperar.
+
+    Returns
+    -------
+    Casete
+
+    Examples
+    --------
+    >>> from bccr import PW, transporte
+    >>> with transporte.reproducir('tasa-basica.zip', factor=0):
+    ...     PW(TBP=17)
+    """
+    casete = Casete(archivo, modo='reproducir', latencia=latencia, factor=factor)
+    _CASETE[0] = casete
+    try:
+        yield casete
+    finally:
+        _CASETE[0] = None
+
+
+if os.environ.get('BCCR_CACHE'):
+    activar_cache(os.environ['BCCR_CACHE'])
@@ -1,4 +1,6 @@
 import re
+import unicodedata
+from functools import lru_cache
 import numpy as np
 import pandas as pd
 from datetime import date
@@ -151,6 +153,113 @@ def parseDay(dia: str):
     return y + '/' + meses[m[:3].lower()] + '/' + d
 
 
+MESES = {'ene': 1, 'feb': 2, 'mar': 3, 'abr': 4, 'may': 5, 'jun': 6,
+         'jul': 7, 'ago': 8, 'set': 9, 'sep': 9, 'oct': 10, 'nov': 11, 'dic': 12}
+
+
+@lru_cache(maxsize=None)
+def numero_mes(nombre: str):
+    """
+    Number of month (1 to 12) from its Spanish name or abbreviation ('Setiembre', 'Set', 'sep', 'Enero', ...).
+    Results are cached, so that parsing a whole column of labels only looks up each distinct month name once.
+
+    Returns
+    -------
+    int, 0 if the name is not recognized
+    """
+    nombre = unicodedata.normalize('NFKD', nombre).encode('ascii', 'ignore').decode().lower()
+    return MESES.get(nombre[:3], 0)
+
+
+def normalizar_texto(textos, minusculas=True):
+    """
+    Lowercase text without accents, so that 'Índice' matches 'indice'.
+
+    Parameters
+    ----------
+    textos : str or pd.Series of str
+    minusculas : bool
+        if False, only the accents are removed (e.g. for regular expressions, where '\\D' and '\\d' differ)
+
+    Returns
+    -------
+    same type as `textos`
+    """
+    if isinstance(textos, pd.Series):
+        textos = textos.fillna('').astype(str).str.normalize('NFKD').str.replace('[\u0300-\u036f]', '', regex=True)
+        return textos.str.lower() if minusculas else textos
+    textos = ''.join(c for c in unicodedata.normalize('NFKD', textos) if not unicodedata.combining(c))
+    return textos.lower() if minusculas else textos
+
+
+def _meses(nombres):
+    """Vectorized month lookup: factorize the labels and look up each distinct name only once"""
+    codigos, unicos = pd.factorize(pd.Series(nombres, dtype=object).fillna(''))
+    tabla = np.array([numero_mes(str(u)) for u in unicos] + [0], dtype='int64')  # codigo -1 (faltante) -> 0
+    return tabla[codigos]
+
+
+def _enteros(columna):
+    """Convert a column of digit strings (possibly missing) to int64, missing values as -1"""
+    return pd.to_numeric(columna, errors='coerce').fillna(-1).to_numpy(dtype='int64')
+
+
+def periodos(ordinales, freq):
+    """
+    Build a pd.PeriodIndex directly from period ordinals (periods elapsed since 1970), without converting dates one
+    by one. Ordinals equal to the minimum int64 value are NaT.
+    """
+    ordinales = np.asarray(ordinales, dtype='int64')
+    return pd.PeriodIndex(pd.arrays.PeriodArray(ordinales, dtype=pd.PeriodDtype(freq)))
+
+
+NaT_ORDINAL = np.iinfo('int64').min
+
+
+def parseDays(dias):
+    """
+    Vectorized version of parseDay: convert a column of Spanish dates to datetime64
+    Parameters
+    ----------
+    dias  Iterable of strings with Spanish dates, format 'dd Mmm yyyy' (e.g. '12 Set 2019')
+
+    Returns
+    -------
+    np.ndarray of datetime64[D]. Labels that are not valid dates (e.g. '29 Feb 2019') are NaT
+    """
+    partes = pd.Series(dias, dtype=object).astype(str).str.extract(r'(\d{1,2})\W+([^\W\d_]+)\W+(\d{4})')
+    dia, mes, año = _enteros(partes[0]), _meses(partes[1]), _enteros(partes[2])
+
+    meses = (año - 1970) * 12 + mes - 1
+    fechas = meses.astype('datetime64[M]').astype('datetime64[D]') + (dia - 1)
+    validos = (mes > 0) & (año > 0) & (dia >= 1) & (fechas.astype('datetime64[M]').astype('int64') == meses)
+    return np.where(validos, fechas, np.datetime64('NaT'))
+
+
+def parseMonthYears(meses):
+    """
+    Vectorized version of parseMonthYear: convert a column of Spanish month labels (e.g. 'Marzo 2017', 'Set/2019')
+    to a monthly pd.PeriodIndex. Labels that cannot be parsed are NaT.
+    """
+    partes = pd.Series(meses, dtype=object).astype(str).str.extract(r'([^\W\d_]+)\D*?(\d{4})')
+    mes, año = _meses(partes[0]), _enteros(partes[1])
+    ordinales = np.where((mes > 0) & (año > 0), (año - 1970) * 12 + mes - 1, NaT_ORDINAL)
+    return periodos(ordinales, 'M')
+
+
+def parseQuarterYears(trimestres):
+    """
+    Vectorized version of parseQuarterYear: convert a column of labels such as 'Trimestre 2/2014' (or '2014/2') to a
+    quarterly pd.PeriodIndex. Labels that cannot be parsed are NaT.
+    """
+    partes = pd.Series(trimestres, dtype=object).astype(str).str.extract(r'(\d+)\D+(\d+)')
+    a, b = _enteros(partes[0]), _enteros(partes[1])
+    primero = (a >= 1) & (a <= 4)
+    trimestre, año = np.where(primero, a, b), np.where(primero, b, a)
+    validos = (trimestre >= 1) & (trimestre <= 4) & (año > 4)
+    return periodos(np.where(validos, (año - 1970) * 4 + trimestre - 1, NaT_ORDINAL), 'Q')
+
+
 def columns_rename(db: pd.DataFrame):
     """
     Dictionary to rename columns
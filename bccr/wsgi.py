@@ -0,0 +1,18 @@
+"""
+wsgi: Punto de entrada para servir la interfaz gráfica con un servidor WSGI de producción
+
+`GUI()` usa el servidor de desarrollo de Flask, adecuado para un solo usuario. Para atender a varios usuarios a la
+vez, sirva `bccr.wsgi:server` con gunicorn (o uwsgi), con varios procesos e hilos:
+
+    BCCR_SESIONES=/srv/bccr/sesiones.sqlite \\
+    gunicorn --preload --workers 4 --threads 8 --timeout 120 --bind 0.0.0.0:8050 bccr.wsgi:server
+
+Con `--preload`, este módulo (y con él el catálogo de indicadores del servicio web) se carga una sola vez, antes de
+crear los procesos, que lo comparten. Como cada proceso tiene su propia memoria, la variable `BCCR_SESIONES` indica el
+archivo donde todos ellos guardan los datos de las sesiones (ver `bccr.sesiones`).
+"""
+
+from bccr.gui import crear_app
+
+app = crear_app()
+server = app.server
@@ -28,11 +28,14 @@ setup(
         'anytree',
         'requests',
         'beautifulsoup4',
+        'lxml',
         'plotly',
-        'dash>=2.2.0',
+        'dash>=2.13.0',
         'dash-extensions==0.0.71',
-        'jupyter-dash'],
-    package_data={'bccr': ['data/indicadores.pkl', 'data/indicators.pkl', 'data/cuadros.pkl']},
+        'jupyter-dash',
+        'xlsxwriter'],
+    extras_require={'parquet': ['pyarrow']},
+    package_data={'bccr': ['data/indicadores.pkl', 'data/indicators.pkl', 'data/cuadros.pkl', 'assets/*']},
     include_package_data=True
 )
 
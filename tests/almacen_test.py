@@ -0,0 +1,38 @@
+import tempfile
+
+import pandas as pd
+
+from bccr.almacen import AlmacenCuadros
+
+
+def mensual(inicio, valores):
+    return pd.Series(valores, index=pd.period_range(inicio, periods=len(valores), freq='M'), dtype=float)
+
+
+def test_actualizar():
+    with tempfile.TemporaryDirectory() as carpeta:
+        almacen = AlmacenCuadros(carpeta, revision=2)
+        pedidos = []
+
+        def descargar(datos):
+            def desde(fecha):
+                pedidos.append(fecha)
+                return datos if fecha is None else datos[datos.index.start_time >= pd.Timestamp(fecha)]
+            return desde
+
+        # primera vez: toda la historia
+        viejos = mensual('2020-01', range(12))
+        assert almacen.actualizar(17, descargar(viejos)).equals(viejos)
+        assert pedidos == [None]
+
+        # luego solo los últimos períodos: se traslapan con los guardados, y los revisados se reemplazan
+        nuevos = mensual('2020-01', [*range(10), 100, 110, 120, 130])
+        datos = almacen.actualizar(17, descargar(nuevos))
+        assert pedidos[-1] == '2020/10/01'  # diciembre menos dos meses de revisión
+        assert datos.equals(nuevos)
+        assert almacen.leer(17)['datos'].equals(nuevos)
+
+        # una actualización sin datos conserva los guardados
+        datos = almacen.actualizar(17, lambda fecha: mensual('2020-01', []))
+        assert datos.equals(nuevos)
+        assert almacen.leer(17)['datos'].equals(nuevos)
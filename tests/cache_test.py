@@ -0,0 +1,66 @@
+import os
+import tempfile
+import time
+
+from bccr.cache import CacheHTTP
+from bccr.casete import Casete
+from bccr.transporte import llave
+
+
+def test_llave():
+    clave, host = llave('https://GEE.bccr.fi.cr/Cuadros/frmVerCatCuadro.aspx?Excel=True&CodCuadro=9')
+    assert host == 'gee.bccr.fi.cr'
+    assert clave.endswith('?CodCuadro=9&Excel=True')
+
+    # las credenciales no forman parte de la llave
+    a, _ = llave('https://gee.bccr.fi.cr/ws', dict(Indicador=3541, Token='AAA', Nombre='x'))
+    b, _ = llave('https://gee.bccr.fi.cr/ws', dict(Nombre='y', Token='BBB', Indicador='3541'))
+    assert a == b
+
+    # la fecha final predeterminada (el día de hoy) no forma parte de la llave
+    hoy, _ = llave('https://gee.bccr.fi.cr/ws', dict(Indicador=3541, FechaFinal='18/10/2026'), abiertos=('FechaFinal',))
+    otro, _ = llave('https://gee.bccr.fi.cr/ws', dict(Indicador=3541, FechaFinal='19/10/2026'), abiertos=('FechaFinal',))
+    fija, _ = llave('https://gee.bccr.fi.cr/ws', dict(Indicador=3541, FechaFinal='18/10/2026'))
+    assert hoy == otro != fija
+
+
+def test_cache():
+    with tempfile.TemporaryDirectory() as carpeta:
+        cache = CacheHTTP(os.path.join(carpeta, 'cache.sqlite'), presupuesto=3000, ttl={'lento': 0.1})
+        cache.guardar('a', 'gee.bccr.fi.cr', 200, 'OK', '<xml>datos</xml>')
+        assert cache.leer('a') == (200, 'OK', '<xml>datos</xml>', False)
+        assert cache.leer('b') is None
+
+        # vigencia por servidor
+        cache.guardar('c', 'lento', 200, 'OK', 'texto')
+        time.sleep(0.2)
+        assert cache.leer('c') is None
+
+        # respuestas negativas
+        cache.marcar_negativo('a')
+        assert cache.leer('a')[-1]
+
+        # presupuesto: se desechan las respuestas usadas menos recientemente
+        for k in range(10):
+            cache.guardar(f'k{k}', 'gee.bccr.fi.cr', 200, 'OK', os.urandom(500).hex())
+        assert cache.tamaño() <= 3000
+        assert cache.leer('k9') is not None
+        assert cache.leer('k0') is None
+        cache.cerrar()
+
+
+def test_casete():
+    with tempfile.TemporaryDirectory() as carpeta:
+        archivo = os.path.join(carpeta, 'casete.zip')
+        casete = Casete(archivo, modo='grabar')
+        casete.grabar('a', 'https://gee.bccr.fi.cr/a', 200, 'OK', '<table></table>', 0.2)
+        casete.guardar()
+
+        casete = Casete(archivo, modo='reproducir', factor=0)
+        assert 'a' in casete
+        assert casete.reproducir('a') == ('https://gee.bccr.fi.cr/a', 200, 'OK', '<table></table>')
+        try:
+            casete.reproducir('b')
+            assert False
+        except LookupError:
+            pass
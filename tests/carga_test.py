@@ -0,0 +1,47 @@
+import os
+import tempfile
+
+import pandas as pd
+import requests
+
+from bccr import SW, transporte
+from bccr.carga import Usuario, probar
+
+
+class Respuesta:
+    """Respuesta sin conexión del servicio web del BCCR, con doce observaciones mensuales del indicador consultado"""
+    status_code, reason = 200, 'OK'
+
+    def __init__(self, url, params):
+        self.url = url
+        observaciones = ''.join(
+            f"<INGC011_CAT_INDICADORECONOMIC><COD_INDICADORINTERNO>{params['Indicador']}</COD_INDICADORINTERNO>"
+            f"<DES_FECHA>{fecha:%Y-%m-%d}T00:00:00-06:00</DES_FECHA><NUM_VALOR>{k}.5</NUM_VALOR>"
+            f"</INGC011_CAT_INDICADORECONOMIC>"
+            for k, fecha in enumerate(pd.date_range('2020-01-01', periods=12, freq='MS')))
+        self.text = f'<DataSet><Datos_de_INGC011_CAT_INDICADORECONOMIC>{observaciones}</Datos_de_INGC011_CAT_INDICADORECONOMIC></DataSet>'
+
+
+def test_probar():
+    from bccr.gui import crear_app
+
+    codigos = SW.indicadores.index[:2].to_list()
+    with tempfile.TemporaryDirectory() as carpeta:
+        casete = os.path.join(carpeta, 'carga.zip')
+
+        # se graba el casete con una consulta de la interfaz, sin conexión con el BCCR
+        original = requests.get
+        requests.get = lambda url, params=None, **opciones: Respuesta(url, params)
+        try:
+            with transporte.grabar(casete):
+                usuario = Usuario(crear_app().server.test_client(), codigos, ['tasa'])
+                usuario.consultar(codigos, limite=30)
+        finally:
+            requests.get = original
+        assert not usuario.errores
+
+        # cada proceso es nuevo (no tiene las series en memoria): todas las consultas se sirven desde el casete
+        resultado = probar(casete, codigos, busquedas=['tasa'], procesos=2, hilos=2, duracion=3, factor=0)
+        assert resultado['callbacks']['consulta']['llamadas'] >= 2
+        assert all(c['errores'] == 0 for c in resultado['callbacks'].values())
+        assert all(p['sesiones'] >= 1 for p in resultado['procesos'])
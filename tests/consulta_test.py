@@ -0,0 +1,55 @@
+import numpy as np
+import pandas as pd
+
+from bccr.consulta import Consulta, PIEZAS
+from bccr.series import CacheSeries
+
+
+class Cuadros:
+    """Fuente de datos sin conexión, con la misma interfaz que `PaginaWeb`"""
+    cuadros = pd.DataFrame({'freq': ['M', 'Q']}, index=[1, 2])
+
+    def __init__(self):
+        self.descargas = []
+
+    def __parse__(self, cuadro, first=None, last=None):
+        self.descargas.append((cuadro, first, last))
+        if cuadro == 1:
+            indice = pd.period_range('2010-01', '2020-12', freq='M')
+        else:
+            indice = pd.period_range('2010Q1', '2020Q4', freq='Q')
+        datos = pd.DataFrame({'valor': np.ones(len(indice))}, index=indice)
+        datos = datos[datos.index.end_time >= pd.Timestamp(first)] if first else datos
+        return datos[datos.index.start_time <= pd.Timestamp(last)] if last else datos
+
+
+def test_cubre():
+    cache = CacheSeries()
+    cache.obtener('1', '2010/01/01', None, lambda *_: 'serie')
+    assert cache.cubre('1', '2015/01/01', '2016/12/31') == 'serie'
+    assert cache.cubre('1', '2009/01/01', None) is None
+    assert cache.cubre('2', '2015/01/01', None) is None
+
+
+def test_consulta():
+    PIEZAS.limpiar()
+    fuente = Cuadros()
+    consulta = Consulta(fuente, {'mensual': 1, 'trimestral': 2}).desde(2015)
+    assert consulta.FechaInicio == '2015/01/01'
+    assert fuente.descargas == []  # nada se descarga antes de `collect`
+
+    plan = consulta.plan()
+    assert plan['origen'].to_list() == ['descarga', 'descarga']
+    assert plan['destino'].to_list() == ['Q', None]  # la serie trimestral no cambia de frecuencia
+
+    datos = consulta.collect()
+    assert datos.index[0] == pd.Period('2015Q1')
+    assert (datos[('mensual', 'valor')] == 3).all()  # suma de tres meses
+    assert fuente.descargas == [(1, '2015/01/01', None), (2, '2015/01/01', None)]
+
+    # otra variante de la consulta reutiliza las series ya descargadas
+    anual = consulta.hasta(2016).freq('A', 'sum').collect()
+    assert consulta.hasta(2016).plan()['origen'].to_list() == ['caché (recorte)'] * 2
+    assert anual.index.to_list() == [pd.Period('2015'), pd.Period('2016')]
+    assert (anual[('trimestral', 'valor')] == 4).all()
+    assert len(fuente.descargas) == 2
@@ -0,0 +1,59 @@
+import os
+import tempfile
+import time
+import zipfile
+
+import numpy as np
+import pandas as pd
+
+from bccr.exportar import exportar, limpiar
+
+
+def test_exportar_csv():
+    datos = pd.DataFrame({'x': np.arange(25.0), 'y': np.nan}, index=pd.period_range('2000-01', periods=25, freq='M'))
+    with tempfile.TemporaryDirectory() as carpeta:
+        archivo = exportar(datos, os.path.join(carpeta, 'datos.csv'), filas=10)
+        assert os.listdir(carpeta) == ['datos.csv']
+        leidos = pd.read_csv(archivo, index_col=0)
+        assert leidos.shape == (25, 2)
+        assert leidos['x'].sum() == datos['x'].sum()
+
+
+def test_exportar_dta():
+    datos = pd.DataFrame({'x': np.arange(6.0)}, index=pd.period_range('2000Q1', periods=6, freq='Q', name='fecha'))
+    with tempfile.TemporaryDirectory() as carpeta:
+        archivo = exportar(datos, os.path.join(carpeta, 'datos.dta'))
+        leidos = pd.read_stata(archivo)
+        assert leidos['fecha'].to_list() == datos.index.astype(str).to_list()
+        assert leidos['x'].to_list() == datos['x'].to_list()
+
+
+def test_exportar_xlsx():
+    datos = pd.DataFrame({'x': np.arange(25.0), 'y': np.nan}, index=pd.period_range('2000-01', periods=25, freq='M', name='fecha'))
+    with tempfile.TemporaryDirectory() as carpeta:
+        archivo = exportar(datos, os.path.join(carpeta, 'datos.xlsx'), filas=10)
+        assert os.listdir(carpeta) == ['datos.xlsx']
+        with zipfile.ZipFile(archivo) as libro:  # sin openpyxl: se revisa el XML de la hoja
+            hoja = libro.read('xl/worksheets/sheet1.xml').decode('utf-8')
+        assert hoja.count('<row ') == 26
+        assert '>2000-01<' in hoja and '>2002-01<' in hoja
+
+
+def test_limpiar():
+    with tempfile.TemporaryDirectory() as carpeta:
+        for sesion in ('vieja', 'nueva'):
+            os.makedirs(os.path.join(carpeta, sesion))
+        archivo = os.path.join(carpeta, 'vieja', 'datos.csv')
+        open(archivo, 'w').close()
+        antes = time.time() - 7200
+        for ruta in (archivo, os.path.join(carpeta, 'vieja')):
+            os.utime(ruta, (antes, antes))
+
+        limpiar(carpeta, vigencia=3600)
+        assert sorted(os.listdir(carpeta)) == ['nueva', 'vieja']  # la carpeta vieja cambió al borrar su archivo
+        assert os.listdir(os.path.join(carpeta, 'vieja')) == []
+
+        # una consulta que acaba de crear su carpeta puede escribir en ella aunque otra la borre
+        os.rmdir(os.path.join(carpeta, 'nueva'))
+        exportar(pd.DataFrame({'x': [1.0]}), os.path.join(carpeta, 'nueva', 'datos.csv'))
+        assert os.listdir(os.path.join(carpeta, 'nueva')) == ['datos.csv']
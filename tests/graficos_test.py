@@ -0,0 +1,20 @@
+import numpy as np
+import pandas as pd
+
+from bccr.graficos import lttb, reducir
+
+
+def test_lttb():
+    y = np.zeros(20)
+    y[7], y[13] = 5, -4
+    elegidos = lttb(np.arange(20), y, 6)
+    assert len(elegidos) == 6
+    assert {0, 7, 13, 19} <= set(elegidos)
+
+
+def test_reducir():
+    datos = pd.DataFrame({'x': np.arange(5000.0)}, index=pd.period_range('2000-01-01', periods=5000, freq='D'))
+    assert len(reducir(datos, puntos=100)['x']) == 100
+
+    serie = reducir(datos, puntos=100, desde='2001-01-01', hasta='2001-01-31')['x']
+    assert len(serie) == 33 and serie.index[0] == pd.Timestamp('2000-12-31')
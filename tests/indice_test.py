@@ -0,0 +1,35 @@
+import pandas as pd
+
+from bccr.indice import IndicePrefijos, IndiceTrigramas, trigramas
+
+
+def test_trigramas():
+    assert trigramas('ipc') == [' ip', 'ipc', 'pc ']
+
+
+def test_buscar():
+    textos = pd.Series(['Índice de precios al consumidor', 'Tasa básica pasiva', 'Tipo de cambio de referencia'])
+    indice = IndiceTrigramas(textos)
+
+    posiciones, puntajes = indice.buscar('indice precios consumidor')  # sin tildes
+    assert posiciones[0] == 0 and puntajes[0] == 1.0
+
+    posiciones, puntajes = indice.buscar('tasa basca pasiba', k=1)  # con errores de digitación
+    assert list(posiciones) == [1] and 0.3 < puntajes[0] < 1.0
+
+    posiciones, _ = indice.buscar('tasa', mascara=[True, False, True])
+    assert 1 not in posiciones
+
+
+def test_prefijos():
+    textos = pd.Series(['Índice de precios al consumidor', 'Precio del petróleo', 'Tipo de cambio de referencia'])
+    indice = IndicePrefijos(textos)
+
+    posiciones, total = indice.buscar('indice prec')  # la última palabra está incompleta
+    assert list(posiciones) == [0] and total == 1
+
+    posiciones, total = indice.buscar('precio cambio', tipo='algunos', k=1)
+    assert total == 3 and len(posiciones) == 1
+
+    posiciones, _ = indice.buscar('de precios', tipo='frase')
+    assert list(posiciones) == [0]
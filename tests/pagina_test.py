@@ -0,0 +1,75 @@
+import time
+import warnings
+
+import pandas as pd
+
+from bccr.pagina import PaginaWeb
+
+
+def diario(inicio, final, fallas=()):
+    """PaginaWeb con un cuadro diario (código 1) con datos de `inicio` a `final`, sin conexión a internet"""
+    pw = PaginaWeb(pd.DataFrame({'freq': ['D'], 'chartFormat': [None]}, index=[1]), hilos=4, bloque=5)
+    serie = pd.Series(1.0, index=pd.period_range(inicio, final, freq='D'))
+    fallas = list(fallas)
+    pw.consultas = []
+
+    def leer_bloque(chart, first=None, last=None, quiet=True):
+        pw.consultas.append(first)
+        if first in fallas:
+            fallas.remove(first)
+            raise TimeoutError(first)
+        datos = serie[serie.index.end_time >= pd.Timestamp(first)] if first else serie
+        return datos[datos.index.start_time <= pd.Timestamp(last)] if last else datos
+
+    pw.__leer_bloque__ = leer_bloque
+    return pw
+
+
+def test_bloques():
+    pw = diario('2000-01-01', '2026-12-31')
+    bloques = list(pw.__bloques__('2012/03/05', None))
+    # sin fecha final, la consulta del bloque más reciente no cambia cada día, y los bloques no cambian cada año
+    assert bloques[0] == (f'{pd.Timestamp.today().year // 5 * 5}/01/01', None)
+    assert bloques[-1] == ('2012/03/05', '2014/12/31')
+    assert list(pw.__bloques__('2012/03/05', '2021/06/30')) == [
+        ('2020/01/01', '2021/06/30'), ('2015/01/01', '2019/12/31'), ('2012/03/05', '2014/12/31')]
+
+
+def test_bloque_reciente_vacio():
+    pw = diario('2000-01-01', '2015-06-30')  # cuadro descontinuado
+    datos = pw.__leer_bloques__(1, None, '2026/12/31')
+    assert datos.index[0] == pd.Period('2000-01-01', 'D')
+    assert datos.index[-1] == pd.Period('2015-06-30', 'D')
+    assert not datos.index.duplicated().any()
+
+
+def test_bloque_fallido():
+    pw = diario('2000-01-01', '2026-12-31', fallas=['2015/01/01'])
+    datos = pw.__leer_bloques__(1, None, '2026/12/31')
+    assert datos.index[0] == pd.Period('2000-01-01', 'D')  # el bloque fallido se descargó de nuevo
+    assert len(datos) == len(pd.period_range('2000-01-01', '2026-12-31', freq='D'))
+
+    pw = diario('2000-01-01', '2026-12-31', fallas=['2015/01/01', '2015/01/01'])
+    try:
+        pw.__leer_bloques__(1, None, '2026/12/31')
+        assert False
+    except TimeoutError:
+        pass
+
+
+def test_parse_varios():
+    pw = PaginaWeb(pd.DataFrame({'freq': ['M', 'M', 'M']}, index=[1, 2, 3]), hilos=3)
+
+    def parse(chart, first=None, last=None, freq=None, func=None, quiet=True):
+        if chart == 2:
+            raise ConnectionError('sin respuesta')
+        time.sleep(0.1 if chart == 1 else 0)  # el primer cuadro termina de último
+        return pd.Series(float(chart), index=pd.period_range('2020-01', periods=3, freq='M'))
+
+    pw.__parse__ = parse
+    with warnings.catch_warnings(record=True) as avisos:
+        warnings.simplefilter('always')
+        datos = pw.__parse_varios__({'c': 3, 'b': 2, 'a': 1})
+    assert list(datos) == ['c', 'a']  # el orden de la solicitud, sin el cuadro que falló
+    assert datos['a'].iloc[0] == 1
+    assert len(avisos) == 1 and "cuadro 2 ('b')" in str(avisos[0].message)
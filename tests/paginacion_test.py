@@ -0,0 +1,16 @@
+import pandas as pd
+
+from bccr.paginacion import pagina
+
+
+def test_pagina():
+    datos = pd.DataFrame({'x': range(120), 'y': [k % 7 for k in range(120)]},
+                         index=pd.period_range('2010-01', periods=120, freq='M'))
+
+    filas, paginas = pagina(datos, 1, 50)
+    assert paginas == 3
+    assert len(filas) == 50 and filas[0] == {'fecha': '2014-03', 'x': 50, 'y': 1}
+
+    filas, paginas = pagina(datos, 0, 10, [{'column_id': 'x', 'direction': 'desc'}], '{y} = 0 && {fecha} datestartswith 2015')
+    assert paginas == 1
+    assert [fila['x'] for fila in filas] == [70, 63]
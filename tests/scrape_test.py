@@ -0,0 +1,98 @@
+import os
+import tempfile
+import time
+
+import pandas as pd
+
+from bccr import fetch, scrape
+
+
+def test_findAllCharts():
+    paginas = {pagina: [] for pagina in scrape.SECTORS}
+    paginas['mercado-negociación'] = [1, 4]
+    paginas['tasas-de-interés'] = [2]
+    leidos = []
+
+    def readTitle(series, quiet=True, threads=8):
+        leidos.extend(series)
+        return pd.DataFrame({'title': [f'nuevo {c}' for c in series], 'subtitle': ''}, index=series)
+
+    anteriores = scrape.sectorCharts, scrape.readTitle
+    scrape.sectorCharts, scrape.readTitle = paginas.get, readTitle
+    try:
+        with tempfile.TemporaryDirectory() as carpeta:
+            catalogo = os.path.join(carpeta, 'cuadros.pkl')
+            salida = os.path.join(carpeta, 'asReadFromBCCR.pkl')
+            viejo = pd.DataFrame({'title': ['uno', 'dos', 'tres'], 'subtitle': '',
+                                  'sector': ['Mercados_negociacion', 'Sector_Externo', 'Mercados_negociacion'],
+                                  'chartFormat': ['M-Y', 'D-M', 'M-Y'], 'freq': ['M', 'D', 'M']}, index=[1, 2, 3])
+            viejo.to_pickle(catalogo)
+
+            datos = scrape.findAllCharts(catalogo, salida, refresh=[1], quiet=True)
+            assert sorted(leidos) == [1, 2, 4]  # actualizado, cambió de sector, nuevo
+            assert sorted(datos.index) == [1, 2, 4]  # el 3 ya no aparece en el sitio
+            assert datos.loc[2, 'sector'] == 'Tasas_interes' and datos.loc[2, 'chartFormat'] == 'D-M'
+            assert datos.loc[4, 'chartFormat'] == 'NOT-SUPPORTED-YET'
+
+            assert pd.read_pickle(catalogo).equals(viejo)  # el catálogo no se modifica
+            web = pd.read_pickle(salida)
+            assert list(web.columns) == ['title', 'subtitle', 'sector'] and web.index.name is None
+    finally:
+        scrape.sectorCharts, scrape.readTitle = anteriores
+
+
+def test_loadIndicators():
+    anterior = scrape.INDICATORS_FILE
+    with tempfile.TemporaryDirectory() as carpeta:
+        scrape.INDICATORS_FILE = os.path.join(carpeta, 'indicators.pkl')
+        try:
+            pd.DataFrame({'title': ['Tasa básica'], 'subtitle': [''], 'chartFormat': ['DayYear']},
+                         index=[17]).to_pickle(scrape.INDICATORS_FILE)
+            catalogo = scrape.loadIndicators(reload=True)
+            assert scrape.loadIndicators() is catalogo  # se lee del disco una sola vez
+            assert list(scrape.search('basica').index) == [17]
+
+            pd.DataFrame({'title': ['Tipo de cambio'], 'subtitle': [''], 'chartFormat': ['DayYear']},
+                         index=[367]).to_pickle(scrape.INDICATORS_FILE)
+            assert scrape.loadIndicators() is catalogo
+            assert list(scrape.loadIndicators(reload=True).index) == [367]
+            assert scrape.search('basica').empty  # los títulos normalizados del catálogo anterior se desechan
+        finally:
+            scrape.INDICATORS_FILE = anterior
+            scrape.loadIndicators(reload=True)
+
+
+def test_read():
+    def parse(chart, chartFormat, name=None, first=None, last=None, freq=None, func=None, quiet=True):
+        time.sleep(0.2 if chart == 3 else 0.1)  # el primer cuadro termina de último
+        return pd.Series(float(chart), index=pd.period_range('2020-01', periods=3, freq='M'), name=name)
+
+    catalogo = pd.DataFrame({'chartFormat': ['MonthYear'] * 3}, index=[1, 2, 3])
+    anteriores = fetch.parse, fetch.loadIndicators
+    fetch.parse, fetch.loadIndicators = parse, lambda: catalogo
+    try:
+        inicio = time.perf_counter()
+        datos = fetch.read({3: 'c', 1: 'a', 2: 'b'}, threads=3)
+        assert list(datos.columns) == ['c', 'a', 'b']  # el orden de la solicitud
+        assert time.perf_counter() - inicio < 0.35  # uno tras otro tardarían 0.4 segundos
+    finally:
+        fetch.parse, fetch.loadIndicators = anteriores
+
+
+def test_search_regex():
+    anterior = scrape.INDICATORS_FILE
+    with tempfile.TemporaryDirectory() as carpeta:
+        scrape.INDICATORS_FILE = os.path.join(carpeta, 'indicators.pkl')
+        try:
+            pd.DataFrame({'title': ['Tasa Básica', 'Índice 2', 'Tasa mensual'], 'subtitle': [''] * 3,
+                          'chartFormat': ['DayYear'] * 3}, index=[17, 9, 4]).to_pickle(scrape.INDICATORS_FILE)
+            scrape.loadIndicators(reload=True)
+            assert list(scrape.search(r'\Dasa', regex=True).index) == [17, 4]  # \D no es \d
+            assert list(scrape.search(r'^índice \d', regex=True).index) == [9]
+            assert list(scrape.search('INDICE').index) == [9]
+            # cada título por aparte: una coincidencia no abarca varios títulos ni oculta las de los siguientes
+            assert list(scrape.search('[^@]+', regex=True).index) == [17, 9, 4]
+            assert scrape.search(r'2\stasa', regex=True).empty
+        finally:
+            scrape.INDICATORS_FILE = anterior
+            scrape.loadIndicators(reload=True)
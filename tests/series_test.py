@@ -0,0 +1,97 @@
+import time
+
+import numpy as np
+import pandas as pd
+
+from bccr import series
+from bccr.series import CacheSeries, actualizar, agregar
+
+
+def diaria(hasta):
+    """Serie diaria desde el 1 de enero de 2019"""
+    indice = pd.date_range('2019-01-01', hasta)
+    return pd.Series(np.arange(len(indice), dtype=float), index=indice)
+
+
+def agregaciones():
+    """Reemplaza `series.agregar` por una versión que anota las series que agrega; devuelve la lista de series"""
+    agregadas = []
+
+    def anotar(serie, *args, **kwargs):
+        agregadas.append(serie)
+        return agregar(serie, *args, **kwargs)
+    series.agregar = anotar
+    return agregadas
+
+
+def test_obtener():
+    descargas = []
+
+    def descargar(codigo, FechaInicio, FechaFinal):
+        descargas.append(codigo)
+        return f'serie {codigo} {len(descargas)}'
+
+    cache = CacheSeries(maximo=2, vigencia=0.2)
+    assert cache.obtener(1, '2020/01/01', None, descargar) == 'serie 1 1'
+    assert cache.obtener('1', '2020/01/01', None, descargar) == 'serie 1 1'  # el código puede ser int o str
+    assert cache.obtener(1, '2021/01/01', None, descargar) == 'serie 1 2'  # otro rango de fechas
+    assert descargas == ['1', '1']
+
+    # al superar el máximo se desecha la serie usada menos recientemente
+    cache.obtener(1, '2020/01/01', None, descargar)
+    cache.obtener(2, None, None, descargar)
+    assert len(cache) == 2
+    assert cache.llave(1, '2020/01/01') in cache
+    assert cache.llave(1, '2021/01/01') not in cache
+
+    # las series vencidas se descargan de nuevo
+    time.sleep(0.25)
+    assert cache.obtener(2, None, None, descargar) == 'serie 2 4'
+    assert descargas == ['1', '1', '2', '2']
+
+
+def test_resumen():
+    cache = CacheSeries()
+    serie = diaria('2020-06-15')
+    cache.obtener('1', '2019/01/01', None, lambda *_: serie)
+
+    mensual = cache.resumen('1', '2019/01/01', None, 'M', 'sum', nativa='D')
+    assert cache.resumen('1', '2019/01/01', None, 'M', 'sum', nativa='D') is mensual  # no se vuelve a calcular
+    assert mensual.equals(agregar(serie, 'M', 'sum', nativa='D'))
+
+    # al descargar la serie de nuevo, con observaciones nuevas, solo se agregan las del último mes en adelante
+    cache.vigencia = 0
+    nueva = diaria('2020-09-20')
+    cache.obtener('1', '2019/01/01', None, lambda *_: nueva)
+    cache.vigencia = 3600
+    agregadas = agregaciones()
+    try:
+        actualizada = cache.resumen('1', '2019/01/01', None, 'M', 'sum', nativa='D')
+    finally:
+        series.agregar = agregar
+    assert [s.index[0] for s in agregadas] == [pd.Timestamp('2020-06-01')]
+    assert actualizada.equals(agregar(nueva, 'M', 'sum', nativa='D'))
+
+
+def test_actualizar():
+    anterior = diaria('2020-06-15')
+    resumen = agregar(anterior, 'M', 'mean', nativa='D')
+    agregadas = agregaciones()
+    try:
+        # observaciones nuevas: los meses anteriores se toman del resumen, sin agregarlos de nuevo
+        nueva = diaria('2020-08-10')
+        actualizado = actualizar(anterior, resumen, nueva, 'M', 'mean', nativa='D')
+        assert len(agregadas) == 1 and agregadas[0].index[0] == pd.Timestamp('2020-06-01')
+        assert actualizado[:'2020-05'].equals(resumen[:'2020-05'])
+        assert actualizado.equals(agregar(nueva, 'M', 'mean', nativa='D'))
+
+        # una observación antigua revisada: se agrega toda la serie de nuevo
+        agregadas.clear()
+        revisada = nueva.copy()
+        revisada['2019-02-10'] = -100.0
+        reconstruido = actualizar(anterior, resumen, revisada, 'M', 'mean', nativa='D')
+        assert len(agregadas) == 1 and agregadas[0].index[0] == pd.Timestamp('2019-01-01')
+        assert reconstruido.equals(agregar(revisada, 'M', 'mean', nativa='D'))
+        assert reconstruido['2019-02'].iloc[0] != resumen['2019-02'].iloc[0]
+    finally:
+        series.agregar = agregar
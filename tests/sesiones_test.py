@@ -0,0 +1,55 @@
+import os
+import tempfile
+
+import pandas as pd
+
+from bccr.sesiones import AlmacenMemoria, AlmacenDisco
+
+
+def test_almacen_memoria():
+    almacen = AlmacenMemoria(presupuesto=1200)
+    almacen.guardar('a', 'datos', pd.DataFrame({'x': range(10)}))
+    almacen.guardar('b', 'datos', pd.DataFrame({'x': range(10)}))
+    assert almacen.leer('a', 'datos')['x'].sum() == 45
+    assert almacen.leer('c', 'datos') is None
+
+    almacen.guardar('c', 'datos', pd.DataFrame({'x': range(100)}))  # excede el presupuesto: se desecha 'b'
+    assert almacen.leer('b', 'datos') is None
+    assert almacen.leer('c', 'datos') is not None
+
+
+def test_almacen_disco():
+    with tempfile.TemporaryDirectory() as carpeta:
+        archivo = os.path.join(carpeta, 'sesiones.sqlite')
+        almacen = AlmacenDisco(archivo)
+        almacen.guardar('a', 'datos', pd.DataFrame({'x': [1.5, 2.5]}))
+
+        otro = AlmacenDisco(archivo)  # p.ej. otro worker del servidor
+        assert otro.leer('a', 'datos')['x'].tolist() == [1.5, 2.5]
+        otro.borrar('a')
+        assert almacen.leer('a', 'datos', 'nada') == 'nada'
+        almacen.cerrar()
+        otro.cerrar()
+
+
+def test_modificar():
+    with tempfile.TemporaryDirectory() as carpeta:
+        for almacen in (AlmacenMemoria(presupuesto=2000), AlmacenDisco(os.path.join(carpeta, 's.sqlite'), presupuesto=2000)):
+            almacen.guardar('a', 'tarea', dict(id='t1'))
+            guardados = almacen.modificar('a', 'tarea', lambda tarea: dict(datos=os.urandom(5000), tarea=dict(tarea, n=1)))
+            assert list(guardados) == ['datos', 'tarea']
+            assert almacen.leer('a', 'tarea') == dict(id='t1', n=1)  # las claves fijas no se desechan
+            assert almacen.leer('a', 'datos') is None  # excede el presupuesto
+            assert almacen.modificar('b', 'tarea', lambda tarea: dict() if tarea is None else dict(x=1)) == dict()
+            if isinstance(almacen, AlmacenDisco):
+                almacen.cerrar()
+
+
+def test_almacen_disco_sin_conexion():
+    with tempfile.TemporaryDirectory() as carpeta:
+        almacen = AlmacenDisco(os.path.join(carpeta, 's.sqlite'))
+        assert almacen.__proceso__ is None  # los procesos hijos no heredan la conexión
+        almacen.guardar('a', 'x', 1)
+        assert almacen.leer('a', 'x') == 1
+        almacen.cerrar()
+        almacen.cerrar()
@@ -0,0 +1,69 @@
+import numpy as np
+
+from bccr.tabla import leer_tabla, leer_encabezado, convertir_numeros
+
+CUADRO = """
+<html><body><table>
+<tr><td>Medio circulante</td></tr>
+<tr><td>Millones de colones</td></tr>
+<tr><td>Saldos a fin de mes</td></tr>
+<tr><td></td></tr>
+<tr><td></td><td>2014</td><td>2015</td></tr>
+<tr><td>Enero</td><td>1.234,5</td><td>2.000,25</td></tr>
+<tr><td>Febrero</td><td>1.300</td><td></td></tr>
+</table></body></html>
+"""
+
+
+def test_convertir_numeros():
+    valores = convertir_numeros(np.array([['1.234,56', ''], ['-0,5', '12']]))
+    assert valores.shape == (2, 2)
+    np.testing.assert_allclose(valores, [[1234.56, np.nan], [-0.5, 12.0]])
+
+
+def test_leer_tabla():
+    tabla = leer_tabla(CUADRO)
+    assert tabla.titulo == 'Medio circulante'
+    assert tabla.subtitulo == 'Millones de colones --- Saldos a fin de mes'
+    assert list(tabla.columnas) == ['2014', '2015']
+    assert list(tabla.filas) == ['Enero', 'Febrero']
+    np.testing.assert_allclose(tabla.valores, [[1234.5, 2000.25], [1300.0, np.nan]])
+    assert tabla.to_frame()._metadata['title'] == 'Medio circulante'
+
+
+def test_leer_encabezado():
+    leidos = []
+
+    def fragmentos():
+        for k in range(0, len(CUADRO), 40):
+            leidos.append(k)
+            yield CUADRO[k:k + 40]
+
+    titulo, subtitulo = leer_encabezado(fragmentos())
+    assert titulo == 'Medio circulante'
+    assert subtitulo == 'Millones de colones --- Saldos a fin de mes'
+    assert len(leidos) < len(CUADRO) / 40  # no se leyó el cuadro completo
+
+
+def test_reformar_day_year():
+    from bccr.formatos import reformar
+    from bccr.tabla import TablaCuadro
+
+    valores = np.arange(366 * 2, dtype=float).reshape(2, 366).T  # columna = año
+    tabla = TablaCuadro('t', 's', np.array([str(k) for k in range(366)]), np.array(['2019', '2020']), valores)
+    serie = reformar(tabla, 'DayYear')
+    assert len(serie) == 365 + 366
+    assert str(serie.index[0]) == '2019-01-01' and str(serie.index[-1]) == '2020-12-31'
+    assert serie['2019-03-01'] == 60.0          # en 2019 se descarta el 29 de febrero (fila 59)
+    assert serie['2020-02-29'] == 366 + 59.0
+
+
+def test_reformar_month_year():
+    from bccr.formatos import reformar
+    from bccr.tabla import TablaCuadro
+
+    filas = np.array(['Total'] + ['mes'] * 12)
+    valores = np.vstack([np.full(2, np.nan), np.arange(24, dtype=float).reshape(2, 12).T])
+    serie = reformar(TablaCuadro('t', 's', filas, np.array(['2014', '2015']), valores), 'MonthYear')
+    assert str(serie.index[0]) == '2014-01' and str(serie.index[-1]) == '2015-12'
+    np.testing.assert_allclose(serie.values, np.arange(24))
@@ -0,0 +1,62 @@
+import time
+
+import pandas as pd
+
+from bccr.sesiones import AlmacenMemoria
+from bccr.tareas import Avance, Tareas
+
+
+def esperar(tareas, sesion, segundos=5):
+    limite = time.time() + segundos
+    while time.time() < limite:
+        estado = tareas.estado(sesion)
+        if estado is not None and estado['estado'] in ('lista', 'cancelada', 'error'):
+            return estado
+        time.sleep(0.01)
+    raise TimeoutError(sesion)
+
+
+def test_tarea():
+    tareas = Tareas(AlmacenMemoria())
+
+    def contar(avance, n):
+        for k in range(n):
+            avance.informar(k + 1, n, resultado=k)
+
+    tareas.iniciar('s', contar, 3)
+    estado = esperar(tareas, 's')
+    assert estado['estado'] == 'lista' and estado['hechos'] == 3
+    assert tareas.almacen.leer('s', 'resultado') == 2
+
+    tareas.iniciar('s', lambda avance: 1 / 0)
+    assert esperar(tareas, 's')['estado'] == 'error'
+
+
+def test_estado_no_se_desecha():
+    almacen = AlmacenMemoria(presupuesto=10_000)
+    tareas = Tareas(almacen)
+    tarea = tareas.iniciar('s', lambda avance: None)
+    esperar(tareas, 's')
+
+    # un resultado grande (de esta u otra sesión) no desecha el estado de la tarea
+    Avance(almacen, 's', tarea).informar(1, 1, datos=pd.DataFrame({'x': range(10_000)}))
+    almacen.guardar('otra', 'datos', pd.DataFrame({'x': range(10_000)}))
+    assert tareas.estado('s')['id'] == tarea
+
+    # si el estado ya no existe, informar no falla ni guarda nada
+    almacen.borrar('s')
+    Avance(almacen, 's', tarea).informar(1, 1, datos='x')
+    assert almacen.leer('s', 'datos') is None
+
+
+def test_tarea_reemplazada():
+    almacen = AlmacenMemoria()
+    tareas = Tareas(almacen)
+    vieja = Avance(almacen, 's', tareas.iniciar('s', lambda avance: None))
+    esperar(tareas, 's')
+    nueva = tareas.iniciar('s', lambda avance: avance.informar(1, 1, datos='nuevos'))
+    esperar(tareas, 's')
+
+    vieja.informar(1, 1, estado='lista', datos='viejos')  # la tarea anterior ya no guarda sus resultados
+    assert almacen.leer('s', 'datos') == 'nuevos'
+    assert tareas.estado('s')['id'] == nueva
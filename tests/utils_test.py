@@ -0,0 +1,29 @@
+import numpy as np
+import pandas as pd
+
+from bccr.utils import normalizar_texto, parseDays, parseMonthYears, parseQuarterYears, parseDay, parseMonthYear, parseQuarterYear
+
+
+def test_parseDays():
+    fechas = parseDays(['12 Set 2019', '29 Feb 2019', '29 Feb 2020', '1 Ene 1990', 'Total'])
+    esperado = np.array(['2019-09-12', 'NaT', '2020-02-29', '1990-01-01', 'NaT'], dtype='datetime64[D]')
+    np.testing.assert_array_equal(fechas, esperado)
+    assert str(fechas[0]).replace('-', '/') == parseDay('12 Set 2019')
+
+
+def test_parseMonthYears():
+    meses = parseMonthYears(['Marzo 2017', 'Setiembre 2019', 'Septiembre 2019', 'Total'])
+    assert [str(m) for m in meses] == ['2017-03', '2019-09', '2019-09', 'NaT']
+    assert parseMonthYear('Marzo 2017') == '2017/3'
+
+
+def test_parseQuarterYears():
+    trimestres = parseQuarterYears(['Trimestre 2/2014', '2014/4', 'Trimestre 5/2014'])
+    assert [str(t) for t in trimestres] == ['2014Q2', '2014Q4', 'NaT']
+    assert parseQuarterYear('Trimestre 2/2014') == '2014/6'
+
+
+def test_normalizar_texto():
+    assert normalizar_texto('Índice de Precios') == 'indice de precios'
+    serie = normalizar_texto(pd.Series(['Tasa de interés', None, 'AÑO']))
+    assert list(serie) == ['tasa de interes', '', 'ano']